@@ -0,0 +1,226 @@
+"""History-driven routing that learns which secondary agent works best per category."""
+
+from __future__ import annotations
+
+import math
+import random
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence
+
+
+STATUS_REWARD: dict[str, float] = {
+    "completed": 1.0,
+    "unknown": 0.5,
+    "failed": 0.0,
+}
+
+UNCATEGORISED = "default"
+STRATEGIES = ("ucb", "epsilon")
+
+
+@dataclass
+class ToolStats:
+    """Aggregated outcome statistics for one (category, tool) pair."""
+
+    runs: int = 0
+    reward_total: float = 0.0
+    duration_total: float = 0.0
+    timed_runs: int = 0
+
+    @property
+    def success_rate(self) -> float:
+        return self.reward_total / self.runs if self.runs else 0.0
+
+    @property
+    def mean_duration(self) -> Optional[float]:
+        return self.duration_total / self.timed_runs if self.timed_runs else None
+
+
+@dataclass(frozen=True)
+class AdaptiveRoutingConfig:
+    strategy: str = "ucb"
+    epsilon: float = 0.1
+    exploration: float = 1.0
+    candidates: Mapping[str, Sequence[str]] = field(default_factory=dict)
+
+
+@dataclass
+class RoutingDecision:
+    """The chosen tool plus enough context to audit why it was picked."""
+
+    tool: str
+    category: Optional[str]
+    mode: str
+    reason: str
+    strategy: Optional[str] = None
+    scores: Dict[str, Dict] = field(default_factory=dict)
+    preferred: Optional[str] = None
+    load: Dict[str, Dict] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def run_duration(run: Mapping) -> Optional[float]:
+    started = parse_timestamp(run.get("started_at"))
+    completed = parse_timestamp(run.get("completed_at"))
+    if started is None or completed is None:
+        return None
+    return max(0.0, (completed - started).total_seconds())
+
+
+def compute_tool_stats(runs: Iterable[Mapping]) -> Dict[str, Dict[str, ToolStats]]:
+    """Fold finished runs into ``{category: {tool: ToolStats}}``."""
+
+    stats: Dict[str, Dict[str, ToolStats]] = {}
+    for run in runs:
+        reward = STATUS_REWARD.get(run.get("status", ""))
+        tool = run.get("secondary")
+        if reward is None or not tool:
+            continue
+        category = run.get("category") or UNCATEGORISED
+        entry = stats.setdefault(category, {}).setdefault(tool, ToolStats())
+        entry.runs += 1
+        entry.reward_total += reward
+        duration = run_duration(run)
+        if duration is not None:
+            entry.duration_total += duration
+            entry.timed_runs += 1
+    return stats
+
+
+class AdaptiveRouter:
+    """Pick a secondary agent from run history using UCB1 or epsilon-greedy exploration.
+
+    Each candidate is scored by its observed success rate scaled by how its mean
+    duration compares with the fastest candidate, so a tool that succeeds as often
+    but finishes sooner wins. Candidates without history are explored first under
+    UCB; epsilon-greedy explores uniformly with probability ``epsilon``.
+    """
+
+    def __init__(
+        self,
+        settings: AdaptiveRoutingConfig,
+        stats: Mapping[str, Mapping[str, ToolStats]],
+        *,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        if settings.strategy not in STRATEGIES:
+            raise ValueError(f"Unknown adaptive routing strategy '{settings.strategy}'")
+        self._settings = settings
+        self._stats = stats
+        self._rng = rng or random.Random()
+
+    def candidates_for(self, category: Optional[str], tools: Sequence[str]) -> List[str]:
+        configured = self._settings.candidates.get(category or UNCATEGORISED)
+        if configured:
+            return [tool for tool in configured if tool in tools]
+        return list(tools)
+
+    def select(
+        self,
+        category: Optional[str],
+        *,
+        tools: Sequence[str],
+        static_choice: str,
+    ) -> RoutingDecision:
+        candidates = self.candidates_for(category, tools)
+        if static_choice in tools and static_choice not in candidates:
+            candidates.append(static_choice)
+        if not candidates:
+            raise ValueError("No tools available for routing")
+
+        observed = self._stats.get(category or UNCATEGORISED, {})
+        scores = self._score(candidates, observed)
+        strategy = self._settings.strategy
+
+        if strategy == "ucb":
+            tool, reason = self._select_ucb(candidates, observed, scores, static_choice)
+        else:
+            tool, reason = self._select_epsilon(candidates, scores, static_choice)
+
+        return RoutingDecision(
+            tool=tool,
+            category=category,
+            mode="adaptive",
+            reason=reason,
+            strategy=strategy,
+            scores=scores,
+        )
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _score(candidates: Sequence[str], observed: Mapping[str, ToolStats]) -> Dict[str, Dict]:
+        durations = [
+            observed[tool].mean_duration
+            for tool in candidates
+            if tool in observed and observed[tool].mean_duration
+        ]
+        fastest = min(durations) if durations else None
+
+        scores: Dict[str, Dict] = {}
+        for tool in candidates:
+            entry = observed.get(tool)
+            if entry is None or not entry.runs:
+                scores[tool] = {"runs": 0, "success_rate": None, "mean_duration": None, "score": None}
+                continue
+            mean_duration = entry.mean_duration
+            speed = fastest / mean_duration if fastest and mean_duration else 1.0
+            scores[tool] = {
+                "runs": entry.runs,
+                "success_rate": round(entry.success_rate, 4),
+                "mean_duration": round(mean_duration, 3) if mean_duration is not None else None,
+                "score": round(entry.success_rate * speed, 4),
+            }
+        return scores
+
+    def _select_ucb(
+        self,
+        candidates: Sequence[str],
+        observed: Mapping[str, ToolStats],
+        scores: Mapping[str, Dict],
+        static_choice: str,
+    ) -> tuple[str, str]:
+        untried = [tool for tool in candidates if scores[tool]["runs"] == 0]
+        if untried:
+            tool = static_choice if static_choice in untried else untried[0]
+            return tool, f"exploring '{tool}': no recorded runs for this category"
+
+        total = sum(observed[tool].runs for tool in candidates)
+        best_tool = static_choice if static_choice in candidates else candidates[0]
+        best_value = -math.inf
+        for tool in candidates:
+            bonus = self._settings.exploration * math.sqrt(math.log(total) / observed[tool].runs)
+            value = scores[tool]["score"] + bonus
+            scores[tool]["ucb"] = round(value, 4)
+            if value > best_value or (value == best_value and tool == static_choice):
+                best_tool, best_value = tool, value
+        return best_tool, f"highest UCB value {best_value:.3f} over {total} prior runs"
+
+    def _select_epsilon(
+        self,
+        candidates: Sequence[str],
+        scores: Mapping[str, Dict],
+        static_choice: str,
+    ) -> tuple[str, str]:
+        if self._rng.random() < self._settings.epsilon:
+            tool = self._rng.choice(list(candidates))
+            return tool, f"exploring '{tool}' (epsilon={self._settings.epsilon})"
+
+        scored = [tool for tool in candidates if scores[tool]["score"] is not None]
+        if not scored:
+            return static_choice, "no history for this category; using static routing"
+        best = max(scored, key=lambda tool: (scores[tool]["score"], tool == static_choice))
+        return best, f"best observed score {scores[best]['score']:.3f}"
@@ -7,15 +7,23 @@ import time
 from pathlib import Path
 from typing import Iterable, Optional
 
-from uuid import uuid4
-
 import click
 
-from .config import OrchestraConfig, load_config
-from .run_history import RunHistory
-from .summary import summarise
-from .task_router import detect_category
+from .config import ROUTING_MODES, load_config
+from .delegation import (
+    TRANSCRIPT_MODES,
+    DelegationError,
+    DelegationRequest,
+    execute_delegation,
+    plan_delegation,
+    submit_to_daemon,
+)
+from .resource_sampler import DEFAULT_INTERVAL, MIN_INTERVAL, summarise_usage
+from .run_history import MAX_RUNS, RunHistory
+from .search_index import SearchIndex, parse_since
 from .tmux_manager import PaneCapture, TmuxError, TmuxManager
+from .tracing import Tracer, activate
+from .transcripts import TRANSCRIPT_ROLES, TranscriptStore
 
 
 def _build_manager(tmux_binary: str | None) -> TmuxManager:
@@ -34,13 +42,19 @@ def _build_manager(tmux_binary: str | None) -> TmuxManager:
 def cli(ctx: click.Context, tmux_binary: str, config_path: Path | None) -> None:
     """Orchestra developer CLI."""
 
+    started = time.perf_counter_ns()
     manager = _build_manager(tmux_binary)
+    built = time.perf_counter_ns()
     try:
         config = load_config(config_path)
     except FileNotFoundError as exc:
         raise click.ClickException(f"Configuration file not found: {exc}") from exc
+    except ValueError as exc:
+        raise click.ClickException(f"Invalid configuration: {exc}") from exc
 
-    ctx.obj = {"manager": manager, "config": config}
+    # Kept for ``delegate --profile``, which is only parsed after this runs.
+    startup = [("cli.build_manager", started, built), ("config.load", built, time.perf_counter_ns())]
+    ctx.obj = {"manager": manager, "config": config, "startup": startup}
 @cli.command()
 @click.option("--from", "primary", default="claude", show_default=True, help="Primary agent name")
 @click.option("--to", "secondary", default="auto", show_default=True, help="Secondary agent name or 'auto'")
@@ -49,6 +63,46 @@ def cli(ctx: click.Context, tmux_binary: str, config_path: Path | None) -> None:
 @click.option("--follow/--no-follow", default=False, show_default=True, help="Stream secondary output until the session exits")
 @click.option("--follow-interval", default=1.0, show_default=True, help="Polling interval when following output")
 @click.option("--cleanup/--no-cleanup", default=False, show_default=True, help="Kill tmux sessions after completion")
+@click.option(
+    "--routing",
+    "routing_mode",
+    type=click.Choice(ROUTING_MODES),
+    help="How '--to auto' picks an agent (defaults to routing_mode in the config)",
+)
+@click.option(
+    "--transcript",
+    type=click.Choice(TRANSCRIPT_MODES),
+    default="secondary",
+    show_default=True,
+    help="Panes to keep as compressed transcripts (read with 'orchestra run logs')",
+)
+@click.option(
+    "--sample-resources",
+    is_flag=True,
+    envvar="ORCHESTRA_SAMPLE_RESOURCES",
+    help="Record CPU, peak RSS and I/O of the agent processes (see 'orchestra run stats')",
+)
+@click.option(
+    "--sample-interval",
+    default=DEFAULT_INTERVAL,
+    show_default=True,
+    type=click.FloatRange(min=MIN_INTERVAL),
+    help="Seconds between resource samples",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    envvar="ORCHESTRA_TRACE",
+    help="Write timed spans of the run to a Chrome trace file (see 'orchestra run trace')",
+)
+@click.option("--via-daemon", is_flag=True, help="Let the daemon's run supervisor own the run")
+@click.option("--detach", is_flag=True, help="Submit to the daemon and return immediately (implies --via-daemon)")
+@click.option(
+    "--daemon-socket",
+    type=click.Path(dir_okay=False, path_type=Path),
+    envvar="ORCHESTRA_DAEMON_SOCKET",
+    help="Supervisor socket of the daemon (defaults to daemon.sock in the state dir)",
+)
 @click.pass_context
 def delegate(
     ctx: click.Context,
@@ -59,156 +113,117 @@ def delegate(
     follow: bool,
     follow_interval: float,
     cleanup: bool,
+    routing_mode: str | None,
+    transcript: str,
+    sample_resources: bool,
+    sample_interval: float,
+    profile: bool,
+    via_daemon: bool,
+    detach: bool,
+    daemon_socket: Path | None,
 ) -> None:
     """Delegate a task from the primary agent to a secondary agent."""
 
-    manager: TmuxManager = ctx.obj["manager"]
-    config: OrchestraConfig = ctx.obj["config"]
-    history = RunHistory()
-
-    if any(ch in task_description for ch in ("\n", "\r")):
-        raise click.ClickException("Task description must be a single line message")
-
     try:
-        active_sessions = [name for name in manager.list_sessions() if name.startswith("run-")]
-    except TmuxError:
-        active_sessions = []
-
-    if active_sessions:
-        raise click.ClickException(
-            "Another delegation run appears to be active: " + ", ".join(active_sessions)
+        request = DelegationRequest(
+            task=task_description,
+            primary=primary,
+            secondary=secondary,
+            wait=wait,
+            follow=follow,
+            follow_interval=follow_interval,
+            cleanup=cleanup,
+            routing_mode=routing_mode,
+            transcript=transcript,
+            sample_resources=sample_resources,
+            sample_interval=sample_interval,
+            profile=profile,
         )
-
-    primary_key = primary.lower()
-    try:
-        primary_wrapper = config.wrapper_for(primary_key)
-    except KeyError as exc:
-        raise click.ClickException(str(exc)) from exc
-
-    if secondary.lower() == "auto":
-        category = detect_category(task_description)
-        secondary_key = config.select_tool(category)
-        click.echo(f"Auto-selected secondary agent '{secondary_key}'")
-    else:
-        secondary_key = secondary.lower()
-
-    try:
-        secondary_wrapper = config.wrapper_for(secondary_key)
-    except KeyError as exc:
+    except DelegationError as exc:
         raise click.ClickException(str(exc)) from exc
 
-    run_id = uuid4().hex[:8]
-    primary_session = f"run-{run_id}-primary-{primary_key}"
-    secondary_session = f"run-{run_id}-secondary-{secondary_key}"
-
-    def build_command(wrapper: Path, *, agent: str, role: str) -> list[str]:
-        return [
-            "env",
-            f"ORCHESTRA_RUN_ID={run_id}",
-            f"ORCHESTRA_AGENT={agent}",
-            f"ORCHESTRA_ROLE={role}",
-            str(wrapper),
-            task_description,
-        ]
-
-    history.start_run(
-        run_id,
-        task=task_description,
-        primary=primary_key,
-        secondary=secondary_key,
-        primary_session=primary_session,
-        secondary_session=secondary_session,
-        cleanup=cleanup,
-        follow_mode=follow,
-    )
+    if via_daemon or detach:
+        _delegate_via_daemon(request, socket_path=daemon_socket, detach=detach)
+        return
 
-    click.echo(f"Run ID: {run_id}")
-    click.echo(f"Spawning primary session '{primary_session}'")
-    manager.spawn_session(
-        primary_session,
-        command=build_command(primary_wrapper, agent=primary_key, role="primary"),
-        kill_existing=True,
-    )
+    manager: TmuxManager = ctx.obj["manager"]
+    tracer = None
+    if profile:
+        startup = ctx.obj.get("startup") or []
+        tracer = Tracer(start_ns=startup[0][1] if startup else None)
+        for name, start, end in startup:
+            tracer.add(name, start, end)
+    with activate(tracer):
+        history = RunHistory()
+        try:
+            plan = plan_delegation(request, manager=manager, config=ctx.obj["config"], history=history, emit=_echo_event)
+            execute_delegation(plan, manager=manager, history=history, emit=_echo_event)
+        except DelegationError as exc:
+            raise click.ClickException(str(exc)) from exc
 
-    click.echo(f"Spawning secondary session '{secondary_session}'")
-    manager.spawn_session(
-        secondary_session,
-        command=build_command(secondary_wrapper, agent=secondary_key, role="secondary"),
-        kill_existing=True,
-    )
 
-    capture: Optional[PaneCapture] = None
-    task_summary_dict: dict | None = None
-    streamed_lines: list[str] = []
+def _delegate_via_daemon(request: DelegationRequest, *, socket_path: Path | None, detach: bool) -> None:
+    outcome: dict = {}
 
-    if follow:
-        click.echo("Streaming output (Ctrl+C to abort)...")
-        try:
-            for line in manager.iter_pane_lines(
-                secondary_session,
-                poll_interval=max(0.1, follow_interval),
-            ):
-                if line.strip():
-                    click.echo(f"    {line}")
-                    streamed_lines.append(line)
-        except KeyboardInterrupt:
-            click.echo("\nStreaming interrupted by user")
-        except TmuxError as exc:
-            click.echo(f"\nStreaming stopped: {exc}", err=True)
-        finally:
-            try:
-                capture = manager.capture_pane(secondary_session)
-            except TmuxError:
-                capture = None
-    else:
-        if wait > 0:
-            time.sleep(wait)
-        try:
-            capture = manager.capture_pane(secondary_session)
-        except TmuxError as exc:
-            raise click.ClickException(str(exc)) from exc
+    def on_event(event: dict) -> None:
+        _echo_event(event)
+        if event.get("type") == "completed":
+            outcome.update(event)
 
     try:
-        if capture is None:
-            if streamed_lines:
-                summary_lines = streamed_lines
-            else:
-                click.echo("No output captured from secondary agent")
-                summary_lines = []
-        else:
-            summary_lines = capture.lines
-
-        summary = summarise(summary_lines)
-        task_summary_dict = {
-            "status": summary.status,
-            "files_modified": summary.files_modified,
-            "details": summary.details,
-        }
-
+        run_id = submit_to_daemon(request, socket_path=socket_path, detach=detach, on_event=on_event)
+    except KeyboardInterrupt:
+        click.echo("\nDetached; the run continues in the daemon")
+        return
+    except DelegationError as exc:
+        raise click.ClickException(str(exc)) from exc
+    if detach:
+        click.echo(f"Run ID: {run_id} (submitted to the daemon)")
+    elif outcome.get("error"):
+        raise click.ClickException(f"Run {run_id} failed: {outcome['error']}")
+
+
+def _echo_event(event: dict) -> None:
+    kind = event.get("type")
+    if kind == "routed":
+        click.echo(f"Auto-selected secondary agent '{event['tool']}' ({event['reason']})")
+    elif kind == "rerouted":
+        click.echo(f"Rerouted to '{event['tool']}': {event['reason']}")
+    elif kind == "queued" and event.get("position"):
+        click.echo(f"Run {event['run_id']} queued behind {event['position']} other run(s)")
+    elif kind == "started":
+        click.echo(f"Run ID: {event['run_id']}")
+    elif kind == "spawning":
+        click.echo(f"Spawning {event['role']} session '{event['session']}'")
+    elif kind == "following":
+        click.echo("Streaming output (Ctrl+C to abort)...")
+    elif kind == "output":
+        click.echo(f"    {event['line']}")
+    elif kind == "stream_ended" and event.get("reason") == "error":
+        click.echo(f"\nStreaming stopped: {event.get('error')}", err=True)
+    elif kind == "stream_ended":
+        click.echo("\nStreaming interrupted by user")
+    elif kind == "transcript" and event.get("error"):
+        click.echo(f"Transcript of the {event['role']} pane not stored: {event['error']}", err=True)
+    elif kind == "no_output":
+        click.echo("No output captured from secondary agent")
+    elif kind == "trace" and event.get("error"):
+        click.echo(f"Trace not written: {event['error']}", err=True)
+    elif kind == "trace":
+        click.echo(f"\nProfile ({event['wall_ms']:.0f} ms): {event['file']}")
+        for name, stats in _slowest_spans(event["spans"], 5):
+            click.echo(f"  {name:<24} {stats['total_ms']:>9.1f} ms  x{stats['count']}")
+    elif kind == "summary":
         click.echo("\nSummary:")
-        click.echo(f"  Status: {summary.status}")
-        click.echo(f"  Files modified: {summary.files_modified}")
-        if summary.details:
+        click.echo(f"  Status: {event['status']}")
+        click.echo(f"  Files modified: {event['files_modified']}")
+        for role, usage in ((event.get("resources") or {}).get("roles") or {}).items():
+            click.echo(f"  Resources ({role}): {_format_usage(usage)}")
+        if event.get("details"):
             click.echo("  Recent output:")
-            for line in summary.details:
+            for line in event["details"]:
                 click.echo(f"    {line}")
 
-        history.complete_run(run_id, status=summary.status, summary=task_summary_dict)
-    except Exception:
-        history.complete_run(run_id, status="failed", summary=task_summary_dict)
-        raise
-    finally:
-        if cleanup:
-            try:
-                manager.kill_session(primary_session)
-            except TmuxError:
-                pass
-            try:
-                manager.kill_session(secondary_session)
-            except TmuxError:
-                pass
-
-
 
 @cli.group()
 @click.pass_context
@@ -374,5 +389,171 @@ def run_attach(ctx: click.Context, run_id: str, role: str) -> None:
     manager.attach_session(session_name)
 
 
+@run.command("logs")
+@click.argument("run_id")
+@click.option("--role", type=click.Choice(TRANSCRIPT_ROLES), default="secondary", show_default=True)
+@click.option("--tail", "tail_lines", type=click.IntRange(min=1), help="Show only the last N lines")
+@click.option("--range", "line_range", help="Show lines START:END (0-based, END exclusive, either may be omitted)")
+@click.pass_context
+def run_logs(ctx: click.Context, run_id: str, role: str, tail_lines: int | None, line_range: str | None) -> None:
+    """Print the stored transcript of a run."""
+
+    if tail_lines is not None and line_range is not None:
+        raise click.UsageError("--tail and --range are mutually exclusive")
+    try:
+        transcript = TranscriptStore().open(run_id, role)
+    except ValueError as exc:
+        raise click.ClickException(str(exc)) from exc
+    if transcript is None:
+        raise click.ClickException(f"No {role} transcript stored for run '{run_id}'")
+
+    if tail_lines is not None:
+        lines = transcript.tail(tail_lines)
+    elif line_range is not None:
+        lines = transcript.read(*_parse_range(line_range))
+    else:
+        lines = transcript.read()
+    for line in lines:
+        click.echo(line)
+
+
+@run.command("search")
+@click.argument("query", nargs=-1)
+@click.option("--limit", default=20, show_default=True, type=click.IntRange(min=1), help="Number of results")
+@click.option("--since", help="Only runs started within a duration (7d, 12h, 30m, 2w) or after an ISO date")
+@click.option("--status", "status_filter", help="Only runs that finished with this status")
+@click.option("--raw", is_flag=True, help="Pass QUERY to SQLite FTS5 as is (OR, NEAR, prefix*)")
+@click.option("--reindex", is_flag=True, help="Rebuild the index from the run history and transcripts first")
+@click.pass_context
+def run_search(
+    ctx: click.Context,
+    query: tuple[str, ...],
+    limit: int,
+    since: str | None,
+    status_filter: str | None,
+    raw: bool,
+    reindex: bool,
+) -> None:
+    """Search run tasks, summaries and transcripts."""
+
+    if not query and not reindex:
+        raise click.UsageError("Missing QUERY")
+    try:
+        cutoff = parse_since(since) if since else None
+    except ValueError:
+        raise click.BadParameter("expected e.g. 7d, 12h or 2024-05-01", param_hint="--since") from None
+
+    index = SearchIndex()
+    history = RunHistory()
+    transcripts = TranscriptStore()
+    if reindex:
+        click.echo(f"Indexed {index.rebuild(history, transcripts)} runs")
+    else:
+        index.sync(history, transcripts)
+    if not query:
+        return
+
+    try:
+        hits = index.search(" ".join(query), limit=limit, since=cutoff, status=status_filter, raw=raw)
+    except ValueError as exc:
+        raise click.ClickException(str(exc)) from exc
+    if not hits:
+        click.echo("No matching runs")
+        return
+    for hit in hits:
+        task = hit.task if len(hit.task) <= 60 else hit.task[:57] + "..."
+        click.echo(f"{hit.run_id}  {hit.status:<10}  {hit.secondary:<8}  {hit.started_at}  {task}")
+        click.echo(f"    {' '.join(hit.snippet.split())}")
+
+
+@run.command("stats")
+@click.argument("run_id", required=False)
+@click.option("--limit", default=MAX_RUNS, show_default=True, help="Number of recent runs to include")
+@click.pass_context
+def run_stats(ctx: click.Context, run_id: str | None, limit: int) -> None:
+    """Show resources used by agents, per agent and per run (runs started with --sample-resources)."""
+
+    history = RunHistory()
+    if run_id is not None:
+        record = history.get_run(run_id)
+        if not record:
+            raise click.ClickException(f"Run '{run_id}' not found")
+        runs = [record]
+    else:
+        runs = history.list_runs(limit=limit)
+    sampled = [run for run in runs if (run.get("summary") or {}).get("resources")]
+    if not sampled:
+        click.echo("No resource samples recorded; delegate with --sample-resources")
+        return
+
+    if run_id is None:
+        click.echo("Per agent:")
+        totals = sorted(summarise_usage(sampled).items(), key=lambda item: item[1]["cpu_seconds"], reverse=True)
+        for agent, usage in totals:
+            click.echo(f"  {agent:<10}  runs {usage['runs']:<3}  {_format_usage(usage)}")
+        click.echo("Per run:")
+    for run in sampled:
+        resources = run["summary"]["resources"]
+        for role, usage in resources.get("roles", {}).items():
+            click.echo(f"  {run['run_id']}  {role:<9}  {run.get(role, '?'):<8}  {_format_usage(usage)}")
+        click.echo(
+            f"  {run['run_id']}  sampler    every {resources.get('interval')}s, "
+            f"{resources.get('overhead_cpu_seconds', 0.0):.3f}s CPU"
+        )
+
+
+@run.command("trace")
+@click.argument("run_id")
+@click.option("--limit", default=20, show_default=True, type=click.IntRange(min=1), help="Number of spans to show")
+@click.pass_context
+def run_trace(ctx: click.Context, run_id: str, limit: int) -> None:
+    """Show where the time of a run started with --profile went (slowest spans first)."""
+
+    record = RunHistory().get_run(run_id)
+    if not record:
+        raise click.ClickException(f"Run '{run_id}' not found")
+    trace = record.get("trace")
+    if not trace:
+        raise click.ClickException(f"Run '{run_id}' was not profiled; delegate with --profile")
+
+    click.echo(f"Run {run_id}: {trace['wall_ms']:.1f} ms")
+    if trace.get("file"):
+        click.echo(f"Trace file: {trace['file']}")
+    click.echo(f"  {'span':<24} {'total ms':>10} {'count':>6} {'max ms':>9}")
+    for name, stats in _slowest_spans(trace.get("spans", {}), limit):
+        click.echo(f"  {name:<24} {stats['total_ms']:>10.1f} {stats['count']:>6} {stats['max_ms']:>9.1f}")
+    for name, offset in trace.get("marks", {}).items():
+        click.echo(f"  {name} at {offset:.1f} ms")
+
+
+def _slowest_spans(spans: dict, limit: int) -> list:
+    return sorted(spans.items(), key=lambda item: item[1]["total_ms"], reverse=True)[:limit]
+
+
+def _format_usage(usage: dict) -> str:
+    return (
+        f"cpu {usage.get('cpu_seconds', 0.0):.2f}s  peak rss {_format_bytes(usage.get('peak_rss_bytes', 0))}  "
+        f"read {_format_bytes(usage.get('read_bytes', 0))}  write {_format_bytes(usage.get('write_bytes', 0))}"
+    )
+
+
+def _format_bytes(value: int) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if value < 1024:
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} GiB"
+
+
+def _parse_range(value: str) -> tuple[int, int | None]:
+    start, sep, stop = value.partition(":")
+    try:
+        if not sep:
+            raise ValueError(value)
+        return int(start or 0), int(stop) if stop else None
+    except ValueError:
+        raise click.BadParameter("expected START:END, e.g. 100:200 or -50:", param_hint="--range") from None
+
+
 if __name__ == "__main__":
     cli()
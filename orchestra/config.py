@@ -2,20 +2,32 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+import hashlib
+import json
+import os
+import threading
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
-from typing import Dict, Mapping, Optional
+from typing import Dict, List, Mapping, Optional, Tuple
 
 import yaml
 
+from .adaptive_router import STRATEGIES, AdaptiveRoutingConfig
+from .config_watcher import ConfigWatcher
+from .run_history import state_dir
+
 
 DEFAULT_CONFIG_PATH = Path(__file__).resolve().parent / "config.yaml"
+ROUTING_MODES = ("static", "adaptive")
+SNAPSHOT_VERSION = 1
 
 
 @dataclass(frozen=True)
 class ToolConfig:
     name: str
     wrapper: Path
+    capacity: int = 1
+    fallbacks: Tuple[str, ...] = ()
 
 
 @dataclass(frozen=True)
@@ -23,6 +35,8 @@ class OrchestraConfig:
     tools: Dict[str, ToolConfig]
     routing: Mapping[str, str]
     default_tool: str
+    routing_mode: str = "static"
+    adaptive: AdaptiveRoutingConfig = field(default_factory=AdaptiveRoutingConfig)
 
     def wrapper_for(self, tool: str) -> Path:
         key = tool.lower()
@@ -30,39 +44,128 @@ class OrchestraConfig:
             raise KeyError(f"Unknown tool '{tool}'")
         return self.tools[key].wrapper
 
+    def capacities(self) -> Dict[str, int]:
+        return {name: tool.capacity for name, tool in self.tools.items()}
+
+    def fallbacks_for(self, tool: str) -> Tuple[str, ...]:
+        entry = self.tools.get(tool.lower())
+        if entry is None:
+            return ()
+        return tuple(name for name in entry.fallbacks if name in self.tools)
+
     def select_tool(self, category: Optional[str]) -> str:
         if category and category in self.routing:
             return self.routing[category]
         return self.default_tool
 
 
-def load_config(path: Path | None = None) -> OrchestraConfig:
+def load_config(path: Path | None = None, *, use_cache: bool = True) -> OrchestraConfig:
+    """Load the configuration, reusing a validated snapshot from the state dir when possible.
+
+    The snapshot stores the fully resolved config, so a warm load is one stat of the
+    config file, one small JSON read and a stat per wrapper instead of a YAML parse
+    plus the filesystem probes in ``_resolve_path``. Set ``ORCHESTRA_CONFIG_CACHE=0``
+    to bypass it.
+    """
+
+    config_path = path or DEFAULT_CONFIG_PATH
+    use_cache = use_cache and os.getenv("ORCHESTRA_CONFIG_CACHE", "1").lower() not in {"0", "false", "no"}
+    snapshot_path = _snapshot_path(config_path) if use_cache else None
+
+    if snapshot_path is not None:
+        cached = _load_snapshot(snapshot_path, config_path)
+        if cached is not None:
+            return cached
+
+    content = config_path.read_bytes()
+    raw = yaml.safe_load(content) or {}
+    probes: Dict[str, Dict] = {}
+    config = _build_config(raw, config_path.parent, probes)
+
+    if snapshot_path is not None:
+        _store_snapshot(snapshot_path, config_path, content, config, probes)
+    return config
+
+
+def watch_config(path: Path | None = None, **kwargs) -> ConfigWatcher[OrchestraConfig]:
+    """Return a watcher that reloads the config when it or any wrapper changes."""
+
     config_path = path or DEFAULT_CONFIG_PATH
-    with config_path.open("r", encoding="utf-8") as handle:
-        raw = yaml.safe_load(handle) or {}
+    return ConfigWatcher(
+        lambda: load_config(config_path),
+        lambda config: [config_path, *(tool.wrapper for tool in config.tools.values())],
+        name="orchestra-config",
+        **kwargs,
+    )
 
+
+def _build_config(raw: Mapping, base_dir: Path, probes: Dict[str, Dict]) -> OrchestraConfig:
     raw_tools = raw.get("tools", {})
-    base_dir = config_path.parent
-    tools: Dict[str, ToolConfig] = {
-        name.lower(): ToolConfig(
+    tools: Dict[str, ToolConfig] = {}
+    for name, values in raw_tools.items():
+        missed: List[str] = []
+        wrapper = _resolve_path(base_dir, values["wrapper"], missed)
+        probes[name.lower()] = {"missed": missed}
+        tools[name.lower()] = ToolConfig(
             name=name.lower(),
-            wrapper=_resolve_path(base_dir, values["wrapper"]),
+            wrapper=wrapper,
+            capacity=int(values.get("capacity", 1)),
+            fallbacks=tuple(tool.lower() for tool in values.get("fallbacks", ())),
         )
-        for name, values in raw_tools.items()
-    }
 
     routing = raw.get("routing", {})
     default_tool = routing.get("default") or next(iter(tools.keys()), "droid")
 
-    return OrchestraConfig(tools=tools, routing=routing, default_tool=default_tool)
+    routing_mode = str(raw.get("routing_mode", "static")).lower()
+    if routing_mode not in ROUTING_MODES:
+        raise ValueError(f"Unknown routing_mode '{routing_mode}'")
+
+    return OrchestraConfig(
+        tools=tools,
+        routing=routing,
+        default_tool=default_tool,
+        routing_mode=routing_mode,
+        adaptive=_load_adaptive(raw.get("adaptive_routing") or {}, tools),
+    )
+
+
+def _load_adaptive(raw: Mapping, tools: Mapping[str, ToolConfig]) -> AdaptiveRoutingConfig:
+    defaults = AdaptiveRoutingConfig()
+    strategy = str(raw.get("strategy", defaults.strategy)).lower()
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown adaptive_routing strategy '{strategy}'")
+    epsilon = float(raw.get("epsilon", defaults.epsilon))
+    if not 0.0 <= epsilon <= 1.0:
+        raise ValueError(f"adaptive_routing epsilon must be between 0 and 1, got {epsilon}")
+
+    raw_candidates = raw.get("candidates") or {}
+    if not isinstance(raw_candidates, Mapping):
+        raise ValueError("adaptive_routing candidates must map categories to lists of tools")
+    candidates: Dict[str, List[str]] = {}
+    for category, names in raw_candidates.items():
+        if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+            raise ValueError(f"adaptive_routing candidates for '{category}' must be a list of tool names")
+        unknown = [name for name in names if name.lower() not in tools]
+        if unknown:
+            raise ValueError(f"adaptive_routing candidates for '{category}' name unknown tools: {', '.join(unknown)}")
+        candidates[category] = [name.lower() for name in names]
 
+    return AdaptiveRoutingConfig(
+        strategy=strategy,
+        epsilon=epsilon,
+        exploration=float(raw.get("exploration", defaults.exploration)),
+        candidates=candidates,
+    )
 
-def _resolve_path(base_dir: Path, raw_path: str) -> Path:
+
+def _resolve_path(base_dir: Path, raw_path: str, missed: List[str] | None = None) -> Path:
     candidate = Path(raw_path)
     if not candidate.is_absolute():
         resolved = (base_dir / candidate).resolve()
         if resolved.exists():
             return resolved
+        if missed is not None:
+            missed.append(str(resolved))
         project_root = base_dir.parent
         alt = (project_root / candidate).resolve()
         if alt.exists():
@@ -71,3 +174,119 @@ def _resolve_path(base_dir: Path, raw_path: str) -> Path:
     if not candidate.exists():
         raise FileNotFoundError(f"Wrapper path '{candidate}' does not exist")
     return candidate
+
+
+# ----------------------------------------------------------------------
+# Snapshot cache
+# ----------------------------------------------------------------------
+def _snapshot_path(config_path: Path) -> Path:
+    key = hashlib.sha1(str(config_path.resolve()).encode("utf-8")).hexdigest()[:16]
+    return state_dir() / "config-cache" / f"{key}.json"
+
+
+def _file_stamp(path: Path | str) -> Optional[List[int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _store_snapshot(
+    snapshot_path: Path,
+    config_path: Path,
+    content: bytes,
+    config: OrchestraConfig,
+    probes: Mapping[str, Dict],
+) -> None:
+    wrappers = {
+        name: {
+            "path": str(tool.wrapper),
+            "stamp": _file_stamp(tool.wrapper),
+            "missed": probes.get(name, {}).get("missed", []),
+        }
+        for name, tool in config.tools.items()
+    }
+    snapshot = {
+        "version": SNAPSHOT_VERSION,
+        "config_path": str(config_path.resolve()),
+        "stamp": _file_stamp(config_path),
+        "sha256": hashlib.sha256(content).hexdigest(),
+        "wrappers": wrappers,
+        "config": {
+            "tools": {
+                name: {"capacity": tool.capacity, "fallbacks": list(tool.fallbacks)}
+                for name, tool in config.tools.items()
+            },
+            "routing": dict(config.routing),
+            "default_tool": config.default_tool,
+            "routing_mode": config.routing_mode,
+            "adaptive": asdict(config.adaptive),
+        },
+    }
+    _write_snapshot(snapshot_path, snapshot)
+
+
+def _write_snapshot(snapshot_path: Path, snapshot: Dict) -> None:
+    # Readers in other processes must never see a half-written snapshot, and
+    # writers (in other processes or threads) never share a temporary file.
+    try:
+        snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = snapshot_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_text(json.dumps(snapshot), encoding="utf-8")
+        os.replace(tmp_path, snapshot_path)
+    except OSError:
+        pass
+
+
+def _load_snapshot(snapshot_path: Path, config_path: Path) -> Optional[OrchestraConfig]:
+    try:
+        snapshot = json.loads(snapshot_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(snapshot, dict) or snapshot.get("version") != SNAPSHOT_VERSION:
+        return None
+
+    stamp = _file_stamp(config_path)
+    if stamp is None:
+        return None
+    if stamp != snapshot.get("stamp"):
+        # Touched but possibly unchanged: fall back to the content hash before reparsing.
+        try:
+            content = config_path.read_bytes()
+        except OSError:
+            return None
+        if hashlib.sha256(content).hexdigest() != snapshot.get("sha256"):
+            return None
+        snapshot["stamp"] = stamp
+        _write_snapshot(snapshot_path, snapshot)
+
+    # Anything malformed in the snapshot is a cache miss, never an error.
+    try:
+        wrappers = snapshot["wrappers"]
+        for entry in wrappers.values():
+            if _file_stamp(entry["path"]) != entry.get("stamp"):
+                return None
+            # A higher-precedence candidate appearing would change _resolve_path's answer.
+            if any(os.path.exists(missed) for missed in entry.get("missed", [])):
+                return None
+
+        data = snapshot["config"]
+        tools = {
+            name: ToolConfig(
+                name=name,
+                wrapper=Path(wrappers[name]["path"]),
+                capacity=int(values["capacity"]),
+                fallbacks=tuple(values["fallbacks"]),
+            )
+            for name, values in data["tools"].items()
+        }
+        return OrchestraConfig(
+            tools=tools,
+            routing=data["routing"],
+            default_tool=data["default_tool"],
+            routing_mode=data["routing_mode"],
+            adaptive=AdaptiveRoutingConfig(**data["adaptive"]),
+        )
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
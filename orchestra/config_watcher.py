@@ -0,0 +1,186 @@
+"""Watch configuration files and atomically swap in freshly loaded snapshots."""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Generic, Iterable, List, Optional, Tuple, TypeVar
+
+try:  # pragma: no cover - optional dependency
+    import watchfiles
+except ImportError:  # pragma: no cover - exercised when watchfiles is absent
+    watchfiles = None
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+Stamp = Optional[Tuple[int, int, int]]
+
+
+@dataclass(frozen=True)
+class ReloadEvent:
+    """Emitted after every reload attempt, successful or not."""
+
+    name: str
+    generation: int
+    changed: Tuple[str, ...]
+    load_seconds: float
+    detect_seconds: float
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _stamp(path: Path) -> Stamp:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+class ConfigWatcher(Generic[T]):
+    """Hold the current immutable config snapshot and replace it when its files change.
+
+    Readers take ``watcher.current`` once and keep using that object, so in-flight
+    work is never affected by a reload; new work picks up the new snapshot. The
+    swap is a single attribute assignment made only after the loader succeeds, and
+    a failed load keeps the previous snapshot. Changes are detected with inotify
+    through ``watchfiles`` when it is installed, otherwise by polling file stamps.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], T],
+        paths: Callable[[T], Iterable[Path]],
+        *,
+        name: str = "config",
+        interval: float = 1.0,
+        use_inotify: bool = True,
+    ) -> None:
+        self._loader = loader
+        self._paths = paths
+        self._name = name
+        self._interval = interval
+        self._use_inotify = use_inotify and watchfiles is not None
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[ReloadEvent], None]] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self._current: T = loader()
+        self._generation = 1
+        self._stamps = self._collect_stamps(self._current)
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    @property
+    def current(self) -> T:
+        return self._current
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def subscribe(self, listener: Callable[[ReloadEvent], None]) -> Callable[[], None]:
+        self._listeners.append(listener)
+
+        def unsubscribe() -> None:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+        return unsubscribe
+
+    def check(self) -> Optional[ReloadEvent]:
+        """Reload if any watched file changed since the last load."""
+
+        detect_start = time.perf_counter()
+        with self._lock:
+            current_stamps = {path: _stamp(Path(path)) for path in self._stamps}
+            changed = tuple(path for path, stamp in current_stamps.items() if stamp != self._stamps[path])
+            if not changed:
+                return None
+            return self._reload_locked(changed, time.perf_counter() - detect_start)
+
+    def reload(self) -> ReloadEvent:
+        """Reload unconditionally."""
+
+        with self._lock:
+            return self._reload_locked(tuple(self._stamps), 0.0)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        target = self._watch_inotify if self._use_inotify else self._watch_polling
+        self._thread = threading.Thread(target=target, name=f"{self._name}-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+    def _collect_stamps(self, snapshot: T) -> Dict[str, Stamp]:
+        return {str(path): _stamp(Path(path)) for path in self._paths(snapshot)}
+
+    def _reload_locked(self, changed: Tuple[str, ...], detect_seconds: float) -> ReloadEvent:
+        load_start = time.perf_counter()
+        error: Optional[str] = None
+        try:
+            snapshot = self._loader()
+        except Exception as exc:  # keep serving the previous snapshot
+            error = f"{type(exc).__name__}: {exc}"
+            # Remember the broken stamps so we retry only after the next edit.
+            self._stamps = {path: _stamp(Path(path)) for path in self._stamps}
+        else:
+            self._current = snapshot
+            self._generation += 1
+            self._stamps = self._collect_stamps(snapshot)
+        event = ReloadEvent(
+            name=self._name,
+            generation=self._generation,
+            changed=changed,
+            load_seconds=time.perf_counter() - load_start,
+            detect_seconds=detect_seconds,
+            error=error,
+        )
+        for listener in list(self._listeners):
+            try:
+                listener(event)
+            except Exception:  # one broken listener must not starve the others
+                logger.exception("%s reload listener %r failed", self._name, listener)
+        return event
+
+    def _watch_polling(self) -> None:
+        while not self._stop.wait(self._interval):
+            self.check()
+
+    def _watch_inotify(self) -> None:
+        while not self._stop.is_set():
+            directories = sorted({str(Path(path).parent) for path in self._stamps if Path(path).parent.exists()})
+            if not directories:
+                self._watch_polling()
+                return
+            watched = set(self._stamps)
+            for _changes in watchfiles.watch(
+                *directories,
+                stop_event=self._stop,
+                yield_on_timeout=True,
+                rust_timeout=int(self._interval * 1000),
+            ):
+                self.check()
+                if set(self._stamps) != watched:
+                    break  # the watched file set changed; re-register directories
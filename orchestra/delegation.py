@@ -0,0 +1,584 @@
+"""Delegation lifecycle shared by the CLI and the daemon's run supervisor.
+
+``plan_delegation`` resolves the agents (routing and load balancing) and the
+session names, and records the run as ``running`` so later plans count its
+slot; ``execute_delegation`` spawns the sessions, waits for or
+follows the secondary's output, summarises it and records the run. Progress
+is reported as event dicts through an ``emit`` callback, which the CLI prints
+and the daemon streams to clients.
+
+``submit_to_daemon`` is the client for the supervisor socket: it sends a
+``DelegationRequest`` as one NDJSON line and reads back an ``accepted`` (or
+``error``) line followed, unless detached, by the run's events.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, dataclass, fields
+from pathlib import Path
+from typing import Callable, Dict, List, Mapping, Optional
+
+from uuid import uuid4
+
+from .adaptive_router import AdaptiveRouter, RoutingDecision, compute_tool_stats
+from .config import ROUTING_MODES, OrchestraConfig
+from .load_balancer import CapacityError, choose_tool, collect_load
+from .resource_sampler import DEFAULT_INTERVAL, MIN_INTERVAL, ResourceSampler
+from .run_history import MAX_RUNS, RunHistory, state_dir
+from .search_index import SearchIndex
+from .summary import summarise
+from .task_router import detect_category
+from .tmux_manager import PaneCapture, TmuxError, TmuxManager
+from .tracing import Tracer, activate, current_tracer, mark, prune_traces, span, trace_path, traced
+from .transcripts import TRANSCRIPT_ROLES, TranscriptStore, TranscriptWriter
+
+
+Emit = Callable[[Dict], None]
+
+# Event types, in the order a run produces them.
+EVENT_TYPES = (
+    "routed",
+    "rerouted",
+    "queued",
+    "started",
+    "spawning",
+    "following",
+    "output",
+    "stream_ended",
+    "transcript",
+    "no_output",
+    "summary",
+    "trace",
+    "completed",
+)
+
+
+# Which panes ``execute_delegation`` keeps as compressed transcripts.
+TRANSCRIPT_MODES = ("none", "secondary", "all")
+# Lines of tmux history captured for a transcript when output was not followed.
+TRANSCRIPT_SCROLLBACK = 100_000
+
+
+class DelegationError(RuntimeError):
+    """A delegation that cannot be planned or submitted (shown to the user as is)."""
+
+
+@dataclass
+class DelegationRequest:
+    task: str
+    primary: str = "claude"
+    secondary: str = "auto"
+    wait: float = 5.0
+    follow: bool = False
+    follow_interval: float = 1.0
+    cleanup: bool = False
+    routing_mode: Optional[str] = None
+    transcript: str = "secondary"
+    sample_resources: bool = False
+    sample_interval: float = DEFAULT_INTERVAL
+    profile: bool = False
+
+    def __post_init__(self) -> None:
+        if any(ch in self.task for ch in ("\n", "\r")):
+            raise DelegationError("Task description must be a single line message")
+        if self.transcript not in TRANSCRIPT_MODES:
+            raise DelegationError(f"Unknown transcript mode '{self.transcript}'")
+        if self.sample_interval < MIN_INTERVAL:
+            raise DelegationError(f"Sample interval must be at least {MIN_INTERVAL} seconds")
+        if self.routing_mode is not None and self.routing_mode not in ROUTING_MODES:
+            raise DelegationError(f"Unknown routing mode '{self.routing_mode}'")
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "DelegationRequest":
+        known = {item.name for item in fields(cls)}
+        unknown = set(data) - known
+        if unknown:
+            raise DelegationError(f"Unknown request fields: {', '.join(sorted(unknown))}")
+        if not isinstance(data.get("task"), str):
+            raise DelegationError("'task' must be a string")
+        try:
+            return cls(**data)
+        except TypeError as exc:
+            raise DelegationError(str(exc)) from exc
+
+
+@dataclass
+class DelegationPlan:
+    run_id: str
+    request: DelegationRequest
+    primary: str
+    secondary: str
+    primary_wrapper: Path
+    secondary_wrapper: Path
+    category: Optional[str]
+    decision: RoutingDecision
+
+    @property
+    def primary_session(self) -> str:
+        return f"run-{self.run_id}-primary-{self.primary}"
+
+    @property
+    def secondary_session(self) -> str:
+        return f"run-{self.run_id}-secondary-{self.secondary}"
+
+    def command(self, wrapper: Path, *, agent: str, role: str) -> List[str]:
+        return [
+            "env",
+            f"ORCHESTRA_RUN_ID={self.run_id}",
+            f"ORCHESTRA_AGENT={agent}",
+            f"ORCHESTRA_ROLE={role}",
+            str(wrapper),
+            self.request.task,
+        ]
+
+
+@traced("delegate.plan")
+def plan_delegation(
+    request: DelegationRequest,
+    *,
+    manager: TmuxManager,
+    config: OrchestraConfig,
+    history: RunHistory,
+    emit: Emit,
+    pending: Optional[Mapping[str, str]] = None,
+) -> DelegationPlan:
+    primary_key = request.primary.lower()
+    try:
+        primary_wrapper = config.wrapper_for(primary_key)
+    except KeyError as exc:
+        raise DelegationError(str(exc)) from exc
+
+    category = detect_category(request.task)
+    # The load snapshot and the reservation of the chosen slot happen under one
+    # history lock, so concurrent planners (threads or other CLI processes) see
+    # each other's runs and cannot both take the last slot of a tool.
+    with history.locked():
+        recent_runs = history.list_runs(limit=MAX_RUNS)
+        if request.secondary.lower() == "auto":
+            decision = route_task(config, recent_runs, category, request.routing_mode or config.routing_mode)
+            secondary_key = decision.tool
+            emit({"type": "routed", "tool": secondary_key, "reason": decision.reason})
+        else:
+            secondary_key = request.secondary.lower()
+            decision = RoutingDecision(
+                tool=secondary_key,
+                category=category,
+                mode="explicit",
+                reason="requested with --to",
+            )
+
+        try:
+            session_names = manager.list_sessions()
+        except TmuxError:
+            session_names = []
+        loads = collect_load(session_names, recent_runs, config.capacities(), pending=pending)
+        decision.load = {tool: load.to_dict() for tool, load in loads.items()}
+
+        # Explicit requests never spill over; only auto-routed work moves to a fallback.
+        fallbacks = config.fallbacks_for(secondary_key) if decision.mode != "explicit" else ()
+        try:
+            balanced_key, load_reason = choose_tool(secondary_key, fallbacks, loads)
+        except CapacityError as exc:
+            raise DelegationError(str(exc)) from exc
+        if balanced_key != secondary_key:
+            decision.preferred = secondary_key
+            decision.tool = secondary_key = balanced_key
+            decision.reason = f"{decision.reason}; {load_reason}"
+            emit({"type": "rerouted", "tool": secondary_key, "reason": load_reason})
+
+        try:
+            secondary_wrapper = config.wrapper_for(secondary_key)
+        except KeyError as exc:
+            raise DelegationError(str(exc)) from exc
+
+        plan = DelegationPlan(
+            run_id=uuid4().hex[:8],
+            request=request,
+            primary=primary_key,
+            secondary=secondary_key,
+            primary_wrapper=primary_wrapper,
+            secondary_wrapper=secondary_wrapper,
+            category=category,
+            decision=decision,
+        )
+        _record_start(history, plan)
+    return plan
+
+
+def _record_start(history: RunHistory, plan: DelegationPlan) -> None:
+    history.start_run(
+        plan.run_id,
+        task=plan.request.task,
+        primary=plan.primary,
+        secondary=plan.secondary,
+        primary_session=plan.primary_session,
+        secondary_session=plan.secondary_session,
+        cleanup=plan.request.cleanup,
+        follow_mode=plan.request.follow,
+        category=plan.category,
+        routing=plan.decision.to_dict(),
+    )
+
+
+def route_task(
+    config: OrchestraConfig,
+    recent_runs: List[Dict],
+    category: Optional[str],
+    mode: str,
+) -> RoutingDecision:
+    static_choice = config.select_tool(category)
+    if mode != "adaptive":
+        return RoutingDecision(
+            tool=static_choice,
+            category=category,
+            mode="static",
+            reason=f"routing table entry for '{category or 'default'}'",
+        )
+
+    stats = compute_tool_stats(recent_runs)
+    try:
+        router = AdaptiveRouter(config.adaptive, stats)
+        return router.select(category, tools=list(config.tools), static_choice=static_choice)
+    except ValueError as exc:
+        raise DelegationError(str(exc)) from exc
+
+
+def execute_delegation(
+    plan: DelegationPlan,
+    *,
+    manager: TmuxManager,
+    history: RunHistory,
+    emit: Emit,
+    stop: Optional[threading.Event] = None,
+    transcripts: Optional[TranscriptStore] = None,
+    search_index: Optional[SearchIndex] = None,
+) -> Dict:
+    """Run ``plan`` to completion and record it; returns the ``completed`` event.
+
+    Setting ``stop`` ends a wait or follow early; the run is then recorded as
+    ``interrupted`` with whatever output was captured so far. The run is
+    marked ``failed`` in history if anything raises after it was recorded.
+    Pane output is kept in ``transcripts`` (per ``request.transcript``) before
+    any cleanup, and transcripts of runs that left the history are pruned.
+    The finished run is added to ``search_index``.
+
+    With ``request.profile`` (or a tracer already active, as in the CLI) the
+    run's spans are written to a Chrome trace file and their aggregates are
+    stored on the run record.
+    """
+
+    tracer = current_tracer()
+    if tracer is None and plan.request.profile:
+        tracer = Tracer()
+    with activate(tracer):
+        return _execute_delegation(
+            plan,
+            manager=manager,
+            history=history,
+            emit=emit,
+            stop=stop,
+            transcripts=transcripts,
+            search_index=search_index,
+            tracer=tracer,
+        )
+
+
+def _execute_delegation(
+    plan: DelegationPlan,
+    *,
+    manager: TmuxManager,
+    history: RunHistory,
+    emit: Emit,
+    stop: Optional[threading.Event],
+    transcripts: Optional[TranscriptStore],
+    search_index: Optional[SearchIndex],
+    tracer: Optional[Tracer],
+) -> Dict:
+    request = plan.request
+    if request.transcript == "none":
+        transcripts = None
+    elif transcripts is None:
+        transcripts = TranscriptStore()
+    # Re-recorded so the run's duration starts now rather than when it was planned.
+    _record_start(history, plan)
+    emit(
+        {
+            "type": "started",
+            "run_id": plan.run_id,
+            "primary": plan.primary,
+            "secondary": plan.secondary,
+            "primary_session": plan.primary_session,
+            "secondary_session": plan.secondary_session,
+        }
+    )
+
+    task_summary_dict: Optional[Dict] = None
+    sampler: Optional[ResourceSampler] = None
+    try:
+        for role, agent, wrapper, session in (
+            ("primary", plan.primary, plan.primary_wrapper, plan.primary_session),
+            ("secondary", plan.secondary, plan.secondary_wrapper, plan.secondary_session),
+        ):
+            emit({"type": "spawning", "role": role, "session": session})
+            with span("delegate.spawn", role=role, agent=agent):
+                manager.spawn_session(session, command=plan.command(wrapper, agent=agent, role=role), kill_existing=True)
+
+        if request.sample_resources:
+            sampler = _start_sampler(plan, manager)
+        spool = transcripts.writer(plan.run_id, "secondary") if transcripts is not None and request.follow else None
+        try:
+            with span("delegate.collect_output", follow=request.follow):
+                lines = _collect_output(plan, manager, emit, stop, spool)
+        finally:
+            if spool is not None:
+                spool.close()
+        resources = _stop_sampler(sampler) if sampler is not None else None
+        if transcripts is not None:
+            with span("delegate.transcripts"):
+                _store_transcripts(plan, manager, transcripts, emit, followed=request.follow)
+        if not lines:
+            emit({"type": "no_output"})
+
+        summary = summarise(lines)
+        task_summary_dict = {
+            "status": summary.status,
+            "files_modified": summary.files_modified,
+            "details": summary.details,
+        }
+        if resources is not None:
+            task_summary_dict["resources"] = resources
+        emit({"type": "summary", **task_summary_dict})
+
+        status = "interrupted" if stop is not None and stop.is_set() else summary.status
+        history.complete_run(plan.run_id, status=status, summary=task_summary_dict)
+        if transcripts is not None:
+            transcripts.prune(run["run_id"] for run in history.list_runs(limit=MAX_RUNS))
+        with span("delegate.index"):
+            _index_run(search_index if search_index is not None else SearchIndex(), history, plan.run_id, transcripts)
+        completed = {"type": "completed", "run_id": plan.run_id, "status": status}
+    except Exception as exc:
+        history.complete_run(plan.run_id, status="failed", summary=task_summary_dict)
+        if tracer is not None:
+            _save_trace(tracer, plan, history, emit)
+        emit({"type": "completed", "run_id": plan.run_id, "status": "failed", "error": str(exc)})
+        raise
+    finally:
+        if sampler is not None:
+            sampler.stop()
+        if request.cleanup:
+            with span("delegate.cleanup"):
+                for session in (plan.primary_session, plan.secondary_session):
+                    try:
+                        manager.kill_session(session)
+                    except TmuxError:
+                        pass
+    if tracer is not None:
+        _save_trace(tracer, plan, history, emit)
+    emit(completed)
+    return completed
+
+
+def _collect_output(
+    plan: DelegationPlan,
+    manager: TmuxManager,
+    emit: Emit,
+    stop: Optional[threading.Event],
+    spool: Optional[TranscriptWriter] = None,
+) -> List[str]:
+    request = plan.request
+    session = plan.secondary_session
+    capture: Optional[PaneCapture] = None
+    if request.follow:
+        streamed_lines: List[str] = []
+        emit({"type": "following", "session": session})
+        try:
+            for line in manager.iter_pane_lines(session, poll_interval=max(0.1, request.follow_interval), stop=stop):
+                if spool is not None:
+                    spool.write(line)
+                if line.strip():
+                    if not streamed_lines:
+                        mark("agent.first_output")
+                    emit({"type": "output", "line": line})
+                    streamed_lines.append(line)
+        except KeyboardInterrupt:
+            emit({"type": "stream_ended", "reason": "interrupted"})
+        except TmuxError as exc:
+            emit({"type": "stream_ended", "reason": "error", "error": str(exc)})
+        finally:
+            try:
+                capture = manager.capture_pane(session)
+            except TmuxError:
+                capture = None
+        return capture.lines if capture is not None else streamed_lines
+
+    if request.wait > 0:
+        with span("delegate.wait", seconds=request.wait):
+            if stop is not None:
+                stop.wait(request.wait)
+            else:
+                time.sleep(request.wait)
+    try:
+        return manager.capture_pane(session).lines
+    except TmuxError as exc:
+        raise DelegationError(str(exc)) from exc
+
+
+def _store_transcripts(
+    plan: DelegationPlan,
+    manager: TmuxManager,
+    transcripts: TranscriptStore,
+    emit: Emit,
+    *,
+    followed: bool,
+) -> None:
+    # A followed secondary was spooled line by line; everything else is
+    # captured from tmux history now, while the sessions still exist.
+    roles = [("secondary", plan.secondary_session)] if not followed else []
+    if plan.request.transcript == "all":
+        roles.append(("primary", plan.primary_session))
+    for role, session in roles:
+        try:
+            capture = manager.capture_pane(session, scrollback=TRANSCRIPT_SCROLLBACK)
+            with transcripts.writer(plan.run_id, role) as writer:
+                writer.write_lines(_trim_trailing_blank(capture.lines))
+        except (TmuxError, OSError) as exc:
+            # A missing transcript should not fail a run that otherwise finished.
+            emit({"type": "transcript", "role": role, "error": str(exc)})
+    for role in TRANSCRIPT_ROLES:
+        transcript = transcripts.open(plan.run_id, role)
+        if transcript is not None:
+            emit({"type": "transcript", "role": role, "lines": transcript.line_count})
+
+
+def _index_run(
+    search_index: SearchIndex,
+    history: RunHistory,
+    run_id: str,
+    transcripts: Optional[TranscriptStore],
+) -> None:
+    record = history.get_run(run_id)
+    if record is None:
+        return
+    try:
+        search_index.index_run(record, transcripts)
+    except sqlite3.Error:
+        pass  # the next ``orchestra run search`` syncs it from the history
+
+
+def _start_sampler(plan: DelegationPlan, manager: TmuxManager) -> ResourceSampler:
+    sampler = ResourceSampler(interval=plan.request.sample_interval)
+    for role, session in (("primary", plan.primary_session), ("secondary", plan.secondary_session)):
+        try:
+            pid = manager.pane_pid(session)
+        except TmuxError:
+            pid = None
+        if pid is not None:
+            sampler.track(role, pid)
+    sampler.start()
+    return sampler
+
+
+def _stop_sampler(sampler: ResourceSampler) -> Dict:
+    usage = sampler.stop()
+    return {
+        "interval": sampler.interval,
+        "overhead_cpu_seconds": round(sampler.overhead_seconds, 4),
+        "roles": {role: item.to_dict() for role, item in usage.items()},
+    }
+
+
+def _save_trace(tracer: Tracer, plan: DelegationPlan, history: RunHistory, emit: Emit) -> None:
+    path: Optional[Path] = trace_path(plan.run_id)
+    metadata = {"run_id": plan.run_id, "task": plan.request.task, "primary": plan.primary, "secondary": plan.secondary}
+    try:
+        tracer.write(path, metadata)
+        prune_traces(run["run_id"] for run in history.list_runs(limit=MAX_RUNS))
+    except OSError as exc:
+        # Like a missing transcript, a lost trace file should not fail the run.
+        emit({"type": "trace", "error": str(exc)})
+        path = None
+    aggregates = {"file": str(path) if path is not None else None, **tracer.aggregate()}
+    history.attach_trace(plan.run_id, aggregates)
+    if path is not None:
+        emit({"type": "trace", **aggregates})
+
+
+def _trim_trailing_blank(lines: List[str]) -> List[str]:
+    end = len(lines)
+    while end and not lines[end - 1].strip():
+        end -= 1
+    return lines[:end]
+
+
+# ----------------------------------------------------------------------
+# Supervisor socket client
+# ----------------------------------------------------------------------
+def default_socket_path() -> Path:
+    override = os.getenv("ORCHESTRA_DAEMON_SOCKET")
+    if override:
+        return Path(override).expanduser()
+    return state_dir() / "daemon.sock"
+
+
+def submit_to_daemon(
+    request: DelegationRequest,
+    *,
+    socket_path: Optional[Path] = None,
+    detach: bool = False,
+    on_event: Optional[Emit] = None,
+    timeout: float = 10.0,
+) -> str:
+    """Hand ``request`` to the daemon supervisor; returns the run id.
+
+    Unless ``detach`` is set, blocks until the run completes, passing every
+    event (including those emitted while planning) to ``on_event``.
+    """
+
+    path = socket_path or default_socket_path()
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(str(path))
+    except OSError as exc:
+        sock.close()
+        raise DelegationError(
+            f"Daemon supervisor not reachable at {path} ({exc.strerror or exc}); "
+            "start the daemon with DAEMON_SUPERVISOR=1"
+        ) from exc
+    with sock, sock.makefile("rwb") as stream:
+        message = {"op": "submit", "request": request.to_dict(), "detach": detach}
+        stream.write(json.dumps(message).encode("utf-8") + b"\n")
+        stream.flush()
+        reply = _read_message(stream)
+        if reply.get("op") == "error":
+            raise DelegationError(reply.get("error", "daemon rejected the run"))
+        run_id = reply["run_id"]
+        # Runs can wait for a slot and then take as long as the agent does.
+        sock.settimeout(None)
+        while not detach:
+            try:
+                message = _read_message(stream)
+            except DelegationError:
+                raise DelegationError(f"Lost the daemon connection while following run {run_id}") from None
+            event = message.get("event", {})
+            if on_event is not None:
+                on_event(event)
+            if event.get("type") == "completed":
+                break
+        return run_id
+
+
+def _read_message(stream) -> Dict:
+    line = stream.readline()
+    if not line:
+        raise DelegationError("Daemon closed the connection")
+    return json.loads(line)
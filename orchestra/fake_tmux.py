@@ -0,0 +1,250 @@
+"""In-memory tmux backend for tests and benchmarks.
+
+``FakeTmuxBackend`` plays the part of a tmux server without starting one:
+sessions have a single pane whose output comes from a ``FakeProgram`` (lines
+printed at a given rate, then an optional exit). Output is produced lazily
+from the backend's clock, so thousands of sessions cost nothing until they
+are captured, and a ``ManualClock`` makes runs fully deterministic.
+
+Panes behave like tmux's: a capture shows the last ``height`` lines (or
+fewer before the screen fills), ``start=-n`` adds up to ``n`` lines of
+history, and history beyond ``history_limit`` is dropped. When a program
+exits its session disappears, unless it was started with
+``remain_on_exit``, which leaves a dead pane that can still be captured.
+
+Usage::
+
+    backend = FakeTmuxBackend(lambda session, command: FakeProgram(["✅ completed"], rate=50))
+    manager = TmuxManager(backend=backend)
+"""
+
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from .tmux_backend import TmuxBackend, TmuxError, TmuxPane
+
+
+@dataclass
+class FakeProgram:
+    """What runs in a fake pane.
+
+    ``lines`` are printed ``rate`` per second (all at once when ``rate`` is
+    0). With ``exit_after`` set the program exits that many seconds after its
+    last line; without it, it keeps running until killed.
+    """
+
+    lines: Sequence[str] = ()
+    rate: float = 0.0
+    exit_after: Optional[float] = None
+    remain_on_exit: bool = False
+
+    def line_count_at(self, elapsed: float) -> int:
+        if self.rate <= 0:
+            return len(self.lines)
+        return min(len(self.lines), int(elapsed * self.rate))
+
+    @property
+    def exits_at(self) -> Optional[float]:
+        """Seconds after start at which the program exits, if it does."""
+
+        if self.exit_after is None:
+            return None
+        output_time = len(self.lines) / self.rate if self.rate > 0 else 0.0
+        return output_time + self.exit_after
+
+
+ProgramFactory = Callable[[str, Optional[str]], FakeProgram]
+
+
+def idle_shell(session_name: str, command: Optional[str]) -> FakeProgram:
+    """Default program: prints nothing and never exits."""
+
+    return FakeProgram()
+
+
+class ManualClock:
+    """A clock that only moves when told to."""
+
+    def __init__(self, start: float = 0.0) -> None:
+        self.now = start
+        self._lock = threading.Lock()
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        with self._lock:
+            self.now += seconds
+
+
+@dataclass
+class _Pane:
+    program: FakeProgram
+    started: float
+    pid: int
+    scroll: Deque[str]
+    printed: int = 0
+    dead: bool = False
+    # Typed keys not yet submitted with Enter.
+    pending_input: List[str] = field(default_factory=list)
+
+
+@dataclass
+class _Session:
+    name: str
+    command: Optional[str]
+    start_directory: Optional[str]
+    pane: _Pane
+
+
+class FakeTmuxBackend(TmuxBackend):
+    def __init__(
+        self,
+        programs: ProgramFactory = idle_shell,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+        height: int = 50,
+        history_limit: int = 2000,
+    ) -> None:
+        self.programs = programs
+        self.clock = clock
+        self.height = height
+        self.history_limit = history_limit
+        self._sessions: Dict[str, _Session] = {}
+        self._pids = itertools.count(10_000)
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # TmuxBackend
+    # ------------------------------------------------------------------
+    def has_session(self, session_name: str) -> bool:
+        with self._lock:
+            return self._live(session_name, self.clock()) is not None
+
+    def new_session(self, session_name: str, command: Optional[str], *, start_directory: Optional[str]) -> None:
+        program = self.programs(session_name, command)
+        with self._lock:
+            now = self.clock()
+            if self._live(session_name, now) is not None:
+                raise TmuxError(f"duplicate session: {session_name}")
+            pane = _Pane(
+                program=program,
+                started=now,
+                pid=next(self._pids),
+                scroll=deque(maxlen=self.height + self.history_limit),
+            )
+            self._sessions[session_name] = _Session(session_name, command, start_directory, pane)
+
+    def list_sessions(self) -> List[str]:
+        with self._lock:
+            now = self.clock()
+            return [name for name in list(self._sessions) if self._live(name, now) is not None]
+
+    def kill_session(self, session_name: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_name, None)
+
+    def attach_session(self, session_name: str) -> None:
+        raise TmuxError("cannot attach to a fake tmux session")
+
+    def pane(self, session_name: str, pane: str) -> TmuxPane:
+        with self._lock:
+            session = self._live(session_name, self.clock())
+            if session is None:
+                raise TmuxError(f"tmux session '{session_name}' not found")
+            if int(pane) != 0:
+                raise TmuxError(f"pane index {pane} invalid for session '{session_name}'")
+            return _FakePaneHandle(self, session)
+
+    # ------------------------------------------------------------------
+    # Simulation controls
+    # ------------------------------------------------------------------
+    def kill_process(self, session_name: str) -> None:
+        """Make the pane's program die now, as if it crashed."""
+
+        with self._lock:
+            session = self._live(session_name, self.clock())
+            if session is None:
+                raise TmuxError(f"tmux session '{session_name}' not found")
+            self._exit(session)
+
+    def command(self, session_name: str) -> Optional[str]:
+        with self._lock:
+            session = self._sessions.get(session_name)
+            return session.command if session is not None else None
+
+    # ------------------------------------------------------------------
+    # Internal helpers (called with the lock held)
+    # ------------------------------------------------------------------
+    def _live(self, session_name: str, now: float) -> Optional[_Session]:
+        session = self._sessions.get(session_name)
+        if session is not None:
+            self._advance(session, now)
+        # An exited program without remain-on-exit has taken its session with it.
+        return self._sessions.get(session_name)
+
+    def _advance(self, session: _Session, now: float) -> None:
+        pane = session.pane
+        if pane.dead:
+            return
+        program = pane.program
+        elapsed = now - pane.started
+        due = program.line_count_at(elapsed)
+        if due > pane.printed:
+            pane.scroll.extend(program.lines[pane.printed : due])
+            pane.printed = due
+        exits_at = program.exits_at
+        if exits_at is not None and elapsed >= exits_at:
+            self._exit(session)
+
+    def _exit(self, session: _Session) -> None:
+        session.pane.dead = True
+        if session.pane.program.remain_on_exit:
+            session.pane.scroll.append("")
+            session.pane.scroll.append("Pane is dead")
+        else:
+            self._sessions.pop(session.name, None)
+
+
+class _FakePaneHandle(TmuxPane):
+    def __init__(self, backend: FakeTmuxBackend, session: _Session) -> None:
+        self._backend = backend
+        self._session = session
+
+    def _attached(self) -> _Pane:
+        # Like a libtmux pane whose session was killed: later calls fail.
+        session = self._backend._live(self._session.name, self._backend.clock())
+        if session is not self._session:
+            raise TmuxError(f"can't find pane: {self._session.name}:0.0")
+        return session.pane
+
+    def capture(self, start: Optional[int] = None) -> List[str]:
+        with self._backend._lock:
+            pane = self._attached()
+            history = -start if start is not None and start < 0 else 0
+            keep = self._backend.height + history
+            return list(itertools.islice(pane.scroll, max(0, len(pane.scroll) - keep), None))
+
+    def send_keys(self, keys: Tuple[str, ...], *, enter: bool) -> None:
+        with self._backend._lock:
+            pane = self._attached()
+            pane.pending_input.extend(keys)
+            if enter:
+                # The shell echoes what was typed; programs do not read it.
+                pane.scroll.append("".join(pane.pending_input))
+                pane.pending_input.clear()
+
+    def is_dead(self) -> bool:
+        with self._backend._lock:
+            self._backend._advance(self._session, self._backend.clock())
+            return self._session.pane.dead
+
+    def pid(self) -> Optional[int]:
+        with self._backend._lock:
+            return self._attached().pid
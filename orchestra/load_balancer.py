@@ -0,0 +1,140 @@
+"""Spread delegations across tool slots based on live tmux sessions and run history."""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+from .adaptive_router import parse_timestamp, run_duration
+
+
+SESSION_PREFIX = "run-"
+QUEUE_STALE_AFTER = timedelta(minutes=10)
+LATENCY_WINDOW = 5
+
+
+class CapacityError(RuntimeError):
+    """Raised when no eligible tool has a free slot."""
+
+
+@dataclass
+class ToolLoad:
+    tool: str
+    capacity: int
+    active: int = 0
+    queued: int = 0
+    recent_latency: Optional[float] = None
+
+    @property
+    def in_use(self) -> int:
+        return self.active + self.queued
+
+    @property
+    def utilisation(self) -> float:
+        return self.in_use / self.capacity if self.capacity > 0 else float("inf")
+
+    @property
+    def has_capacity(self) -> bool:
+        return self.in_use < self.capacity
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def parse_run_session(name: str) -> Optional[Tuple[str, str, str]]:
+    """Split ``run-<id>-<role>-<tool>`` into ``(run_id, role, tool)``."""
+
+    if not name.startswith(SESSION_PREFIX):
+        return None
+    parts = name[len(SESSION_PREFIX):].split("-", 2)
+    if len(parts) != 3 or not all(parts):
+        return None
+    return parts[0], parts[1], parts[2]
+
+
+def collect_load(
+    session_names: Iterable[str],
+    runs: Iterable[Mapping],
+    capacities: Mapping[str, int],
+    *,
+    pending: Optional[Mapping[str, str]] = None,
+    now: Optional[datetime] = None,
+) -> Dict[str, ToolLoad]:
+    """Build a load snapshot for every configured tool.
+
+    ``active`` counts live secondary sessions. ``queued`` counts runs recorded as
+    running recently whose secondary session has not appeared yet (spawn in
+    progress), plus the runs in ``pending`` (run id -> tool) that the caller
+    has planned but not started, however long they have waited.
+    ``recent_latency`` is the mean duration of the latest completed runs.
+    """
+
+    loads = {tool: ToolLoad(tool=tool, capacity=capacity) for tool, capacity in capacities.items()}
+    live_runs = set()
+    for name in session_names:
+        parsed = parse_run_session(name)
+        if parsed is None:
+            continue
+        run_id, role, tool = parsed
+        live_runs.add(run_id)
+        if role == "secondary" and tool in loads:
+            loads[tool].active += 1
+
+    cutoff = (now or datetime.now(timezone.utc)) - QUEUE_STALE_AFTER
+    latencies: Dict[str, List[float]] = {}
+    queued_runs = set()
+    for run in sorted(runs, key=lambda item: item.get("started_at", ""), reverse=True):
+        tool = run.get("secondary")
+        if tool not in loads:
+            continue
+        if run.get("status") == "running":
+            started = parse_timestamp(run.get("started_at"))
+            if run.get("run_id") not in live_runs and started is not None and started >= cutoff:
+                loads[tool].queued += 1
+                queued_runs.add(run.get("run_id"))
+            continue
+        samples = latencies.setdefault(tool, [])
+        duration = run_duration(run)
+        if duration is not None and len(samples) < LATENCY_WINDOW:
+            samples.append(duration)
+
+    for run_id, tool in (pending or {}).items():
+        if tool in loads and run_id not in live_runs and run_id not in queued_runs:
+            loads[tool].queued += 1
+
+    for tool, samples in latencies.items():
+        if samples:
+            loads[tool].recent_latency = sum(samples) / len(samples)
+    return loads
+
+
+def choose_tool(
+    preferred: str,
+    fallbacks: Iterable[str],
+    loads: Mapping[str, ToolLoad],
+) -> Tuple[str, str]:
+    """Keep ``preferred`` while it has a free slot, otherwise spill to the least-loaded fallback."""
+
+    preferred_load = loads.get(preferred)
+    if preferred_load is None or preferred_load.has_capacity:
+        return preferred, f"'{preferred}' has a free slot"
+
+    eligible = [loads[tool] for tool in fallbacks if tool in loads and loads[tool].has_capacity]
+    if not eligible:
+        raise CapacityError(
+            f"Tool '{preferred}' is at capacity ({preferred_load.in_use}/{preferred_load.capacity}) "
+            "and no fallback tool has a free slot"
+        )
+
+    best = min(
+        eligible,
+        key=lambda load: (
+            load.utilisation,
+            load.recent_latency if load.recent_latency is not None else float("inf"),
+        ),
+    )
+    return best.tool, (
+        f"'{preferred}' at capacity ({preferred_load.in_use}/{preferred_load.capacity}); "
+        f"spilled to least-loaded fallback '{best.tool}'"
+    )
@@ -0,0 +1,229 @@
+"""Sample the CPU, memory and I/O used by the processes behind run panes.
+
+``ResourceSampler`` follows one process tree per role, rooted at the pane's
+``#{pane_pid}``, and reads ``/proc`` on a background thread every
+``interval`` seconds (Linux only; elsewhere it records nothing). Children are
+found through ``/proc/<pid>/task/<tid>/children`` when the kernel provides
+it, otherwise by one scan of ``/proc/*/stat`` per sample.
+
+Totals are the last values seen for every process that was part of the tree,
+keyed by pid and start time so a reused pid is counted as a new process.
+Work done by a process that starts and exits between two samples is missed,
+and ``peak_rss_bytes`` is the largest tree RSS at a sample, not a kernel
+high-water mark. The sampler's own CPU time is reported with the results so
+its overhead can be compared against what it measured.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+DEFAULT_INTERVAL = 2.0
+MIN_INTERVAL = 0.5
+# Trees larger than this are truncated (breadth first) to bound each sample.
+MAX_PROCESSES = 256
+
+try:
+    _CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):  # non-POSIX
+    _CLOCK_TICKS, _PAGE_SIZE = 100, 4096
+
+ProcessKey = Tuple[int, int]  # pid, start time in clock ticks
+
+
+@dataclass
+class ResourceUsage:
+    cpu_seconds: float = 0.0
+    peak_rss_bytes: int = 0
+    read_bytes: int = 0
+    write_bytes: int = 0
+    processes: int = 0
+    samples: int = 0
+
+    def to_dict(self) -> Dict:
+        data = asdict(self)
+        data["cpu_seconds"] = round(self.cpu_seconds, 3)
+        return data
+
+
+@dataclass
+class _ProcessSample:
+    ppid: int
+    cpu_ticks: int
+    rss_pages: int
+    read_bytes: int = 0
+    write_bytes: int = 0
+
+
+class _Tree:
+    def __init__(self, pid: int) -> None:
+        self.root = pid
+        self.seen: Dict[ProcessKey, _ProcessSample] = {}
+        self.peak_rss_bytes = 0
+        self.samples = 0
+
+    def usage(self) -> ResourceUsage:
+        return ResourceUsage(
+            cpu_seconds=sum(proc.cpu_ticks for proc in self.seen.values()) / _CLOCK_TICKS,
+            peak_rss_bytes=self.peak_rss_bytes,
+            read_bytes=sum(proc.read_bytes for proc in self.seen.values()),
+            write_bytes=sum(proc.write_bytes for proc in self.seen.values()),
+            processes=len(self.seen),
+            samples=self.samples,
+        )
+
+
+class ResourceSampler:
+    def __init__(self, *, interval: float = DEFAULT_INTERVAL, proc_root: Path = Path("/proc")) -> None:
+        self.interval = max(MIN_INTERVAL, interval)
+        self.proc_root = proc_root
+        self._trees: Dict[str, _Tree] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.overhead_seconds = 0.0
+        self._children_files = (proc_root / "self" / "task" / str(os.getpid()) / "children").exists()
+
+    @property
+    def available(self) -> bool:
+        return self.proc_root.is_dir()
+
+    def track(self, role: str, pid: int) -> None:
+        with self._lock:
+            self._trees[role] = _Tree(pid)
+
+    def start(self) -> None:
+        if self._thread is None and self.available:
+            self._thread = threading.Thread(target=self._run, name="resource-sampler", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> Dict[str, ResourceUsage]:
+        """Stop sampling (after one last sample) and return the usage per role.
+
+        Calling it again returns the same totals without sampling.
+        """
+
+        if not self._stop.is_set():
+            self._stop.set()
+            if self._thread is not None:
+                self._thread.join(self.interval + 1.0)
+                self._thread = None
+            elif self.available:
+                self.sample()
+        with self._lock:
+            return {role: tree.usage() for role, tree in self._trees.items()}
+
+    def _run(self) -> None:
+        while True:
+            self.sample()
+            if self._stop.wait(self.interval):
+                break
+        self.sample()
+
+    def sample(self) -> None:
+        started = time.thread_time()
+        with self._lock:
+            trees = list(self._trees.values())
+        table = None if self._children_files else self._scan_parents()
+        for tree in trees:
+            rss_pages = 0
+            for pid in self._tree_pids(tree.root, table):
+                proc = self._read_process(pid)
+                if proc is None:
+                    continue
+                key, sample = proc
+                tree.seen[key] = sample
+                rss_pages += sample.rss_pages
+            tree.peak_rss_bytes = max(tree.peak_rss_bytes, rss_pages * _PAGE_SIZE)
+            tree.samples += 1
+        self.overhead_seconds += time.thread_time() - started
+
+    # ------------------------------------------------------------------
+    # /proc readers
+    # ------------------------------------------------------------------
+    def _tree_pids(self, root: int, table: Optional[Dict[int, List[int]]]) -> List[int]:
+        pids = [root]
+        index = 0
+        while index < len(pids) and len(pids) < MAX_PROCESSES:
+            pid = pids[index]
+            index += 1
+            children = table.get(pid, []) if table is not None else self._children(pid)
+            pids.extend(children[: MAX_PROCESSES - len(pids)])
+        return pids
+
+    def _children(self, pid: int) -> List[int]:
+        children: List[int] = []
+        try:
+            for task in (self.proc_root / str(pid) / "task").iterdir():
+                children.extend(int(child) for child in (task / "children").read_text().split())
+        except (OSError, ValueError):
+            pass
+        return children
+
+    def _scan_parents(self) -> Dict[int, List[int]]:
+        table: Dict[int, List[int]] = {}
+        for entry in self.proc_root.iterdir():
+            if entry.name.isdigit():
+                fields = _stat_fields(entry / "stat")
+                if fields is not None:
+                    table.setdefault(int(fields[1]), []).append(int(entry.name))
+        return table
+
+    def _read_process(self, pid: int) -> Optional[Tuple[ProcessKey, _ProcessSample]]:
+        fields = _stat_fields(self.proc_root / str(pid) / "stat")
+        if fields is None:
+            return None
+        # Fields after the command name, counted from the state field (stat(5) field 3).
+        sample = _ProcessSample(
+            ppid=int(fields[1]),
+            cpu_ticks=int(fields[11]) + int(fields[12]),
+            rss_pages=int(fields[21]),
+        )
+        sample.read_bytes, sample.write_bytes = _io_bytes(self.proc_root / str(pid) / "io")
+        return (pid, int(fields[19])), sample
+
+
+def _stat_fields(path: Path) -> Optional[List[str]]:
+    try:
+        raw = path.read_text()
+    except OSError:
+        return None
+    # The command name is in parentheses and may itself contain spaces or ')'.
+    return raw[raw.rfind(")") + 2 :].split()
+
+
+def _io_bytes(path: Path) -> Tuple[int, int]:
+    values = {}
+    try:
+        for line in path.read_text().splitlines():
+            key, _, value = line.partition(":")
+            values[key] = value
+        return int(values.get("read_bytes", 0)), int(values.get("write_bytes", 0))
+    except (OSError, ValueError):
+        return 0, 0
+
+
+def summarise_usage(runs: Iterable[Dict]) -> Dict[str, Dict]:
+    """Totals per agent over the ``resources`` stored in run summaries."""
+
+    totals: Dict[str, Dict] = {}
+    for run in runs:
+        resources = (run.get("summary") or {}).get("resources") or {}
+        for role, usage in resources.get("roles", {}).items():
+            agent = run.get(role) or role
+            entry = totals.setdefault(
+                agent, {"runs": 0, "cpu_seconds": 0.0, "peak_rss_bytes": 0, "read_bytes": 0, "write_bytes": 0}
+            )
+            entry["runs"] += 1
+            entry["cpu_seconds"] += usage.get("cpu_seconds", 0.0)
+            entry["peak_rss_bytes"] = max(entry["peak_rss_bytes"], usage.get("peak_rss_bytes", 0))
+            entry["read_bytes"] += usage.get("read_bytes", 0)
+            entry["write_bytes"] += usage.get("write_bytes", 0)
+    return totals
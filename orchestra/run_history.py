@@ -4,18 +4,23 @@ from __future__ import annotations
 
 import json
 import os
+from contextlib import contextmanager
 from dataclasses import asdict, dataclass
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
 
 from filelock import FileLock
 
+from .tracing import span, traced
+
 
 MAX_RUNS = 50
 
 
-def _state_dir() -> Path:
+def state_dir() -> Path:
+    """Directory for run history and everything kept alongside it (``ORCHESTRA_STATE_DIR``)."""
+
     override = os.getenv("ORCHESTRA_STATE_DIR")
     if override:
         return Path(override).expanduser()
@@ -23,7 +28,7 @@ def _state_dir() -> Path:
 
 
 def _history_path() -> Path:
-    return _state_dir() / "runs.json"
+    return state_dir() / "runs.json"
 
 
 def _utcnow_iso() -> str:
@@ -44,6 +49,14 @@ class RunRecord:
     follow_mode: bool
     summary: Optional[Dict] = None
     completed_at: Optional[str] = None
+    category: Optional[str] = None
+    routing: Optional[Dict] = None
+    trace: Optional[Dict] = None
+
+
+class HistorySnapshot(NamedTuple):
+    version: str
+    runs: List[Dict]
 
 
 class RunHistory:
@@ -54,6 +67,7 @@ class RunHistory:
     # ------------------------------------------------------------------
     # CRUD helpers
     # ------------------------------------------------------------------
+    @traced("history.start_run")
     def start_run(
         self,
         run_id: str,
@@ -65,6 +79,8 @@ class RunHistory:
         secondary_session: str,
         cleanup: bool,
         follow_mode: bool,
+        category: Optional[str] = None,
+        routing: Optional[Dict] = None,
     ) -> None:
         record = RunRecord(
             run_id=run_id,
@@ -77,9 +93,12 @@ class RunHistory:
             secondary_session=secondary_session,
             cleanup=cleanup,
             follow_mode=follow_mode,
+            category=category,
+            routing=routing,
         )
         self._persist(record)
 
+    @traced("history.complete_run")
     def complete_run(
         self,
         run_id: str,
@@ -87,7 +106,7 @@ class RunHistory:
         status: str,
         summary: Optional[Dict] = None,
     ) -> None:
-        with self._lock:
+        with self.locked():
             runs = self._read()
             for entry in runs:
                 if entry["run_id"] == run_id:
@@ -114,30 +133,79 @@ class RunHistory:
                 )
             self._write(runs)
 
+    @traced("history.list_runs")
     def list_runs(self, *, limit: int = 10) -> List[Dict]:
-        with self._lock:
+        with self.locked():
             runs = list(self._read())
         runs.sort(key=lambda item: item.get("started_at", ""), reverse=True)
         return runs[:limit]
 
+    @traced("history.get_run")
     def get_run(self, run_id: str) -> Optional[Dict]:
-        with self._lock:
+        with self.locked():
             runs = list(self._read())
         for entry in runs:
             if entry["run_id"] == run_id:
                 return entry
         return None
 
+    def attach_trace(self, run_id: str, trace: Dict) -> None:
+        """Store the span aggregates of a profiled run on its record."""
+
+        with self.locked():
+            runs = self._read()
+            for entry in runs:
+                if entry["run_id"] == run_id:
+                    entry["trace"] = trace
+                    self._write(runs)
+                    break
+
+    def version(self) -> str:
+        """Cheap fingerprint of the history file; changes on every rewrite.
+
+        Only stats the file (no lock, no parse), so callers can answer
+        conditional requests without reading the runs.
+        """
+
+        try:
+            stat = self._path.stat()
+        except FileNotFoundError:
+            return "0"
+        return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+    @traced("history.snapshot")
+    def snapshot(self) -> HistorySnapshot:
+        """All runs, newest first, together with the version they were read at."""
+
+        with self.locked():
+            version = self.version()
+            runs = list(self._read())
+        runs.sort(key=lambda item: item.get("started_at", ""), reverse=True)
+        return HistorySnapshot(version, runs)
+
     # ------------------------------------------------------------------
     # Internal helpers
     # ------------------------------------------------------------------
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        """Hold the history file lock; re-entrant within a thread."""
+
+        # Waiting for the file lock is its own span: other runs hold it while they rewrite.
+        with span("history.lock_wait"):
+            self._lock.acquire()
+        try:
+            yield
+        finally:
+            self._lock.release()
+
     def _persist(self, record: RunRecord) -> None:
-        with self._lock:
+        with self.locked():
             runs = self._read()
             runs = [entry for entry in runs if entry["run_id"] != record.run_id]
             runs.append(asdict(record))
             self._write(runs)
 
+    @traced("history.read")
     def _read(self) -> List[Dict]:
         if not self._path.exists():
             return []
@@ -150,6 +218,7 @@ class RunHistory:
             pass
         return []
 
+    @traced("history.write")
     def _write(self, runs: Iterable[Dict]) -> None:
         directory = self._path.parent
         directory.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,200 @@
+"""Full-text search over delegate runs (SQLite FTS5).
+
+Every finished run gets one row holding its task, summary lines and
+transcript, ranked with ``bm25`` (task matches weigh most). Runs are indexed
+as they complete; ``sync`` catches up on runs recorded before the index
+existed or while indexing failed, and ``rebuild`` starts over from the run
+history and the transcripts on disk. Rows outlive the capped run history, so
+searches keep reaching runs whose records have been rotated out.
+"""
+
+from __future__ import annotations
+
+import re
+import sqlite3
+from contextlib import closing
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from .run_history import MAX_RUNS, RunHistory, state_dir
+from .transcripts import TranscriptStore
+
+
+# Only the newest lines of very long transcripts are indexed.
+MAX_TRANSCRIPT_LINES = 20_000
+# bm25 column weights: task, summary, transcript.
+COLUMN_WEIGHTS = (5.0, 2.0, 1.0)
+SNIPPET_TOKENS = 12
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL UNIQUE,
+    started_at TEXT,
+    completed_at TEXT,
+    status TEXT,
+    secondary TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_started_at ON runs (started_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS run_text USING fts5(task, summary, transcript, tokenize = 'unicode61');
+"""
+
+_DURATION = re.compile(r"^(\d+)([mhdw])$")
+_DURATION_UNITS = {"m": "minutes", "h": "hours", "d": "days", "w": "weeks"}
+
+
+class SearchHit(NamedTuple):
+    run_id: str
+    started_at: str
+    status: str
+    secondary: str
+    task: str
+    snippet: str
+    score: float
+
+
+def _index_path() -> Path:
+    return state_dir() / "search.db"
+
+
+class SearchIndex:
+    def __init__(self, path: Path | None = None) -> None:
+        self._path = path or _index_path()
+        self._ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        # Several CLI processes and the daemon may index at once.
+        connection = sqlite3.connect(str(self._path), timeout=10)
+        if not self._ready:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(_SCHEMA)
+            self._ready = True
+        return connection
+
+    # ------------------------------------------------------------------
+    # Indexing
+    # ------------------------------------------------------------------
+    def index_run(self, record: Dict, transcripts: Optional[TranscriptStore] = None) -> None:
+        """Add or replace ``record`` (a run history entry) and its transcript."""
+
+        transcript = ""
+        if transcripts is not None:
+            stored = transcripts.open(record["run_id"], "secondary")
+            if stored is not None:
+                transcript = "\n".join(stored.tail(MAX_TRANSCRIPT_LINES))
+        summary = "\n".join((record.get("summary") or {}).get("details") or ())
+        with closing(self._connect()) as connection, connection:
+            _delete(connection, record["run_id"])
+            cursor = connection.execute(
+                "INSERT INTO runs (run_id, started_at, completed_at, status, secondary) VALUES (?, ?, ?, ?, ?)",
+                (
+                    record["run_id"],
+                    record.get("started_at", ""),
+                    record.get("completed_at"),
+                    record.get("status", "unknown"),
+                    record.get("secondary", ""),
+                ),
+            )
+            connection.execute(
+                "INSERT INTO run_text (rowid, task, summary, transcript) VALUES (?, ?, ?, ?)",
+                (cursor.lastrowid, record.get("task", ""), summary, transcript),
+            )
+
+    def sync(self, history: RunHistory, transcripts: Optional[TranscriptStore] = None) -> int:
+        """Index finished runs that are missing or changed; returns how many."""
+
+        with closing(self._connect()) as connection:
+            indexed = dict(connection.execute("SELECT run_id, completed_at FROM runs"))
+        stale = [
+            run
+            for run in history.list_runs(limit=MAX_RUNS)
+            if run.get("completed_at") and indexed.get(run["run_id"], "") != run["completed_at"]
+        ]
+        for run in stale:
+            self.index_run(run, transcripts)
+        return len(stale)
+
+    def rebuild(self, history: RunHistory, transcripts: Optional[TranscriptStore] = None) -> int:
+        with closing(self._connect()) as connection, connection:
+            connection.execute("DELETE FROM runs")
+            connection.execute("DELETE FROM run_text")
+        count = self.sync(history, transcripts)
+        with closing(self._connect()) as connection:
+            connection.execute("INSERT INTO run_text (run_text) VALUES ('optimize')")
+            connection.commit()
+        return count
+
+    def __len__(self) -> int:
+        with closing(self._connect()) as connection:
+            return connection.execute("SELECT count(*) FROM runs").fetchone()[0]
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def search(
+        self,
+        query: str,
+        *,
+        limit: int = 20,
+        since: Optional[datetime] = None,
+        status: Optional[str] = None,
+        raw: bool = False,
+    ) -> List[SearchHit]:
+        """Best matches first. ``query`` words must all appear unless ``raw``
+        passes it through as an FTS5 expression (``OR``, ``NEAR``, ``prefix*``).
+        """
+
+        expression = query if raw else quote_query(query)
+        if not expression:
+            return []
+        sql = [
+            "SELECT runs.run_id, runs.started_at, runs.status, runs.secondary, run_text.task,",
+            f"snippet(run_text, -1, '[', ']', '…', {SNIPPET_TOKENS}),",
+            "bm25(run_text, ?, ?, ?) AS score",
+            "FROM run_text JOIN runs ON runs.id = run_text.rowid",
+            "WHERE run_text MATCH ?",
+        ]
+        params: List = [*COLUMN_WEIGHTS, expression]
+        if since is not None:
+            sql.append("AND runs.started_at >= ?")
+            params.append(since.astimezone(timezone.utc).isoformat())
+        if status is not None:
+            sql.append("AND runs.status = ?")
+            params.append(status)
+        sql.append("ORDER BY score LIMIT ?")
+        params.append(limit)
+        try:
+            with closing(self._connect()) as connection:
+                rows = connection.execute(" ".join(sql), params).fetchall()
+        except sqlite3.OperationalError as exc:
+            if raw and "fts5" in str(exc):
+                raise ValueError(f"Invalid search expression: {exc}") from exc
+            raise
+        return [SearchHit(*row) for row in rows]
+
+
+def quote_query(query: str) -> str:
+    """Turn free text into an FTS5 query that matches every word literally."""
+
+    terms = query.split()
+    return " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def parse_since(value: str, *, now: Optional[datetime] = None) -> datetime:
+    """``7d``/``12h``/``30m``/``2w`` ago, or an ISO date or timestamp."""
+
+    match = _DURATION.match(value.strip())
+    if match:
+        amount, unit = match.groups()
+        return (now or datetime.now(timezone.utc)) - timedelta(**{_DURATION_UNITS[unit]: int(amount)})
+    parsed = datetime.fromisoformat(value.strip())
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _delete(connection: sqlite3.Connection, run_id: str) -> None:
+    row = connection.execute("SELECT id FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+    if row is not None:
+        connection.execute("DELETE FROM run_text WHERE rowid = ?", row)
+        connection.execute("DELETE FROM runs WHERE id = ?", row)
@@ -6,6 +6,8 @@ import re
 from dataclasses import dataclass
 from typing import Iterable, List
 
+from .tracing import traced
+
 
 @dataclass
 class TaskSummary:
@@ -28,6 +30,7 @@ ERROR_PATTERNS = (
 FILE_PATTERN = re.compile(r"modified:\s+(?P<path>.+)")
 
 
+@traced("summary.summarise")
 def summarise(lines: Iterable[str]) -> TaskSummary:
     material = list(lines)
     joined = "\n".join(material)
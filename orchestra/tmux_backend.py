@@ -0,0 +1,199 @@
+"""Backends that carry out the tmux operations ``TmuxManager`` builds on.
+
+``TmuxBackend`` is the abstract interface: a handful of primitives on sessions and
+panes, with failures raised as ``TmuxError``. ``LibtmuxBackend`` talks to a
+real tmux server through libtmux; ``orchestra.fake_tmux.FakeTmuxBackend``
+keeps everything in memory for tests and benchmarks.
+"""
+
+from __future__ import annotations
+
+import time
+from abc import ABC, abstractmethod
+from typing import Any, List, Optional, Tuple
+
+from libtmux import Server
+from libtmux.exc import LibTmuxException
+from libtmux.pane import Pane
+
+
+class TmuxError(RuntimeError):
+    """Wrapped libtmux errors for a cleaner public interface."""
+
+
+class TmuxPane(ABC):
+    """Handle on one pane, looked up once and reused (e.g. while following output)."""
+
+    @abstractmethod
+    def capture(self, start: Optional[int] = None) -> List[str]:
+        """Visible lines, plus ``-start`` lines of history when ``start`` is negative."""
+
+    @abstractmethod
+    def send_keys(self, keys: Tuple[str, ...], *, enter: bool) -> None:
+        ...
+
+    @abstractmethod
+    def is_dead(self) -> bool:
+        """Whether the pane's process has exited (only with ``remain-on-exit``)."""
+
+    @abstractmethod
+    def pid(self) -> Optional[int]:
+        ...
+
+
+class TmuxBackend(ABC):
+    """Primitive tmux operations on sessions; panes are addressed by index."""
+
+    @abstractmethod
+    def has_session(self, session_name: str) -> bool:
+        ...
+
+    @abstractmethod
+    def new_session(self, session_name: str, command: Optional[str], *, start_directory: Optional[str]) -> None:
+        """Start a detached session running ``command`` (a shell string) or the default shell."""
+
+    @abstractmethod
+    def list_sessions(self) -> List[str]:
+        ...
+
+    @abstractmethod
+    def kill_session(self, session_name: str) -> None:
+        """Kill the session; a missing session is not an error."""
+
+    @abstractmethod
+    def attach_session(self, session_name: str) -> None:
+        ...
+
+    @abstractmethod
+    def pane(self, session_name: str, pane: str) -> TmuxPane:
+        """Look up a pane, raising ``TmuxError`` if the session or pane does not exist."""
+
+
+class LibtmuxBackend(TmuxBackend):
+    def __init__(self, tmux_binary: str = "tmux", *, lookup_timeout: float, lookup_poll_interval: float) -> None:
+        try:
+            self._server = Server(command=tmux_binary)
+        except LibTmuxException as exc:
+            raise TmuxError(str(exc)) from exc
+        self._lookup_timeout = lookup_timeout
+        self._lookup_poll_interval = lookup_poll_interval
+
+    def has_session(self, session_name: str) -> bool:
+        try:
+            result = self._server.cmd("has-session", "-t", session_name)
+        except LibTmuxException as exc:
+            message = str(exc)
+            if "no server running" in message:
+                return False
+            raise TmuxError(message) from exc
+        return result.returncode == 0
+
+    def new_session(self, session_name: str, command: Optional[str], *, start_directory: Optional[str]) -> None:
+        cmd: list[str] = ["new-session", "-d", "-s", session_name]
+        if start_directory:
+            cmd.extend(["-c", start_directory])
+        if command:
+            cmd.append(command)
+
+        result = self._cmd(*cmd)
+        if result.returncode != 0:
+            raise TmuxError("\n".join(result.stderr))
+
+    def list_sessions(self) -> List[str]:
+        try:
+            result = self._server.cmd("list-sessions", "-F", "#S")
+        except LibTmuxException as exc:
+            message = str(exc)
+            if "no server running" in message:
+                return []
+            raise TmuxError(message) from exc
+
+        if result.returncode != 0:
+            return []
+        return [line.strip() for line in result.stdout]
+
+    def kill_session(self, session_name: str) -> None:
+        session = self._find_session(session_name)
+        if session is None:
+            return
+        try:
+            session.kill_session()
+        except LibTmuxException as exc:
+            raise TmuxError(str(exc)) from exc
+
+    def attach_session(self, session_name: str) -> None:
+        try:
+            self._server.attach_session(target_session=session_name)
+        except LibTmuxException as exc:
+            raise TmuxError(str(exc)) from exc
+
+    def pane(self, session_name: str, pane: str) -> TmuxPane:
+        return _LibtmuxPane(self._get_pane(session_name, pane))
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+    def _find_session(self, session_name: str):
+        try:
+            self._server.list_sessions()
+            return self._server.find_where({"session_name": session_name})
+        except LibTmuxException as exc:
+            message = str(exc)
+            if "no server running" in message:
+                return None
+            raise TmuxError(message) from exc
+
+    def _get_pane(self, session_name: str, pane: str) -> Pane:
+        session = None
+        deadline = time.monotonic() + self._lookup_timeout
+        while time.monotonic() < deadline:
+            session = self._find_session(session_name)
+            if session is not None:
+                break
+            time.sleep(self._lookup_poll_interval)
+
+        if session is None:
+            raise TmuxError(f"tmux session '{session_name}' not found")
+
+        try:
+            window = session.attached_window or session.list_windows()[0]
+            panes = window.list_panes()
+        except LibTmuxException as exc:
+            raise TmuxError(str(exc)) from exc
+
+        pane_index = int(pane)
+        if pane_index >= len(panes):
+            raise TmuxError(f"pane index {pane} invalid for session '{session_name}'")
+
+        return panes[pane_index]
+
+    def _cmd(self, *args: str) -> Any:
+        try:
+            result = self._server.cmd(*args)
+        except LibTmuxException as exc:
+            raise TmuxError(str(exc)) from exc
+        return result
+
+
+class _LibtmuxPane(TmuxPane):
+    def __init__(self, pane: Pane) -> None:
+        self._pane = pane
+
+    def capture(self, start: Optional[int] = None) -> List[str]:
+        try:
+            return self._pane.capture_pane(start=start)
+        except LibTmuxException as exc:
+            raise TmuxError(str(exc)) from exc
+
+    def send_keys(self, keys: Tuple[str, ...], *, enter: bool) -> None:
+        try:
+            self._pane.send_keys(*keys, enter=enter)
+        except LibTmuxException as exc:
+            raise TmuxError(str(exc)) from exc
+
+    def is_dead(self) -> bool:
+        return self._pane.get("pane_dead") == "1"
+
+    def pid(self) -> Optional[int]:
+        value = self._pane.get("pane_pid")
+        return int(value) if value else None
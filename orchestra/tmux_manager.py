@@ -1,21 +1,22 @@
-"""libtmux-backed session management utilities for the Orchestra MVP."""
+"""Session management utilities for the Orchestra MVP.
+
+``TmuxManager`` holds the policy (spawn readiness, output following) and
+leaves the tmux primitives to a ``TmuxBackend``: libtmux against a real
+server by default, or ``orchestra.fake_tmux.FakeTmuxBackend`` in memory.
+"""
 
 from __future__ import annotations
 
 import os
+import threading
 import time
 from dataclasses import dataclass
-from typing import Any, Iterable, Iterator, List, Optional
+from typing import Iterable, Iterator, List, Optional
 
 import shlex
 
-from libtmux import Server
-from libtmux.exc import LibTmuxException
-from libtmux.pane import Pane
-
-
-class TmuxError(RuntimeError):
-    """Wrapped libtmux errors for a cleaner public interface."""
+from .tmux_backend import LibtmuxBackend, TmuxBackend, TmuxError
+from .tracing import span, traced
 
 
 @dataclass
@@ -29,7 +30,7 @@ class PaneCapture:
 
 
 class TmuxManager:
-    """High-level helpers around libtmux for Orchestra."""
+    """High-level helpers around a tmux backend for Orchestra."""
 
     def __init__(
         self,
@@ -37,29 +38,26 @@ class TmuxManager:
         *,
         spawn_timeout: float | None = None,
         spawn_poll_interval: float | None = None,
+        backend: Optional[TmuxBackend] = None,
     ) -> None:
-        try:
-            self._server = Server(command=tmux_binary)
-        except LibTmuxException as exc:
-            raise TmuxError(str(exc)) from exc
         self._spawn_timeout = spawn_timeout or float(os.getenv("ORCHESTRA_TMUX_SPAWN_TIMEOUT", "5.0"))
         self._spawn_poll_interval = spawn_poll_interval or float(
             os.getenv("ORCHESTRA_TMUX_SPAWN_POLL_INTERVAL", "0.05")
         )
+        self.backend = backend or LibtmuxBackend(
+            tmux_binary,
+            lookup_timeout=self._spawn_timeout,
+            lookup_poll_interval=self._spawn_poll_interval,
+        )
 
     # ------------------------------------------------------------------
     # Session lifecycle
     # ------------------------------------------------------------------
+    @traced("tmux.session_exists", category="tmux")
     def session_exists(self, session_name: str) -> bool:
-        try:
-            result = self._server.cmd("has-session", "-t", session_name)
-        except LibTmuxException as exc:
-            message = str(exc)
-            if "no server running" in message:
-                return False
-            raise TmuxError(message) from exc
-        return result.returncode == 0
+        return self.backend.has_session(session_name)
 
+    @traced("tmux.spawn_session", category="tmux")
     def spawn_session(
         self,
         session_name: str,
@@ -78,15 +76,8 @@ class TmuxManager:
         if command:
             window_command = shlex.join(command)
 
-        cmd: list[str] = ["new-session", "-d", "-s", session_name]
-        if start_directory:
-            cmd.extend(["-c", start_directory])
-        if window_command:
-            cmd.append(window_command)
-
-        result = self._cmd(*cmd)
-        if result.returncode != 0:
-            raise TmuxError("\n".join(result.stderr))
+        with span("tmux.new_session", category="tmux"):
+            self.backend.new_session(session_name, window_command, start_directory=start_directory)
 
         deadline = time.monotonic() + self._spawn_timeout
         while time.monotonic() < deadline:
@@ -96,44 +87,25 @@ class TmuxManager:
         else:
             raise TmuxError(f"tmux session '{session_name}' was not ready after {self._spawn_timeout} seconds")
 
+    @traced("tmux.list_sessions", category="tmux")
     def list_sessions(self) -> List[str]:
-        try:
-            result = self._server.cmd("list-sessions", "-F", "#S")
-        except LibTmuxException as exc:
-            message = str(exc)
-            if "no server running" in message:
-                return []
-            raise TmuxError(message) from exc
-
-        if result.returncode != 0:
-            return []
-        return [line.strip() for line in result.stdout]
+        return self.backend.list_sessions()
 
+    @traced("tmux.kill_session", category="tmux")
     def kill_session(self, session_name: str) -> None:
-        session = self._find_session(session_name)
-        if session is None:
-            return
-        try:
-            session.kill_session()
-        except LibTmuxException as exc:
-            raise TmuxError(str(exc)) from exc
+        self.backend.kill_session(session_name)
 
     def attach_session(self, session_name: str) -> None:
-        try:
-            self._server.attach_session(target_session=session_name)
-        except LibTmuxException as exc:
-            raise TmuxError(str(exc)) from exc
+        self.backend.attach_session(session_name)
 
     # ------------------------------------------------------------------
     # Pane interaction
     # ------------------------------------------------------------------
+    @traced("tmux.send_keys", category="tmux")
     def send_keys(self, session_name: str, *keys: str, enter: bool = True, pane: str = "0") -> None:
-        pane_obj = self._get_pane(session_name, pane)
-        try:
-            pane_obj.send_keys(*keys, enter=enter)
-        except LibTmuxException as exc:
-            raise TmuxError(str(exc)) from exc
+        self.backend.pane(session_name, pane).send_keys(keys, enter=enter)
 
+    @traced("tmux.capture_pane", category="tmux")
     def capture_pane(
         self,
         session_name: str,
@@ -141,45 +113,51 @@ class TmuxManager:
         pane: str = "0",
         scrollback: int | None = None,
     ) -> PaneCapture:
-        pane_obj = self._get_pane(session_name, pane)
-        try:
-            lines = pane_obj.capture_pane(start=-abs(scrollback) if scrollback else None)
-        except LibTmuxException as exc:
-            raise TmuxError(str(exc)) from exc
-
+        pane_obj = self.backend.pane(session_name, pane)
+        lines = pane_obj.capture(start=-abs(scrollback) if scrollback else None)
         return PaneCapture(
             session=session_name,
             pane=pane,
             lines=lines,
-            dead=self._is_pane_dead(pane_obj),
+            dead=pane_obj.is_dead(),
         )
 
+    @traced("tmux.pane_pid", category="tmux")
+    def pane_pid(self, session_name: str, *, pane: str = "0") -> Optional[int]:
+        """PID of the process running in the pane (``#{pane_pid}``)."""
+
+        return self.backend.pane(session_name, pane).pid()
+
     def iter_pane_lines(
         self,
         session_name: str,
         *,
         pane: str = "0",
         poll_interval: float = 0.5,
+        stop: Optional[threading.Event] = None,
     ) -> Iterator[str]:
-        pane_obj = self._get_pane(session_name, pane)
+        with span("tmux.pane_lookup", category="tmux"):
+            pane_obj = self.backend.pane(session_name, pane)
         previous: List[str] = []
 
-        while True:
-            try:
-                current = pane_obj.capture_pane()
-            except LibTmuxException as exc:
-                raise TmuxError(str(exc)) from exc
+        while stop is None or not stop.is_set():
+            with span("tmux.poll_capture", category="tmux"):
+                current = pane_obj.capture()
 
             for idx, line in enumerate(current):
                 if idx >= len(previous) or previous[idx] != line:
                     yield line
 
-            if self._is_pane_dead(pane_obj):
+            if pane_obj.is_dead():
                 break
             if not self.session_exists(session_name):
                 break
             previous = current
-            time.sleep(poll_interval)
+            with span("tmux.poll_wait", category="tmux"):
+                if stop is not None:
+                    stop.wait(poll_interval)
+                else:
+                    time.sleep(poll_interval)
 
     def wait_for_session_end(
         self,
@@ -194,51 +172,3 @@ class TmuxManager:
                 return False
             time.sleep(poll_interval)
         return True
-
-    # ------------------------------------------------------------------
-    # Internal helpers
-    # ------------------------------------------------------------------
-    def _find_session(self, session_name: str):
-        try:
-            self._server.list_sessions()
-            return self._server.find_where({"session_name": session_name})
-        except LibTmuxException as exc:
-            message = str(exc)
-            if "no server running" in message:
-                return None
-            raise TmuxError(message) from exc
-
-    def _get_pane(self, session_name: str, pane: str) -> Pane:
-        session = None
-        deadline = time.monotonic() + self._spawn_timeout
-        while time.monotonic() < deadline:
-            session = self._find_session(session_name)
-            if session is not None:
-                break
-            time.sleep(self._spawn_poll_interval)
-
-        if session is None:
-            raise TmuxError(f"tmux session '{session_name}' not found")
-
-        try:
-            window = session.attached_window or session.list_windows()[0]
-            panes = window.list_panes()
-        except LibTmuxException as exc:
-            raise TmuxError(str(exc)) from exc
-
-        pane_index = int(pane)
-        if pane_index >= len(panes):
-            raise TmuxError(f"pane index {pane} invalid for session '{session_name}'")
-
-        return panes[pane_index]
-
-    @staticmethod
-    def _is_pane_dead(pane: Pane) -> bool:
-        return pane.get("pane_dead") == "1"
-
-    def _cmd(self, *args: str) -> Any:
-        try:
-            result = self._server.cmd(*args)
-        except LibTmuxException as exc:
-            raise TmuxError(str(exc)) from exc
-        return result
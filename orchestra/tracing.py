@@ -0,0 +1,202 @@
+"""Timed spans for profiling a delegation end to end.
+
+A ``Tracer`` collects spans from whatever runs while it is active (it lives
+in a context variable, so each thread or task activates it itself). Code is
+instrumented with ``span`` blocks and ``traced`` functions, which cost one
+context-variable lookup when no tracer is active. ``mark`` records instants
+such as the agent's first output line.
+
+A finished trace is written in the Chrome trace event format (load it in
+Perfetto or ``chrome://tracing``); ``aggregate`` sums the spans by name for
+the run record. Span totals are inclusive, so nested spans are also counted
+in their parents.
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Callable, ContextManager, Dict, Iterable, Iterator, List, Optional, TypeVar
+
+
+# Spans beyond this are still aggregated but not written to the trace file.
+MAX_EVENTS = 100_000
+
+_active: ContextVar[Optional["Tracer"]] = ContextVar("orchestra_tracer", default=None)
+
+F = TypeVar("F", bound=Callable)
+
+
+def _traces_dir() -> Path:
+    # Imported here: ``run_history`` is itself instrumented with this module.
+    from .run_history import state_dir
+
+    return state_dir() / "traces"
+
+
+def trace_path(run_id: str, root: Path | None = None) -> Path:
+    return (root or _traces_dir()) / f"{run_id}.json"
+
+
+class Tracer:
+    def __init__(self, *, start_ns: Optional[int] = None) -> None:
+        self.start_ns = start_ns if start_ns is not None else time.perf_counter_ns()
+        self.events: List[Dict] = []
+        self.dropped = 0
+        self._totals: Dict[str, List[int]] = {}  # name -> [count, total_ns, max_ns]
+        self._marks: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def activate(self) -> Iterator["Tracer"]:
+        token = _active.set(self)
+        try:
+            yield self
+        finally:
+            _active.reset(token)
+
+    def add(self, name: str, start_ns: int, end_ns: int, *, category: str = "orchestra", args: Optional[Dict] = None) -> None:
+        duration = end_ns - start_ns
+        with self._lock:
+            totals = self._totals.setdefault(name, [0, 0, 0])
+            totals[0] += 1
+            totals[1] += duration
+            totals[2] = max(totals[2], duration)
+            if len(self.events) >= MAX_EVENTS:
+                self.dropped += 1
+                return
+            event = {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": (start_ns - self.start_ns) / 1000,
+                "dur": duration / 1000,
+                "pid": os.getpid(),
+                "tid": threading.get_native_id(),
+            }
+            if args:
+                event["args"] = args
+            self.events.append(event)
+
+    def mark(self, name: str, *, args: Optional[Dict] = None) -> None:
+        """Record an instant; only the first ``name`` is kept in the aggregates."""
+
+        now = time.perf_counter_ns()
+        with self._lock:
+            self._marks.setdefault(name, now)
+            if len(self.events) < MAX_EVENTS:
+                event = {
+                    "name": name,
+                    "cat": "mark",
+                    "ph": "i",
+                    "s": "t",
+                    "ts": (now - self.start_ns) / 1000,
+                    "pid": os.getpid(),
+                    "tid": threading.get_native_id(),
+                }
+                if args:
+                    event["args"] = args
+                self.events.append(event)
+
+    def aggregate(self) -> Dict:
+        """Per-span count, total and max in milliseconds, plus the offset of each mark."""
+
+        with self._lock:
+            return {
+                "wall_ms": _ms(time.perf_counter_ns() - self.start_ns),
+                "spans": {
+                    name: {"count": count, "total_ms": _ms(total), "max_ms": _ms(longest)}
+                    for name, (count, total, longest) in sorted(self._totals.items())
+                },
+                "marks": {name: _ms(at - self.start_ns) for name, at in self._marks.items()},
+            }
+
+    def to_chrome(self, metadata: Optional[Dict] = None) -> Dict:
+        with self._lock:
+            events = list(self.events)
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {**(metadata or {}), "dropped_events": self.dropped},
+        }
+
+    def write(self, path: Path, metadata: Optional[Dict] = None) -> Path:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.to_chrome(metadata)), encoding="utf-8")
+        tmp.replace(path)
+        return path
+
+
+def current_tracer() -> Optional[Tracer]:
+    return _active.get()
+
+
+def activate(tracer: Optional[Tracer]) -> ContextManager:
+    """``tracer.activate()``, or a no-op when there is no tracer."""
+
+    return tracer.activate() if tracer is not None else nullcontext()
+
+
+@contextmanager
+def span(name: str, *, category: str = "orchestra", **args) -> Iterator[None]:
+    tracer = _active.get()
+    if tracer is None:
+        yield
+        return
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        tracer.add(name, start, time.perf_counter_ns(), category=category, args=args or None)
+
+
+def traced(name: str, *, category: str = "orchestra") -> Callable[[F], F]:
+    """Record every call of the decorated function as a span called ``name``."""
+
+    def decorate(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            tracer = _active.get()
+            if tracer is None:
+                return func(*args, **kwargs)
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                tracer.add(name, start, time.perf_counter_ns(), category=category)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorate
+
+
+def mark(name: str, **args) -> None:
+    tracer = _active.get()
+    if tracer is not None:
+        tracer.mark(name, args=args or None)
+
+
+def prune_traces(keep: Iterable[str], root: Path | None = None) -> List[str]:
+    """Delete trace files of runs not in ``keep``; returns the removed run ids."""
+
+    directory = root or _traces_dir()
+    if not directory.is_dir():
+        return []
+    keep_ids = set(keep)
+    removed = []
+    for path in directory.glob("*.json"):
+        if path.stem not in keep_ids:
+            path.unlink(missing_ok=True)
+            removed.append(path.stem)
+    return removed
+
+
+def _ms(nanoseconds: int) -> float:
+    return round(nanoseconds / 1e6, 3)
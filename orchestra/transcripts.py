@@ -0,0 +1,189 @@
+"""Compressed per-run transcripts of agent panes.
+
+A transcript is two files under ``<state dir>/transcripts/<run_id>/``:
+``<role>.z`` holds the lines in blocks that are zlib-compressed on their own,
+and ``<role>.idx`` holds one fixed-size record per block (first line number,
+line count, byte offset, compressed length). Reading a range looks the blocks
+up in the index and inflates only those it overlaps, so the tail of a long
+transcript costs one block however much output came before it.
+
+Blocks are appended data first, index second, so a reader never sees an
+index record whose block is incomplete; lines still buffered by a live writer
+are simply not visible yet.
+"""
+
+from __future__ import annotations
+
+import re
+import shutil
+import struct
+import zlib
+from bisect import bisect_right
+from pathlib import Path
+from typing import Iterable, List, NamedTuple, Optional
+
+from .run_history import state_dir
+
+
+TRANSCRIPT_ROLES = ("primary", "secondary")
+BLOCK_LINES = 512
+BLOCK_BYTES = 64 * 1024
+# first_line, line_count, offset, length
+_INDEX_RECORD = struct.Struct("<QIQI")
+_RUN_ID = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+class BlockEntry(NamedTuple):
+    first_line: int
+    line_count: int
+    offset: int
+    length: int
+
+
+def _transcripts_dir() -> Path:
+    return state_dir() / "transcripts"
+
+
+class TranscriptWriter:
+    """Appends lines to a transcript, compressing a block at a time."""
+
+    def __init__(
+        self,
+        base: Path,
+        *,
+        block_lines: int = BLOCK_LINES,
+        block_bytes: int = BLOCK_BYTES,
+        level: int = 6,
+    ) -> None:
+        base.parent.mkdir(parents=True, exist_ok=True)
+        self.block_lines = block_lines
+        self.block_bytes = block_bytes
+        self.level = level
+        entries = _read_index(base.with_suffix(".idx"))
+        self._data = base.with_suffix(".z").open("ab")
+        self._index = base.with_suffix(".idx").open("ab")
+        # Drop a torn record so appended ones stay aligned.
+        self._index.truncate(len(entries) * _INDEX_RECORD.size)
+        self.line_count = entries[-1].first_line + entries[-1].line_count if entries else 0
+        self._pending: List[str] = []
+        self._pending_bytes = 0
+
+    def write(self, line: str) -> None:
+        # Lines are newline-separated inside a block.
+        line = line.replace("\n", " ")
+        self._pending.append(line)
+        self._pending_bytes += len(line) + 1
+        if len(self._pending) >= self.block_lines or self._pending_bytes >= self.block_bytes:
+            self.flush()
+
+    def write_lines(self, lines: Iterable[str]) -> None:
+        for line in lines:
+            self.write(line)
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        block = zlib.compress("\n".join(self._pending).encode("utf-8"), self.level)
+        offset = self._data.tell()
+        self._data.write(block)
+        self._data.flush()
+        self._index.write(_INDEX_RECORD.pack(self.line_count, len(self._pending), offset, len(block)))
+        self._index.flush()
+        self.line_count += len(self._pending)
+        self._pending = []
+        self._pending_bytes = 0
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            self._data.close()
+            self._index.close()
+
+    def __enter__(self) -> "TranscriptWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class Transcript:
+    """Random access to the lines of a stored transcript."""
+
+    def __init__(self, base: Path) -> None:
+        self._data_path = base.with_suffix(".z")
+        self.blocks = _read_index(base.with_suffix(".idx"))
+        self._starts = [entry.first_line for entry in self.blocks]
+
+    @property
+    def line_count(self) -> int:
+        if not self.blocks:
+            return 0
+        last = self.blocks[-1]
+        return last.first_line + last.line_count
+
+    def read(self, start: int = 0, stop: Optional[int] = None) -> List[str]:
+        """Lines ``start`` up to (not including) ``stop``, like ``lines[start:stop]``."""
+
+        start, stop, _ = slice(start, stop).indices(self.line_count)
+        if start >= stop:
+            return []
+        first = bisect_right(self._starts, start) - 1
+        lines: List[str] = []
+        with self._data_path.open("rb") as handle:
+            for entry in self.blocks[first:]:
+                if entry.first_line >= stop:
+                    break
+                handle.seek(entry.offset)
+                block = zlib.decompress(handle.read(entry.length)).decode("utf-8").split("\n")
+                lo = max(start - entry.first_line, 0)
+                hi = min(stop - entry.first_line, entry.line_count)
+                lines.extend(block[lo:hi])
+        return lines
+
+    def tail(self, count: int) -> List[str]:
+        return self.read(max(self.line_count - count, 0)) if count > 0 else []
+
+
+class TranscriptStore:
+    def __init__(self, root: Path | None = None) -> None:
+        self.root = root or _transcripts_dir()
+
+    def _base(self, run_id: str, role: str) -> Path:
+        if role not in TRANSCRIPT_ROLES:
+            raise ValueError(f"Unknown transcript role '{role}'")
+        if not _RUN_ID.match(run_id):
+            raise ValueError(f"Invalid run id '{run_id}'")
+        return self.root / run_id / role
+
+    def writer(self, run_id: str, role: str, **kwargs) -> TranscriptWriter:
+        return TranscriptWriter(self._base(run_id, role), **kwargs)
+
+    def open(self, run_id: str, role: str) -> Optional[Transcript]:
+        base = self._base(run_id, role)
+        if not base.with_suffix(".idx").exists():
+            return None
+        return Transcript(base)
+
+    def prune(self, keep: Iterable[str]) -> List[str]:
+        """Delete transcripts of runs not in ``keep``; returns the removed run ids."""
+
+        if not self.root.is_dir():
+            return []
+        keep_ids = set(keep)
+        removed = []
+        for directory in self.root.iterdir():
+            if directory.is_dir() and directory.name not in keep_ids:
+                shutil.rmtree(directory, ignore_errors=True)
+                removed.append(directory.name)
+        return removed
+
+
+def _read_index(path: Path) -> List[BlockEntry]:
+    try:
+        raw = path.read_bytes()
+    except FileNotFoundError:
+        return []
+    # Ignore a trailing partial record from a writer that died mid-append.
+    usable = len(raw) - len(raw) % _INDEX_RECORD.size
+    return [BlockEntry(*fields) for fields in _INDEX_RECORD.iter_unpack(raw[:usable])]
@@ -0,0 +1,133 @@
+"""Throughput and latency of per-connection batching at different windows.
+
+Serves a ``ConnectionManager`` with uvicorn in-process, connects
+``--observers`` real WebSocket clients to ``run:bench`` and publishes
+``--messages`` pane-output envelopes at ``--rate`` per second. For each batch
+window it reports frames per observer, delivered messages per second,
+end-to-end latency percentiles and process CPU per delivered message
+(server and clients share the process).
+
+Usage::
+
+    python benchmarks/bench_batching.py [--windows 0,5,20,50] [--rate 5000] [--observers 20]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+
+import httpx  # noqa: E402
+import websockets  # noqa: E402
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect  # noqa: E402
+
+from bench_jwt_handshake import _percentile, _serve  # noqa: E402
+from orchestra_daemon.websocket import ConnectionManager  # noqa: E402
+
+
+def build_app(messages: int) -> FastAPI:
+    app = FastAPI()
+    manager = ConnectionManager(queue_size=messages + 16)
+
+    @app.websocket("/ws")
+    async def observe(websocket: WebSocket) -> None:
+        await manager.connect(
+            websocket,
+            subject="bench",
+            metadata={},
+            topics=["run:bench"],
+            batch_window_ms=int(websocket.query_params["batch"]),
+            batch_max=int(websocket.query_params["batch_max"]),
+        )
+        try:
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            manager.disconnect(websocket)
+
+    @app.post("/produce")
+    async def produce(count: int, rate: int) -> dict:
+        async def run() -> None:
+            tick = 0.005
+            per_tick = max(1, int(rate * tick))
+            sent = 0
+            while sent < count:
+                for _ in range(min(per_tick, count - sent)):
+                    payload = {"run_id": "bench", "lines": [f"line {sent}: {'x' * 60}"], "t": time.perf_counter()}
+                    envelope = {"type": "pane.output", "topic": "run:bench", "payload": payload}
+                    manager.publish_nowait("run:bench", envelope, coalesce=False)
+                    sent += 1
+                await asyncio.sleep(tick)
+
+        asyncio.get_running_loop().create_task(run())
+        return {"started": count}
+
+    return app
+
+
+async def _observe(port: int, window: int, batch_max: int, expected: int, ready: asyncio.Event, latencies: list) -> int:
+    frames = 0
+    received = 0
+    async with websockets.connect(f"ws://127.0.0.1:{port}/ws?batch={window}&batch_max={batch_max}", max_size=None) as ws:
+        ready.set()
+        while received < expected:
+            data = json.loads(await ws.recv())
+            now = time.perf_counter()
+            frames += 1
+            for message in data if isinstance(data, list) else [data]:
+                latencies.append(now - message["payload"]["t"])
+                received += 1
+    return frames
+
+
+async def _run(port: int, args, window: int):
+    latencies: list = []
+    readies = [asyncio.Event() for _ in range(args.observers)]
+    tasks = [
+        asyncio.create_task(_observe(port, window, args.batch_max, args.messages, ready, latencies))
+        for ready in readies
+    ]
+    await asyncio.gather(*(ready.wait() for ready in readies))
+    await asyncio.sleep(0.1)
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    async with httpx.AsyncClient() as client:
+        await client.post(f"http://127.0.0.1:{port}/produce", params={"count": args.messages, "rate": args.rate})
+    frames = await asyncio.gather(*tasks)
+    return frames, latencies, time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--windows", default="0,5,20,50", help="Batch windows in milliseconds")
+    parser.add_argument("--batch-max", type=int, default=256)
+    parser.add_argument("--observers", type=int, default=20)
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--rate", type=int, default=5000, help="Published messages per second")
+    args = parser.parse_args()
+
+    for window in (int(value) for value in args.windows.split(",")):
+        server, thread, port = _serve(build_app(args.messages))
+        try:
+            frames, latencies, wall, cpu = asyncio.run(_run(port, args, window))
+        finally:
+            server.should_exit = True
+            thread.join()
+        delivered = len(latencies)
+        print(
+            f"window {window:>3} ms  {sum(frames) / len(frames):8.0f} frames/observer  "
+            f"{delivered / wall:9.0f} msgs/s  p50 {_percentile(latencies, 0.5) * 1000:6.1f} ms  "
+            f"p99 {_percentile(latencies, 0.99) * 1000:6.1f} ms  {cpu / delivered * 1e6:6.1f} us CPU/msg"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Fan-out cost of one broadcast to many observers.
+
+Connects ``--observers`` in-memory sockets to a ``ConnectionManager`` and
+broadcasts ``--messages`` envelopes, reporting deliveries per second and CPU
+time per delivered frame for the previous per-connection ``json.dumps`` path
+and the serialize-once path (with whichever encoder ``encode_json`` picked).
+
+Usage::
+
+    python benchmarks/bench_broadcast.py [--observers 1,10,100,1000] [--messages 200]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fastapi.websockets import WebSocketState  # noqa: E402
+
+from orchestra_daemon import websocket as websocket_module  # noqa: E402
+from orchestra_daemon.websocket import ConnectionManager  # noqa: E402
+
+
+class NullWebSocket:
+    application_state = WebSocketState.CONNECTED
+
+    def __init__(self) -> None:
+        self.frames = 0
+
+    async def accept(self) -> None:
+        pass
+
+    async def send_text(self, frame: str) -> None:
+        self.frames += 1
+
+    async def close(self, code: int = 1000) -> None:
+        self.application_state = WebSocketState.DISCONNECTED
+
+
+def _envelope(index: int) -> dict:
+    return {
+        "type": "pane.output",
+        "payload": {"run": "run-42", "seq": index, "lines": [f"line {index}: {'x' * 60}"] * 8},
+        "from": "orchestrator",
+        "meta": {"scope": "observe"},
+    }
+
+
+async def _per_connection_broadcast(manager: ConnectionManager, payload: dict) -> None:
+    # The pre-serialize-once behaviour: every connection encodes its own copy.
+    for connection in list(manager._connections.values()):
+        connection.enqueue_frame(json.dumps(payload), coalesce_key=payload["type"])
+
+
+async def _run(observers: int, messages: int, per_connection: bool) -> float:
+    manager = ConnectionManager(queue_size=messages + 1)
+    sockets = [NullWebSocket() for _ in range(observers)]
+    for ws in sockets:
+        await manager.connect(ws, subject="bench", metadata={})
+    start = time.process_time()
+    for index in range(messages):
+        payload = _envelope(index)
+        if per_connection:
+            await _per_connection_broadcast(manager, payload)
+        else:
+            await manager.broadcast(payload)
+        await asyncio.sleep(0)
+    while any(ws.frames < messages for ws in sockets):
+        await asyncio.sleep(0)
+    cpu = time.process_time() - start
+    for ws in sockets:
+        manager.disconnect(ws)
+    return cpu
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--observers", default="1,10,100,1000")
+    parser.add_argument("--messages", type=int, default=200)
+    args = parser.parse_args()
+
+    encoder = "orjson" if websocket_module.orjson is not None else "json"
+    for observers in (int(value) for value in args.observers.split(",")):
+        deliveries = observers * args.messages
+        for label, per_connection in (("per-connection", True), (f"once ({encoder})", False)):
+            wall_start = time.perf_counter()
+            cpu = asyncio.run(_run(observers, args.messages, per_connection))
+            wall = time.perf_counter() - wall_start
+            print(
+                f"{observers:>5} observers  {label:<16} {deliveries / wall:10.0f} msgs/s  "
+                f"{cpu / deliveries * 1e6:7.2f} us CPU/msg"
+            )
+
+
+if __name__ == "__main__":
+    main()
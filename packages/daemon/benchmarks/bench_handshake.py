@@ -0,0 +1,92 @@
+"""Measure the per-connection cost of resolving settings in the WebSocket handshake.
+
+Compares re-reading the ``.env`` file on every handshake (the previous
+``load_settings()`` call in ``websocket_endpoint``) with the shared cached
+``SettingsProvider``. Runs the daemon in insecure mode through ``TestClient``.
+
+Usage::
+
+    python benchmarks/bench_handshake.py [--connections 500]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def _run_connects(client, count):
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        with client.websocket_connect("/ws/observe"):
+            pass
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def _report(label, samples):
+    print(
+        f"{label:<28} mean {statistics.mean(samples) * 1e6:8.1f} us  "
+        f"p50 {_percentile(samples, 0.50) * 1e6:8.1f} us  p99 {_percentile(samples, 0.99) * 1e6:8.1f} us"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--connections", type=int, default=500)
+    args = parser.parse_args()
+
+    env_dir = Path(tempfile.mkdtemp())
+    env_file = env_dir / ".env"
+    env_file.write_text("ORCHESTRA_DAEMON_ALLOW_INSECURE_WS=1\nAUTH0_ALGORITHM=RS256\n" + "# padding\n" * 40)
+    os.environ["ORCHESTRA_DAEMON_ALLOW_INSECURE_WS"] = "1"
+
+    from fastapi.testclient import TestClient
+
+    from orchestra_daemon import app as app_module
+    from orchestra_daemon import config
+
+    config.settings_provider = config.SettingsProvider(env_file)
+    client = TestClient(app_module.app)
+
+    lookups = 20_000
+    start = time.perf_counter()
+    for _ in range(lookups):
+        config.load_settings(env_file)
+    uncached_lookup = (time.perf_counter() - start) / lookups
+    start = time.perf_counter()
+    for _ in range(lookups):
+        config.settings_provider.get()
+    cached_lookup = (time.perf_counter() - start) / lookups
+    print(f"settings lookup: load_settings {uncached_lookup * 1e6:.2f} us, cached {cached_lookup * 1e6:.3f} us")
+
+    original = app_module.get_settings
+    app_module.get_settings = lambda: config.load_settings(env_file)
+    try:
+        _run_connects(client, 20)
+        before = _run_connects(client, args.connections)
+    finally:
+        app_module.get_settings = original
+    _run_connects(client, 20)
+    after = _run_connects(client, args.connections)
+
+    _report("handshake (load per connect)", before)
+    _report("handshake (cached provider)", after)
+
+
+if __name__ == "__main__":
+    main()
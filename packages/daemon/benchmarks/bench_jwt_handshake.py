@@ -0,0 +1,137 @@
+"""Handshake latency under concurrent authenticated connects.
+
+Starts the daemon with uvicorn in-process, serves signing keys from a local
+JWKS stand-in with simulated network latency, opens ``--connections``
+WebSocket clients at once and reports connect latency percentiles for:
+
+* ``sync``  - the previous path: blocking ``verify_jwt`` on the event loop
+  (``PyJWKClient``-style fetch plus RSA verification inline)
+* ``async`` - ``verify_jwt_async`` with the background JWKS cache and the
+  verification thread pool
+
+Usage::
+
+    python benchmarks/bench_jwt_handshake.py [--connections 200] [--jwks-latency 0.05]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+
+os.environ.setdefault("AUTH0_DOMAIN", "example.com")
+os.environ.setdefault("AUTH0_AUDIENCE", "bench-audience")
+
+import uvicorn  # noqa: E402
+import websockets  # noqa: E402
+from cryptography.hazmat.primitives import serialization  # noqa: E402
+from cryptography.hazmat.primitives.asymmetric import rsa  # noqa: E402
+from jwt import encode  # noqa: E402
+from jwt.algorithms import RSAAlgorithm  # noqa: E402
+
+from orchestra_daemon import app as app_module  # noqa: E402
+from orchestra_daemon import auth  # noqa: E402
+from orchestra_daemon.jwks import JWKSCache  # noqa: E402
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def _serve(app):
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning", lifespan="off", ws_max_queue=1024))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, thread, sock.getsockname()[1]
+
+
+def _keys():
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    jwk = RSAAlgorithm.to_jwk(private_key.public_key(), as_dict=True)
+    jwk.update({"kid": "bench", "use": "sig"})
+    return private_pem, private_key.public_key(), jwk
+
+
+async def _connect_all(port, tokens):
+    async def one(token):
+        start = time.perf_counter()
+        async with websockets.connect(f"ws://127.0.0.1:{port}/ws/observe?token={token}"):
+            return time.perf_counter() - start
+
+    return await asyncio.gather(*(one(token) for token in tokens))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--connections", type=int, default=200)
+    parser.add_argument("--jwks-latency", type=float, default=0.05, help="Simulated JWKS fetch latency (s)")
+    args = parser.parse_args()
+
+    private_pem, public_key, jwk = _keys()
+    claims = {"aud": "bench-audience", "iss": "https://example.com/"}
+    tokens = [
+        encode({**claims, "sub": f"user-{i}"}, private_pem, algorithm="RS256", headers={"kid": "bench"})
+        for i in range(args.connections)
+    ]
+
+    class SlowKeyClient:
+        """Mimics PyJWKClient: the first lookup blocks on an HTTPS round trip, later ones hit its cache."""
+
+        fetched = False
+
+        class _Key:
+            key = public_key
+
+        def get_signing_key_from_jwt(self, token):
+            if not SlowKeyClient.fetched:
+                time.sleep(args.jwks_latency)
+                SlowKeyClient.fetched = True
+            return self._Key()
+
+    async def slow_fetch():
+        await asyncio.sleep(args.jwks_latency)
+        return {"keys": [jwk]}
+
+    async def sync_verifier(token):
+        return auth.verify_jwt(token)
+
+    auth._get_jwks_client = lambda: SlowKeyClient()
+    jwks_cache = JWKSCache("https://example.com/.well-known/jwks.json", fetch=slow_fetch)
+    auth._get_jwks_cache = lambda: jwks_cache
+
+    server, thread, port = _serve(app_module.app)
+    try:
+        for label, verifier in (("sync", sync_verifier), ("async", auth.verify_jwt_async)):
+            app_module.verify_jwt_async = verifier
+            start = time.perf_counter()
+            samples = asyncio.run(_connect_all(port, tokens))
+            elapsed = time.perf_counter() - start
+            print(
+                f"{label:<6} {len(samples)} connects in {elapsed:6.2f}s  "
+                f"p50 {_percentile(samples, 0.50) * 1000:8.1f} ms  "
+                f"p99 {_percentile(samples, 0.99) * 1000:8.1f} ms"
+            )
+    finally:
+        server.should_exit = True
+        thread.join(5)
+
+
+if __name__ == "__main__":
+    main()
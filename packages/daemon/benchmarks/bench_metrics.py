@@ -0,0 +1,92 @@
+"""Cost of the metrics instrumentation on the publish path.
+
+Times ``Counter.inc`` and ``Histogram.observe`` on their own, then publishes
+``--messages`` envelopes to ``--observers`` in-memory sockets through
+``ConnectionManager.publish_nowait`` with the real instruments and again with
+no-op stand-ins, reporting CPU per publish and the difference.
+
+Usage::
+
+    python benchmarks/bench_metrics.py [--observers 1,10,100] [--messages 20000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from bench_broadcast import NullWebSocket, _envelope  # noqa: E402
+from orchestra_daemon import websocket as websocket_module  # noqa: E402
+from orchestra_daemon.metrics import Counter, Histogram  # noqa: E402
+from orchestra_daemon.websocket import ConnectionManager  # noqa: E402
+
+
+class _Noop:
+    def inc(self, amount: float = 1.0) -> None:
+        pass
+
+    def observe(self, value: float) -> None:
+        pass
+
+
+INSTRUMENTS = ("PUBLISHED", "PUBLISH_FANOUT", "PUBLISH_SECONDS")
+
+
+def _micro(number: int) -> None:
+    counter = Counter("bench_total", "")
+    histogram = Histogram("bench_seconds", "")
+    for label, statement in (
+        ("Counter.inc", counter.inc),
+        ("Histogram.observe", lambda: histogram.observe(0.003)),
+        ("perf_counter pair", lambda: time.perf_counter() - time.perf_counter()),
+    ):
+        seconds = min(timeit.repeat(statement, number=number, repeat=5))
+        print(f"{label:<20} {seconds / number * 1e9:7.1f} ns/op")
+
+
+async def _publish(observers: int, messages: int) -> float:
+    manager = ConnectionManager(queue_size=messages + 1)
+    manager.replay.configure(max_events=0, max_bytes=0, max_topics=0)
+    sockets = [NullWebSocket() for _ in range(observers)]
+    for ws in sockets:
+        await manager.connect(ws, subject="bench", metadata={}, topics=["run:bench"])
+    payloads = [_envelope(index) for index in range(messages)]
+    start = time.process_time()
+    for payload in payloads:
+        manager.publish_nowait("run:bench", payload, coalesce=False)
+    cpu = time.process_time() - start
+    await manager.close()
+    return cpu
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--observers", default="1,10,100")
+    parser.add_argument("--messages", type=int, default=20000)
+    args = parser.parse_args()
+
+    _micro(1_000_000)
+    real = {name: getattr(websocket_module, name) for name in INSTRUMENTS}
+    for observers in (int(value) for value in args.observers.split(",")):
+        results = {}
+        for label, instruments in (("no-op", {name: _Noop() for name in INSTRUMENTS}), ("metrics", real)):
+            for name, instrument in instruments.items():
+                setattr(websocket_module, name, instrument)
+            results[label] = min(asyncio.run(_publish(observers, args.messages)) for _ in range(3))
+        for name, instrument in real.items():
+            setattr(websocket_module, name, instrument)
+        base, instrumented = (results[label] / args.messages * 1e6 for label in ("no-op", "metrics"))
+        print(
+            f"{observers:>5} observers  no-op {base:7.2f} us/publish  metrics {instrumented:7.2f} us/publish  "
+            f"overhead {instrumented - base:+6.2f} us ({(instrumented / base - 1) * 100:+5.1f}%)"
+        )
+
+
+if __name__ == "__main__":
+    main()
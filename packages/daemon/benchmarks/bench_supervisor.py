@@ -0,0 +1,126 @@
+"""Delegate throughput of the run supervisor against the in-memory tmux fake.
+
+Submits ``--runs`` delegations to a ``RunSupervisor`` whose ``TmuxManager``
+sits on ``FakeTmuxBackend``: every secondary prints ``--lines`` lines at
+``--rate`` lines per second and exits. Runs follow their secondary, so the
+whole path (planning, spawning, follow polling, summaries, history, search
+index) is exercised without a tmux server. For each ``--max-runs`` setting it
+reports completed runs per second, submit-to-completion latency percentiles,
+streamed output lines per second and process CPU per run.
+
+Usage::
+
+    python benchmarks/bench_supervisor.py [--runs 1000] [--max-runs 4,16,64] [--lines 200] [--rate 2000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+
+from bench_jwt_handshake import _percentile  # noqa: E402
+from orchestra.config import OrchestraConfig, ToolConfig  # noqa: E402
+from orchestra.delegation import DelegationRequest  # noqa: E402
+from orchestra.fake_tmux import FakeProgram, FakeTmuxBackend  # noqa: E402
+from orchestra.run_history import RunHistory  # noqa: E402
+from orchestra.search_index import SearchIndex  # noqa: E402
+from orchestra.tmux_manager import TmuxManager  # noqa: E402
+from orchestra.transcripts import TranscriptStore  # noqa: E402
+from orchestra_daemon.supervisor import RunSupervisor  # noqa: E402
+from orchestra_daemon.websocket import ConnectionManager  # noqa: E402
+
+
+def _config(root: Path, capacity: int) -> OrchestraConfig:
+    wrapper = root / "wrapper.sh"
+    return OrchestraConfig(
+        tools={"claude": ToolConfig("claude", wrapper), "codex": ToolConfig("codex", wrapper, capacity=capacity)},
+        routing={},
+        default_tool="codex",
+    )
+
+
+async def _bench(runs: int, max_runs: int, lines: int, rate: float, root: Path) -> dict:
+    output = [f"step {index}: editing src/module_{index % 17}.py" for index in range(lines - 1)] + ["✅ completed"]
+    backend = FakeTmuxBackend(
+        lambda session, command: FakeProgram(output if "secondary" in session else (), rate=rate, exit_after=0.05)
+    )
+    manager = TmuxManager(backend=backend, spawn_poll_interval=0.001)
+    supervisor = RunSupervisor(
+        ConnectionManager(),
+        max_runs=max_runs,
+        tmux_factory=lambda: manager,
+        config_loader=lambda: _config(root, runs),
+        history_factory=lambda: RunHistory(root / "runs.json"),
+        transcript_factory=lambda: TranscriptStore(root / "transcripts"),
+        search_factory=lambda: SearchIndex(root / "search.db"),
+        retain_finished=runs,
+    )
+    await supervisor.start()
+
+    async def one(number: int) -> tuple:
+        submitted = time.perf_counter()
+        run = await supervisor.submit(
+            DelegationRequest(
+                task=f"Refactor module {number}",
+                secondary="codex",
+                follow=True,
+                follow_interval=0.1,
+                cleanup=True,
+                transcript="none",
+            )
+        )
+        streamed = 0
+        async for event in run.follow():
+            streamed += event["type"] == "output"
+        return time.perf_counter() - submitted, streamed, run.status
+
+    cpu = time.process_time()
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one(number) for number in range(runs)))
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu
+    await supervisor.close()
+
+    latencies = [latency for latency, _, _ in results]
+    return {
+        "runs_per_second": runs / elapsed,
+        "p50": _percentile(latencies, 0.5),
+        "p95": _percentile(latencies, 0.95),
+        "max": max(latencies),
+        "lines_per_second": sum(streamed for _, streamed, _ in results) / elapsed,
+        "cpu_ms_per_run": cpu / runs * 1000,
+        "failed": sum(status != "completed" for _, _, status in results),
+        "sessions_left": len(backend.list_sessions()),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=1000)
+    parser.add_argument("--max-runs", default="4,16,64")
+    parser.add_argument("--lines", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=2000.0)
+    args = parser.parse_args()
+
+    print(f"{args.runs} runs, {args.lines} lines each at {args.rate:g}/s")
+    print(f"{'max_runs':>8} {'runs/s':>8} {'p50 s':>7} {'p95 s':>7} {'max s':>7} {'lines/s':>9} {'cpu ms/run':>10}")
+    for max_runs in (int(value) for value in args.max_runs.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            result = asyncio.run(_bench(args.runs, max_runs, args.lines, args.rate, Path(tmp)))
+        print(
+            f"{max_runs:>8} {result['runs_per_second']:>8.1f} {result['p50']:>7.2f} {result['p95']:>7.2f}"
+            f" {result['max']:>7.2f} {result['lines_per_second']:>9.0f} {result['cpu_ms_per_run']:>10.1f}"
+        )
+        if result["failed"] or result["sessions_left"]:
+            print(f"         {result['failed']} runs not completed, {result['sessions_left']} sessions left")
+
+
+if __name__ == "__main__":
+    main()
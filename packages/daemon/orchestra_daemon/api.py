@@ -0,0 +1,269 @@
+"""REST endpoints for delegate runs and live tmux sessions.
+
+Every route requires a bearer token (``auth_dependency``). ``RunHistory`` and
+``TmuxManager`` block on file locks and tmux subprocesses, so all calls into
+them run in worker threads. List responses are paginated with
+``offset``/``limit`` and streamed item by item; run responses carry the
+history version as an ``ETag`` and answer a matching ``If-None-Match`` with
+``304 Not Modified`` without reading the history file.
+
+When the daemon runs the supervisor (``DAEMON_SUPERVISOR=1``), ``POST /runs``
+starts a delegation and ``/runs/{run_id}/events`` streams its progress as
+NDJSON; otherwise both answer ``503 supervisor_disabled``. Starting a run
+also needs the ``DAEMON_SUPERVISOR_SUBMIT_SCOPE`` scope (``submit_dependency``).
+"""
+
+from __future__ import annotations
+
+import asyncio
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, Iterator, List, Literal, Optional, Tuple
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from orchestra.delegation import DelegationError, DelegationRequest
+from orchestra.load_balancer import parse_run_session
+from orchestra.run_history import RunHistory
+from orchestra.tmux_manager import TmuxError, TmuxManager
+from orchestra.transcripts import TranscriptStore
+
+from .auth import auth_dependency, submit_dependency
+from .supervisor import RunSupervisor, SupervisedRun
+from .websocket import encode_json
+
+
+MAX_PAGE_SIZE = 200
+OUTPUT_CHUNK_LINES = 256
+MAX_SCROLLBACK = 100_000
+
+router = APIRouter(prefix="/api", dependencies=[Depends(auth_dependency)])
+
+_supervisor: Optional[RunSupervisor] = None
+
+
+@lru_cache(maxsize=1)
+def get_history() -> RunHistory:
+    return RunHistory()
+
+
+@lru_cache(maxsize=1)
+def get_transcripts() -> TranscriptStore:
+    return TranscriptStore()
+
+
+@lru_cache(maxsize=1)
+def _tmux_manager() -> TmuxManager:
+    return TmuxManager()
+
+
+def get_tmux() -> Optional[TmuxManager]:
+    """Shared ``TmuxManager``, or None when tmux is unavailable (not cached)."""
+
+    try:
+        return _tmux_manager()
+    except TmuxError:
+        return None
+
+
+def set_supervisor(supervisor: Optional[RunSupervisor]) -> None:
+    global _supervisor
+    _supervisor = supervisor
+
+
+def get_supervisor() -> RunSupervisor:
+    if _supervisor is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="supervisor_disabled")
+    return _supervisor
+
+
+@router.get("/runs")
+async def list_runs(
+    request: Request,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    status_filter: Optional[str] = Query(None, alias="status"),
+    history: RunHistory = Depends(get_history),
+) -> Response:
+    version = await asyncio.to_thread(history.version)
+    if _not_modified(request, version):
+        return _not_modified_response(version)
+    snapshot = await asyncio.to_thread(history.snapshot)
+    runs = snapshot.runs
+    if status_filter:
+        runs = [run for run in runs if run.get("status") == status_filter]
+    return _page_response("runs", runs, offset, limit, headers=_cache_headers(snapshot.version))
+
+
+@router.get("/runs/{run_id}")
+async def get_run(run_id: str, request: Request, history: RunHistory = Depends(get_history)) -> Response:
+    version = await asyncio.to_thread(history.version)
+    if _not_modified(request, version):
+        return _not_modified_response(version)
+    snapshot = await asyncio.to_thread(history.snapshot)
+    for run in snapshot.runs:
+        if run.get("run_id") == run_id:
+            return JSONResponse(run, headers=_cache_headers(snapshot.version))
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="run_not_found")
+
+
+@router.get("/runs/{run_id}/output")
+async def get_run_output(
+    run_id: str,
+    role: Literal["primary", "secondary"] = "secondary",
+    scrollback: Optional[int] = Query(None, ge=1, le=MAX_SCROLLBACK),
+    history: RunHistory = Depends(get_history),
+    tmux: Optional[TmuxManager] = Depends(get_tmux),
+    transcripts: TranscriptStore = Depends(get_transcripts),
+) -> Response:
+    """Pane contents of a live run, else its stored transcript, else the output kept in its summary.
+
+    The ``X-Orchestra-Output-Source`` header says which (``live``, ``transcript`` or ``summary``).
+    """
+
+    source, lines = await asyncio.to_thread(
+        _capture_output, history, tmux, transcripts, run_id, role, scrollback
+    )
+    return StreamingResponse(
+        _stream_lines(lines),
+        media_type="text/plain; charset=utf-8",
+        headers={"X-Orchestra-Output-Source": source},
+    )
+
+
+@router.post("/runs", status_code=status.HTTP_202_ACCEPTED, dependencies=[Depends(submit_dependency)])
+async def submit_run(
+    body: Dict[str, Any] = Body(...),
+    supervisor: RunSupervisor = Depends(get_supervisor),
+) -> JSONResponse:
+    """Plan a delegation and hand it to the supervisor; the body is a ``DelegationRequest``."""
+
+    try:
+        run = await supervisor.submit(DelegationRequest.from_dict(body))
+    except DelegationError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    return JSONResponse(
+        {"run_id": run.run_id, "status": run.status, "events_url": f"{router.prefix}/runs/{run.run_id}/events"},
+        status_code=status.HTTP_202_ACCEPTED,
+    )
+
+
+@router.get("/runs/{run_id}/events")
+async def stream_run_events(
+    run_id: str,
+    since: int = Query(0, ge=0),
+    supervisor: RunSupervisor = Depends(get_supervisor),
+) -> StreamingResponse:
+    """Events of a supervised run as NDJSON, from index ``since`` until ``completed``."""
+
+    run = supervisor.get(run_id)
+    if run is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="run_not_found")
+    return StreamingResponse(_stream_events(run, since), media_type="application/x-ndjson")
+
+
+@router.get("/sessions")
+async def list_sessions(
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    tmux: Optional[TmuxManager] = Depends(get_tmux),
+) -> Response:
+    if tmux is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="tmux_unavailable")
+    try:
+        names = await asyncio.to_thread(tmux.list_sessions)
+    except TmuxError as exc:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="tmux_unavailable") from exc
+    sessions = [_describe_session(name) for name in sorted(names)]
+    return _page_response("sessions", sessions, offset, limit)
+
+
+# ----------------------------------------------------------------------
+# Helpers
+# ----------------------------------------------------------------------
+def _etag(version: str) -> str:
+    return f'"{version}"'
+
+
+def _cache_headers(version: str) -> Dict[str, str]:
+    # no-cache: clients may store the response but must revalidate it.
+    return {"ETag": _etag(version), "Cache-Control": "no-cache"}
+
+
+def _not_modified(request: Request, version: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    etag = _etag(version)
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in header.split(","))
+
+
+def _not_modified_response(version: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_cache_headers(version))
+
+
+def _page_response(
+    key: str,
+    items: List[Dict],
+    offset: int,
+    limit: int,
+    *,
+    headers: Optional[Dict[str, str]] = None,
+) -> StreamingResponse:
+    page = items[offset : offset + limit]
+    end = offset + len(page)
+    meta = {"total": len(items), "offset": offset, "limit": limit, "next_offset": end if end < len(items) else None}
+    return StreamingResponse(_stream_page(key, page, meta), media_type="application/json", headers=headers)
+
+
+def _stream_page(key: str, items: List[Dict], meta: Dict) -> Iterator[str]:
+    # ``{...meta, "<key>": [item, item, ...]}`` written one item at a time.
+    yield encode_json(meta)[:-1] + f',"{key}":['
+    for index, item in enumerate(items):
+        yield ("," if index else "") + encode_json(item)
+    yield "]}"
+
+
+def _stream_lines(lines: List[str]) -> Iterator[str]:
+    for start in range(0, len(lines), OUTPUT_CHUNK_LINES):
+        yield "".join(line + "\n" for line in lines[start : start + OUTPUT_CHUNK_LINES])
+
+
+async def _stream_events(run: SupervisedRun, since: int) -> AsyncIterator[str]:
+    async for event in run.follow(since):
+        yield encode_json(event) + "\n"
+
+
+def _describe_session(name: str) -> Dict[str, Optional[str]]:
+    parsed = parse_run_session(name)
+    run_id, role, tool = parsed if parsed is not None else (None, None, None)
+    return {"name": name, "run_id": run_id, "role": role, "tool": tool}
+
+
+def _capture_output(
+    history: RunHistory,
+    tmux: Optional[TmuxManager],
+    transcripts: TranscriptStore,
+    run_id: str,
+    role: str,
+    scrollback: Optional[int],
+) -> Tuple[str, List[str]]:
+    record = history.get_run(run_id)
+    if record is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="run_not_found")
+    session = record.get(f"{role}_session")
+    if tmux is not None and session:
+        try:
+            if tmux.session_exists(session):
+                return "live", tmux.capture_pane(session, scrollback=scrollback).lines
+        except TmuxError:
+            pass
+    transcript = transcripts.open(run_id, role)
+    if transcript is not None and transcript.line_count:
+        return "transcript", transcript.tail(scrollback) if scrollback else transcript.read()
+    details = (record.get("summary") or {}).get("details")
+    if details and role == "secondary":
+        return "summary", list(details)
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="output_not_available")
@@ -2,25 +2,153 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
-from typing import Any
+import logging
+import time
+from typing import Any, Iterator, Optional
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.websockets import WebSocketState
 
-from .auth import verify_jwt
-from .config import load_settings
-from .websocket import ConnectionManager, RateLimitError
+from orchestra.config import OrchestraConfig, load_config, watch_config
+from orchestra.config_watcher import ConfigWatcher, ReloadEvent
+from orchestra.delegation import default_socket_path
 
+from . import api
+from .api import router as api_router
+from .auth import shutdown_verifier, verify_jwt_async
+from .backplane import UnixSocketBackplane
+from .config import Settings, get_settings, watch_settings
+from .metrics import CONTENT_TYPE, REGISTRY, WS_CONNECTIONS, WS_HANDSHAKE_SECONDS, WS_REJECTED, Sample
+from .pane_bridge import PaneBridge
+from .ratelimit import SCOPES, Limit
+from .supervisor import RunSupervisor
+from .websocket import (
+    MAX_BATCH_SIZE,
+    MAX_BATCH_WINDOW_MS,
+    SUBSCRIPTION_MESSAGES,
+    ConnectionManager,
+    RateLimitError,
+    parse_topics,
+)
+
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Project Orchestra Daemon")
+app.include_router(api_router)
 manager = ConnectionManager()
+pane_bridge = PaneBridge(manager)
+settings_watcher: Optional[ConfigWatcher[Settings]] = None
+config_watcher: Optional[ConfigWatcher[OrchestraConfig]] = None
+supervisor: Optional[RunSupervisor] = None
+
+
+def _on_settings_reload(event: ReloadEvent) -> None:
+    if not event.ok:
+        logger.warning("settings reload failed, keeping generation %s: %s", event.generation, event.error)
+        return
+    # Existing connections keep the claims they were admitted with; new handshakes
+    # verify against the reloaded issuer/audience/JWKS URL.
+    logger.info(
+        "settings reloaded (generation %s, load %.1f ms, changed %s)",
+        event.generation,
+        event.load_seconds * 1000,
+        ", ".join(event.changed),
+    )
+
+
+def _on_config_reload(event: ReloadEvent) -> None:
+    if not event.ok:
+        logger.warning("orchestra config reload failed, keeping generation %s: %s", event.generation, event.error)
+        return
+    # Runs already planned keep their snapshot; the next submission plans against this one.
+    logger.info("orchestra config reloaded (generation %s, changed %s)", event.generation, ", ".join(event.changed))
+
+
+def _apply_replay_limits(settings: Settings) -> None:
+    # Applied on the event loop as connections arrive, so hot-reloaded limits
+    # take effect without touching the buffer from the watcher thread.
+    replay = manager.replay
+    limits = (settings.replay_events_per_topic, settings.replay_bytes_per_topic, settings.replay_max_topics)
+    if limits != (replay.max_events, replay.max_bytes, replay.max_topics):
+        replay.configure(max_events=limits[0], max_bytes=limits[1], max_topics=limits[2])
+
+
+def _apply_rate_limits(settings: Settings) -> None:
+    limits = (
+        Limit(settings.rate_limit_connection_rate, settings.rate_limit_connection_burst),
+        Limit(settings.rate_limit_subject_rate, settings.rate_limit_subject_burst),
+        Limit(settings.rate_limit_global_rate, settings.rate_limit_global_burst),
+        settings.rate_limit_mode,
+        settings.rate_limit_max_delay_seconds,
+    )
+    if limits != manager.rate_limiter.limits:
+        manager.rate_limiter.configure(
+            per_connection=limits[0],
+            per_subject=limits[1],
+            global_limit=limits[2],
+            mode=limits[3],
+            max_delay=limits[4],
+        )
 
 
 @app.on_event("startup")
 async def startup_event() -> None:
-    load_settings()
+    global settings_watcher
+    settings_watcher = watch_settings()
+    settings_watcher.subscribe(_on_settings_reload)
+    settings_watcher.start()
+    # With several uvicorn workers, run ``python -m orchestra_daemon.backplane``
+    # and point every worker at its socket so publishes reach all clients.
+    backplane_socket = get_settings().backplane_socket
+    if backplane_socket:
+        manager.set_backplane(UnixSocketBackplane(backplane_socket))
+    await manager.backplane.start()
+    pane_bridge.attach()
+    await _start_supervisor(get_settings())
+
+
+async def _start_supervisor(settings: Settings) -> None:
+    global config_watcher, supervisor
+    if not settings.supervisor_enabled:
+        return
+    config_loader = load_config
+    try:
+        watcher = await asyncio.to_thread(watch_config)
+    except (OSError, ValueError) as exc:
+        # Without a valid config to watch, every submission loads (and reports) it afresh.
+        logger.warning("orchestra config is not watched: %s", exc)
+    else:
+        watcher.subscribe(_on_config_reload)
+        watcher.start()
+        config_watcher = watcher
+        config_loader = lambda: watcher.current
+    supervisor = RunSupervisor(manager, max_runs=settings.supervisor_max_runs, config_loader=config_loader)
+    await supervisor.start(settings.supervisor_socket or str(default_socket_path()))
+    api.set_supervisor(supervisor)
+    logger.info("run supervisor listening on %s", supervisor.socket_path)
+
+
+@app.on_event("shutdown")
+async def shutdown_event() -> None:
+    global config_watcher, settings_watcher, supervisor
+    if supervisor is not None:
+        api.set_supervisor(None)
+        await supervisor.close()
+        supervisor = None
+    if config_watcher is not None:
+        await asyncio.to_thread(config_watcher.stop)
+        config_watcher = None
+    if settings_watcher is not None:
+        await asyncio.to_thread(settings_watcher.stop)
+        settings_watcher = None
+    await asyncio.to_thread(pane_bridge.close)
+    await manager.close()
+    await manager.backplane.close()
+    shutdown_verifier()
 
 
 @app.get("/api/health")
@@ -28,38 +156,133 @@ async def health_check() -> JSONResponse:
     return JSONResponse({"status": "ok"})
 
 
+# ConnectionManager.stats() keys exported at scrape time: (key, kind, help).
+_MANAGER_METRICS = (
+    ("connections", "gauge", "Open observe connections."),
+    ("queue_depth", "gauge", "Frames queued across all connections."),
+    ("max_queue_depth", "gauge", "Deepest outbound queue."),
+    ("topics", "gauge", "Distinct subscribed topics."),
+    ("replay_events", "gauge", "Envelopes retained for replay."),
+    ("replay_bytes", "gauge", "Bytes retained for replay."),
+    ("dropped", "counter", "Frames dropped by the overflow policy."),
+    ("coalesced", "counter", "Frames replaced by a newer message with the same key."),
+    ("slow_consumer_evictions", "counter", "Connections closed as slow consumers."),
+    ("stalled_evictions", "counter", "Connections closed after a send stalled for the read timeout."),
+)
+
+
+def _manager_samples() -> Iterator[Sample]:
+    stats = manager.stats()
+    for key, kind, help_text in _MANAGER_METRICS:
+        name = f"orchestra_ws_{key}_total" if kind == "counter" else f"orchestra_ws_{key}"
+        yield Sample(name, kind, help_text, stats[key])
+    for scope in SCOPES:
+        yield Sample(
+            "orchestra_rate_limited_total",
+            "counter",
+            "Inbound messages rejected by the rate limiter, by exhausted budget.",
+            stats[f"rate_limit_rejected_{scope}"],
+            {"scope": scope},
+        )
+    yield Sample(
+        "orchestra_rate_limit_throttled_total",
+        "counter",
+        "Inbound messages delayed in soft rate limit mode.",
+        stats["rate_limit_throttled"],
+    )
+
+
+@app.get("/metrics")
+async def metrics() -> Response:
+    return Response(REGISTRY.render(_manager_samples()), media_type=CONTENT_TYPE)
+
+
 @app.websocket("/ws/observe")
 async def websocket_endpoint(websocket: WebSocket) -> None:
-    settings = load_settings()
+    started = time.perf_counter()
+    settings = get_settings()
     token = websocket.query_params.get("token")
     if not token:
         if not settings.allow_insecure_ws:
+            WS_REJECTED.labels("missing_token").inc()
             await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
             return
         subject = "local-debug"
         metadata = {"scope": "observe", "mode": "insecure"}
     else:
         try:
-            claims = verify_jwt(token)
+            claims = await verify_jwt_async(token)
         except Exception:
+            WS_REJECTED.labels("invalid_token").inc()
             await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
             return
         subject = str(claims.get("sub", "unknown"))
         metadata = {"scope": "observe"}
 
-    connection = await manager.connect(websocket, subject=subject, metadata=metadata)
+    topics = None
+    since = None
+    try:
+        if websocket.query_params.get("topics"):
+            topics = parse_topics(websocket.query_params["topics"])
+        if websocket.query_params.get("since"):
+            since = int(websocket.query_params["since"])
+            if since < 0:
+                raise ValueError(since)
+        # Opt-in batching: frames gathered for ``batch`` ms arrive as one JSON array.
+        batch_window_ms = int(websocket.query_params.get("batch", "0"))
+        batch_max = int(websocket.query_params.get("batch_max", "64"))
+        if not 0 <= batch_window_ms <= MAX_BATCH_WINDOW_MS or not 1 <= batch_max <= MAX_BATCH_SIZE:
+            raise ValueError("batch out of range")
+    except ValueError:  # includes InvalidTopicError
+        WS_REJECTED.labels("bad_request").inc()
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    _apply_replay_limits(settings)
+    _apply_rate_limits(settings)
+    # Peers that stop reading are reaped; dead ones are caught by uvicorn's pings (main.py).
+    manager.stall_timeout = float(settings.read_timeout_seconds)
+
+    connection = await manager.connect(
+        websocket,
+        subject=subject,
+        metadata=metadata,
+        queue_size=settings.send_queue_size,
+        overflow_policy=settings.send_overflow_policy,
+        topics=topics,
+        since=since,
+        batch_window_ms=batch_window_ms,
+        batch_max=batch_max,
+    )
+    WS_CONNECTIONS.inc()
+    WS_HANDSHAKE_SECONDS.observe(time.perf_counter() - started)
     try:
         while True:
             data = await websocket.receive_json()
             try:
                 envelope = await manager.handle_incoming(connection, data)
-            except RateLimitError:
-                await websocket.send_json({"type": "error", "error": "rate_limited"})
-                await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+            except RateLimitError as exc:
+                connection.enqueue({"type": "error", "error": "rate_limited", "scope": str(exc)}, force=True)
+                await connection.close(code=status.WS_1013_TRY_AGAIN_LATER)
                 break
-            await websocket.send_json({"type": "ack", "echo": envelope.get("type")})
+            # Replies share the outbound queue, so with the in-process backplane
+            # they follow the broadcast; a remote backplane echoes it later.
+            if envelope.get("type") == "error" and "from" not in envelope:
+                connection.enqueue(envelope, force=True)
+                continue
+            ack = {"type": "ack", "echo": envelope.get("type")}
+            if envelope.get("type") in SUBSCRIPTION_MESSAGES:
+                ack["topics"] = envelope["topics"]
+            connection.enqueue(ack, force=True)
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
+        pass
     finally:
-        if websocket.application_state != WebSocketState.DISCONNECTED:
-            await websocket.close()
+        manager.disconnect(websocket)
+        if (
+            websocket.application_state != WebSocketState.DISCONNECTED
+            and websocket.client_state != WebSocketState.DISCONNECTED
+        ):
+            try:
+                await websocket.close()
+            except (RuntimeError, WebSocketDisconnect):  # the peer vanished mid-close
+                pass
@@ -2,23 +2,33 @@
 
 from __future__ import annotations
 
-from functools import lru_cache
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
 from typing import Dict
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from jwt import PyJWKClient, decode
+from jwt import PyJWKClient, decode, get_unverified_header
 from jwt.exceptions import InvalidTokenError, PyJWKClientError
 
-from .config import Settings, load_settings
+from .config import Settings, get_settings, settings_provider
+from .jwks import JWKSCache, JWKSUnavailableError, UnknownKeyError
+from .metrics import JWT_VERIFY_SECONDS
+from .token_cache import VerifiedTokenCache
 
 
 bearer_scheme = HTTPBearer(auto_error=False)
 
+_VERIFY_CACHED = JWT_VERIFY_SECONDS.labels("cached")
+_VERIFY_OK = JWT_VERIFY_SECONDS.labels("ok")
+_VERIFY_INVALID = JWT_VERIFY_SECONDS.labels("invalid")
+_VERIFY_UNAVAILABLE = JWT_VERIFY_SECONDS.labels("unavailable")
+
 
-@lru_cache(maxsize=1)
 def _get_settings() -> Settings:
-    return load_settings()
+    return get_settings()
 
 
 @lru_cache(maxsize=1)
@@ -27,6 +37,76 @@ def _get_jwks_client() -> PyJWKClient:
     return PyJWKClient(settings.jwks_url)
 
 
+@lru_cache(maxsize=1)
+def _get_jwks_cache() -> JWKSCache:
+    settings = _get_settings()
+    return JWKSCache(settings.jwks_url)
+
+
+@lru_cache(maxsize=1)
+def _get_token_cache() -> VerifiedTokenCache:
+    settings = _get_settings()
+    return VerifiedTokenCache(max_entries=settings.token_cache_size, ttl=settings.token_cache_ttl_seconds)
+
+
+@lru_cache(maxsize=1)
+def _get_executor() -> ThreadPoolExecutor:
+    # cryptography releases the GIL during RSA verification, so a small pool
+    # keeps signature checks off the event loop and lets them run in parallel.
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="jwt-verify")
+
+
+def _on_settings_reload(_settings: Settings) -> None:
+    # Called on the settings watcher thread. The JWKS refresh task and the caches
+    # belong to the event loop verifying tokens, so tear them down there.
+    loop = None
+    if hasattr(_get_jwks_cache, "cache_info") and _get_jwks_cache.cache_info().currsize:
+        loop = _get_jwks_cache().loop
+    if loop is not None:
+        try:
+            loop.call_soon_threadsafe(_reset_verifier)
+            return
+        except RuntimeError:  # loop closed: nothing can be using the caches any more
+            pass
+    _reset_verifier()
+
+
+def _reset_verifier() -> None:
+    # The JWKS URL derives from the Auth0 domain, so rebuild the clients lazily.
+    if hasattr(_get_jwks_client, "cache_clear"):
+        _get_jwks_client.cache_clear()
+    if hasattr(_get_jwks_cache, "cache_clear"):
+        if _get_jwks_cache.cache_info().currsize:
+            _get_jwks_cache().stop()
+        _get_jwks_cache.cache_clear()
+    # Claims were validated against the old audience/issuer.
+    if hasattr(_get_token_cache, "cache_clear"):
+        _get_token_cache.cache_clear()
+
+
+settings_provider.subscribe(_on_settings_reload)
+
+
+def shutdown_verifier() -> None:
+    """Stop the JWKS background refresh and release the verification threads."""
+
+    if _get_jwks_cache.cache_info().currsize:
+        _get_jwks_cache().stop()
+    if _get_executor.cache_info().currsize:
+        _get_executor().shutdown(wait=False)
+        _get_executor.cache_clear()
+
+
+def verification_stats() -> Dict[str, float]:
+    """Verified-token cache hit rates plus JWKS fetch counters."""
+
+    stats = dict(_get_token_cache().stats())
+    jwks = _get_jwks_cache()
+    stats["jwks_fetches"] = jwks.fetches
+    stats["jwks_generation"] = jwks.generation
+    return stats
+
+
 def verify_jwt(token: str) -> Dict:
     settings = _get_settings()
     client = _get_jwks_client()
@@ -48,7 +128,71 @@ def verify_jwt(token: str) -> Dict:
     return claims
 
 
+async def verify_jwt_async(token: str) -> Dict:
+    """Event-loop friendly ``verify_jwt``.
+
+    Signing keys come from the shared ``JWKSCache`` (no blocking fetch), and the
+    signature check and claim validation run in the verification thread pool.
+    Claims of recently verified tokens are served from ``VerifiedTokenCache``.
+    """
+
+    started = time.perf_counter()
+    settings = _get_settings()
+    cache = _get_jwks_cache()
+    token_cache = _get_token_cache()
+    cached = token_cache.get(token, cache.generation)
+    if cached is not None:
+        _VERIFY_CACHED.observe(time.perf_counter() - started)
+        return cached
+    try:
+        header = get_unverified_header(token)
+        key = await cache.get_key(header.get("kid"))
+        generation = cache.generation
+        claims = await asyncio.get_running_loop().run_in_executor(
+            _get_executor(),
+            partial(
+                decode,
+                token,
+                key,
+                algorithms=[settings.auth0_algorithm],
+                audience=settings.auth0_audience,
+                issuer=settings.auth0_issuer,
+            ),
+        )
+    except (InvalidTokenError, UnknownKeyError) as exc:
+        _VERIFY_INVALID.observe(time.perf_counter() - started)
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="invalid_token") from exc
+    except (JWKSUnavailableError, PyJWKClientError, OSError) as exc:
+        _VERIFY_UNAVAILABLE.observe(time.perf_counter() - started)
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="jwks_unavailable") from exc
+    except Exception as exc:  # pragma: no cover - defensive
+        _VERIFY_INVALID.observe(time.perf_counter() - started)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="invalid_token") from exc
+    token_cache.put(token, claims, generation)
+    _VERIFY_OK.observe(time.perf_counter() - started)
+    return claims
+
+
 async def auth_dependency(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)) -> Dict:
     if not credentials or credentials.scheme.lower() != "bearer":
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="invalid_token")
-    return verify_jwt(credentials.credentials)
+    return await verify_jwt_async(credentials.credentials)
+
+
+def has_scope(claims: Dict, scope: str) -> bool:
+    """Whether the token grants ``scope`` in its ``scope`` string or Auth0 ``permissions`` list."""
+
+    granted = claims.get("scope")
+    scopes = set(granted.split()) if isinstance(granted, str) else set()
+    permissions = claims.get("permissions")
+    if isinstance(permissions, list):
+        scopes.update(permission for permission in permissions if isinstance(permission, str))
+    return scope in scopes
+
+
+async def submit_dependency(claims: Dict = Depends(auth_dependency)) -> Dict:
+    """``auth_dependency`` for routes that start runs: observer tokens are not enough."""
+
+    if not has_scope(claims, _get_settings().supervisor_submit_scope):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="insufficient_scope")
+    return claims
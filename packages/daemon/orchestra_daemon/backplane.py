@@ -0,0 +1,308 @@
+"""Pub/sub backplane that fans published envelopes out to every daemon worker.
+
+Each worker's ``ConnectionManager`` hands publishes to its backplane, and the
+backplane calls the manager's ``deliver`` for every message, from any worker,
+with a global sequence number. ``InProcessBackplane`` serves the single-worker
+case. ``UnixSocketBackplane`` connects to a ``BackplaneBroker`` (run it with
+``python -m orchestra_daemon.backplane --socket PATH``) so several uvicorn
+workers share one stream; the broker numbers messages and also hands out
+named claims, used to keep a single pane reader per run across workers.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+DeliverFn = Callable[[str, Dict, int, bool], int]
+ReleaseListener = Callable[[str], None]
+
+# Bytes the broker may buffer for one worker before evicting it as stalled.
+MAX_WORKER_BUFFER = 16 << 20
+
+
+class Backplane(ABC):
+    """Transport between ``ConnectionManager`` instances."""
+
+    def __init__(self) -> None:
+        self._deliver: Optional[DeliverFn] = None
+        self._release_listeners: List[ReleaseListener] = []
+
+    def bind(self, deliver: DeliverFn) -> None:
+        self._deliver = deliver
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    @abstractmethod
+    def publish(self, topic: str, payload: Dict, coalesce: bool) -> int:
+        """Send ``payload`` to every worker; returns local deliveries made synchronously."""
+
+    async def acquire(self, name: str) -> bool:
+        """Claim ``name`` for this worker; False if another worker holds it."""
+
+        return True
+
+    def release(self, name: str) -> None:
+        pass
+
+    def on_release(self, listener: ReleaseListener) -> Callable[[], None]:
+        """Call ``listener(name)`` when a claim held elsewhere is released."""
+
+        self._release_listeners.append(listener)
+
+        def remove() -> None:
+            if listener in self._release_listeners:
+                self._release_listeners.remove(listener)
+
+        return remove
+
+    def _notify_release(self, name: str) -> None:
+        for listener in list(self._release_listeners):
+            listener(name)
+
+
+class InProcessBackplane(Backplane):
+    """Deliver straight to the local manager; the single-worker default."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._seq = itertools.count(1)
+
+    def publish(self, topic: str, payload: Dict, coalesce: bool) -> int:
+        assert self._deliver is not None, "backplane is not bound to a manager"
+        return self._deliver(topic, payload, next(self._seq), coalesce)
+
+
+class UnixSocketBackplane(Backplane):
+    """Relay publishes through a ``BackplaneBroker`` listening on a unix socket.
+
+    Local subscribers receive a worker's own publishes when the broker echoes
+    them back, so all workers see one order. If the broker is unreachable the
+    worker keeps serving its connections, drops publishes (counted in
+    ``dropped``) and reconnects every ``reconnect_interval`` seconds; claims
+    are granted locally while disconnected.
+    """
+
+    def __init__(self, path: str, *, reconnect_interval: float = 1.0, acquire_timeout: float = 2.0) -> None:
+        super().__init__()
+        self.path = path
+        self._reconnect_interval = reconnect_interval
+        self._acquire_timeout = acquire_timeout
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+        self._connected = asyncio.Event()
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._request_ids = itertools.count(1)
+        self.dropped = 0
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        try:
+            await asyncio.wait_for(self._connected.wait(), self._reconnect_interval)
+        except asyncio.TimeoutError:
+            logger.warning("backplane broker at %s not reachable yet; retrying in the background", self.path)
+
+    async def close(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._disconnected()
+
+    def publish(self, topic: str, payload: Dict, coalesce: bool) -> int:
+        if not self._send({"op": "publish", "topic": topic, "payload": payload, "coalesce": coalesce}):
+            self.dropped += 1
+        return 0
+
+    async def acquire(self, name: str) -> bool:
+        request_id = next(self._request_ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            if not self._send({"op": "acquire", "name": name, "id": request_id}):
+                return True
+            return await asyncio.wait_for(future, self._acquire_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("backplane claim for %s timed out; assuming ownership", name)
+            return True
+        finally:
+            self._pending.pop(request_id, None)
+
+    def release(self, name: str) -> None:
+        self._send({"op": "release", "name": name})
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+    def _send(self, message: Dict) -> bool:
+        writer = self._writer
+        if writer is None or writer.is_closing():
+            return False
+        writer.write(json.dumps(message, separators=(",", ":")).encode("utf-8") + b"\n")
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.path, limit=1 << 24)
+            except OSError:
+                await asyncio.sleep(self._reconnect_interval)
+                continue
+            self._writer = writer
+            self._connected.set()
+            try:
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    self._handle(json.loads(line))
+            except (OSError, ValueError) as exc:
+                logger.warning("backplane connection lost: %s", exc)
+            finally:
+                self._disconnected()
+            await asyncio.sleep(self._reconnect_interval)
+
+    def _disconnected(self) -> None:
+        writer, self._writer = self._writer, None
+        self._connected.clear()
+        if writer is not None:
+            writer.close()
+        for future in self._pending.values():
+            if not future.done():
+                future.set_result(True)
+
+    def _handle(self, message: Dict) -> None:
+        op = message.get("op")
+        if op == "message" and self._deliver is not None:
+            self._deliver(message["topic"], message["payload"], message["seq"], message.get("coalesce", True))
+        elif op == "acquired":
+            future = self._pending.get(message.get("id"))
+            if future is not None and not future.done():
+                future.set_result(bool(message.get("granted")))
+        elif op == "released":
+            self._notify_release(message["name"])
+
+
+class BackplaneBroker:
+    """Minimal broker: numbers publishes, echoes them to every worker, tracks claims.
+
+    Writes never wait for a worker. A worker that stops reading until more than
+    ``max_buffer`` bytes are queued for it is disconnected and its claims are
+    released, so one stalled worker cannot grow the broker's memory.
+    """
+
+    def __init__(self, path: str, *, max_buffer: int = MAX_WORKER_BUFFER) -> None:
+        self.path = path
+        self.max_buffer = max_buffer
+        self.seq = 0
+        self.evictions = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._clients: List[asyncio.StreamWriter] = []
+        self._claims: Dict[str, asyncio.StreamWriter] = {}
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_unix_server(self._serve, path=self.path, limit=1 << 24)
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for writer in list(self._clients):
+            writer.close()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._clients.append(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line.endswith(b"\n"):  # EOF, possibly mid-line after an eviction
+                    break
+                self._handle(json.loads(line), writer)
+        except (OSError, ValueError) as exc:
+            logger.warning("backplane worker disconnected: %s", exc)
+        finally:
+            self._disconnect(writer)
+
+    def _handle(self, message: Dict, writer: asyncio.StreamWriter) -> None:
+        op = message.get("op")
+        if op == "publish":
+            self.seq += 1
+            self._broadcast({**message, "op": "message", "seq": self.seq})
+        elif op == "acquire":
+            owner = self._claims.setdefault(message["name"], writer)
+            self._write(writer, {"op": "acquired", "id": message.get("id"), "granted": owner is writer})
+        elif op == "release" and self._claims.get(message.get("name")) is writer:
+            self._release(message["name"])
+
+    def _release(self, name: str) -> None:
+        del self._claims[name]
+        self._broadcast({"op": "released", "name": name})
+
+    def _broadcast(self, message: Dict) -> None:
+        data = json.dumps(message, separators=(",", ":")).encode("utf-8") + b"\n"
+        for client in list(self._clients):
+            self._send(client, data)
+
+    def _write(self, writer: asyncio.StreamWriter, message: Dict) -> None:
+        self._send(writer, json.dumps(message, separators=(",", ":")).encode("utf-8") + b"\n")
+
+    def _send(self, writer: asyncio.StreamWriter, data: bytes) -> None:
+        if writer.is_closing() or writer not in self._clients:
+            return
+        if writer.transport.get_write_buffer_size() > self.max_buffer:
+            logger.warning("backplane worker stopped reading; disconnecting it")
+            self.evictions += 1
+            writer.transport.abort()
+            self._disconnect(writer)
+            return
+        writer.write(data)
+
+    def _disconnect(self, writer: asyncio.StreamWriter) -> None:
+        if writer not in self._clients:
+            return
+        self._clients.remove(writer)
+        for name in [name for name, owner in self._claims.items() if owner is writer]:
+            self._release(name)
+        writer.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the orchestra daemon backplane broker.")
+    parser.add_argument("--socket", required=True, help="Unix socket path shared with the workers")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    async def serve() -> None:
+        broker = BackplaneBroker(args.socket)
+        await broker.start()
+        logger.info("backplane broker listening on %s", args.socket)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await broker.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
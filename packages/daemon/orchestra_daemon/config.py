@@ -2,11 +2,18 @@
 
 from __future__ import annotations
 
+import os
+import threading
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import Callable, List, Mapping, Optional
 
-from dotenv import load_dotenv
+from dotenv import dotenv_values
+
+from orchestra.config_watcher import ConfigWatcher
+
+from .ratelimit import RATE_LIMIT_MODES
+from .websocket import OVERFLOW_POLICIES
 
 
 DEFAULT_ENV_PATH = Path(__file__).resolve().parents[2] / ".env"
@@ -20,6 +27,26 @@ class Settings:
     auth0_algorithm: str = "RS256"
     read_timeout_seconds: int = 30
     allow_insecure_ws: bool = False
+    token_cache_size: int = 1024
+    token_cache_ttl_seconds: float = 300.0
+    send_queue_size: int = 256
+    send_overflow_policy: str = "drop_oldest"
+    replay_events_per_topic: int = 256
+    replay_bytes_per_topic: int = 1 << 20
+    replay_max_topics: int = 1024
+    backplane_socket: Optional[str] = None
+    rate_limit_mode: str = "hard"
+    rate_limit_connection_rate: float = 10.0
+    rate_limit_connection_burst: float = 10.0
+    rate_limit_subject_rate: float = 20.0
+    rate_limit_subject_burst: float = 20.0
+    rate_limit_global_rate: float = 1000.0
+    rate_limit_global_burst: float = 2000.0
+    rate_limit_max_delay_seconds: float = 1.0
+    supervisor_enabled: bool = False
+    supervisor_socket: Optional[str] = None
+    supervisor_max_runs: int = 4
+    supervisor_submit_scope: str = "runs:submit"
 
     @property
     def jwks_url(self) -> str:
@@ -27,14 +54,13 @@ class Settings:
 
 
 def load_settings(env_path: Optional[Path] = None) -> Settings:
-    load_dotenv(env_path or DEFAULT_ENV_PATH)
-    import os
+    env = _read_environment(env_path or DEFAULT_ENV_PATH)
 
-    domain = os.getenv("AUTH0_DOMAIN")
-    audience = os.getenv("AUTH0_AUDIENCE")
-    issuer = os.getenv("AUTH0_ISSUER") or (f"https://{domain}/" if domain else None)
+    domain = env.get("AUTH0_DOMAIN")
+    audience = env.get("AUTH0_AUDIENCE")
+    issuer = env.get("AUTH0_ISSUER") or (f"https://{domain}/" if domain else None)
 
-    insecure_flag = os.getenv("ORCHESTRA_DAEMON_ALLOW_INSECURE_WS", "0").lower()
+    insecure_flag = env.get("ORCHESTRA_DAEMON_ALLOW_INSECURE_WS", "0").lower()
     allow_insecure_ws = insecure_flag in {"1", "true", "yes"}
 
     if not domain or not audience or not issuer:
@@ -45,8 +71,28 @@ def load_settings(env_path: Optional[Path] = None) -> Settings:
         audience = audience or "local-audience"
         issuer = issuer or "https://local.example/"
 
-    algorithm = os.getenv("AUTH0_ALGORITHM", "RS256")
-    timeout = int(os.getenv("DAEMON_READ_TIMEOUT_SECONDS", "30"))
+    algorithm = env.get("AUTH0_ALGORITHM", "RS256")
+    timeout = int(env.get("DAEMON_READ_TIMEOUT_SECONDS", "30"))
+    token_cache_size = int(env.get("DAEMON_TOKEN_CACHE_SIZE", "1024"))
+    token_cache_ttl = float(env.get("DAEMON_TOKEN_CACHE_TTL_SECONDS", "300"))
+    send_queue_size = int(env.get("DAEMON_SEND_QUEUE_SIZE", "256"))
+    send_overflow_policy = env.get("DAEMON_SEND_OVERFLOW_POLICY", "drop_oldest").lower()
+    if send_overflow_policy not in OVERFLOW_POLICIES:
+        raise RuntimeError(f"DAEMON_SEND_OVERFLOW_POLICY must be one of {', '.join(OVERFLOW_POLICIES)}")
+    replay_events = int(env.get("DAEMON_REPLAY_EVENTS", "256"))
+    replay_bytes = int(env.get("DAEMON_REPLAY_BYTES", str(1 << 20)))
+    replay_topics = int(env.get("DAEMON_REPLAY_TOPICS", "1024"))
+    backplane_socket = env.get("DAEMON_BACKPLANE_SOCKET") or None
+    rate_limit_mode = env.get("DAEMON_RATE_LIMIT_MODE", "hard").lower()
+    if rate_limit_mode not in RATE_LIMIT_MODES:
+        raise RuntimeError(f"DAEMON_RATE_LIMIT_MODE must be one of {', '.join(RATE_LIMIT_MODES)}")
+    connection_rate = float(env.get("DAEMON_RATE_LIMIT_CONNECTION_RATE", "10"))
+    subject_rate = float(env.get("DAEMON_RATE_LIMIT_SUBJECT_RATE", "20"))
+    global_rate = float(env.get("DAEMON_RATE_LIMIT_GLOBAL_RATE", "1000"))
+    supervisor_enabled = env.get("DAEMON_SUPERVISOR", "0").lower() in {"1", "true", "yes"}
+    supervisor_max_runs = int(env.get("DAEMON_SUPERVISOR_MAX_RUNS", "4"))
+    if supervisor_max_runs < 1:
+        raise RuntimeError("DAEMON_SUPERVISOR_MAX_RUNS must be at least 1")
 
     return Settings(
         auth0_domain=domain,
@@ -55,4 +101,100 @@ def load_settings(env_path: Optional[Path] = None) -> Settings:
         auth0_algorithm=algorithm,
         read_timeout_seconds=timeout,
         allow_insecure_ws=allow_insecure_ws,
+        token_cache_size=token_cache_size,
+        token_cache_ttl_seconds=token_cache_ttl,
+        send_queue_size=send_queue_size,
+        send_overflow_policy=send_overflow_policy,
+        replay_events_per_topic=replay_events,
+        replay_bytes_per_topic=replay_bytes,
+        replay_max_topics=replay_topics,
+        backplane_socket=backplane_socket,
+        rate_limit_mode=rate_limit_mode,
+        rate_limit_connection_rate=connection_rate,
+        rate_limit_connection_burst=float(env.get("DAEMON_RATE_LIMIT_CONNECTION_BURST", str(connection_rate))),
+        rate_limit_subject_rate=subject_rate,
+        rate_limit_subject_burst=float(env.get("DAEMON_RATE_LIMIT_SUBJECT_BURST", str(subject_rate))),
+        rate_limit_global_rate=global_rate,
+        rate_limit_global_burst=float(env.get("DAEMON_RATE_LIMIT_GLOBAL_BURST", str(global_rate * 2))),
+        rate_limit_max_delay_seconds=float(env.get("DAEMON_RATE_LIMIT_MAX_DELAY_SECONDS", "1.0")),
+        supervisor_enabled=supervisor_enabled,
+        supervisor_socket=env.get("DAEMON_SUPERVISOR_SOCKET") or None,
+        supervisor_max_runs=supervisor_max_runs,
+        supervisor_submit_scope=env.get("DAEMON_SUPERVISOR_SUBMIT_SCOPE", "runs:submit"),
+    )
+
+
+class SettingsProvider:
+    """Process-wide cache of ``Settings`` shared by the app and auth layers.
+
+    ``get()`` is a plain attribute read once loaded, so hot paths such as the
+    WebSocket handshake never touch the ``.env`` file. ``reload()`` re-reads it
+    and notifies subscribers after the new snapshot is in place.
+    """
+
+    def __init__(self, env_path: Optional[Path] = None) -> None:
+        self._env_path = env_path
+        self._settings: Optional[Settings] = None
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[Settings], None]] = []
+
+    @property
+    def env_path(self) -> Path:
+        return self._env_path or DEFAULT_ENV_PATH
+
+    def get(self) -> Settings:
+        settings = self._settings
+        if settings is None:
+            with self._lock:
+                if self._settings is None:
+                    self._settings = load_settings(self.env_path)
+                settings = self._settings
+        return settings
+
+    def reload(self) -> Settings:
+        settings = load_settings(self.env_path)
+        with self._lock:
+            self._settings = settings
+        for listener in list(self._listeners):
+            listener(settings)
+        return settings
+
+    def clear(self) -> None:
+        with self._lock:
+            self._settings = None
+
+    def subscribe(self, listener: Callable[[Settings], None]) -> None:
+        self._listeners.append(listener)
+
+
+settings_provider = SettingsProvider()
+
+
+def get_settings() -> Settings:
+    return settings_provider.get()
+
+
+def watch_settings(
+    env_path: Optional[Path] = None,
+    *,
+    provider: Optional[SettingsProvider] = None,
+    **kwargs,
+) -> ConfigWatcher[Settings]:
+    """Return a watcher that reloads ``provider`` whenever its ``.env`` file changes."""
+
+    if provider is None:
+        provider = SettingsProvider(env_path) if env_path else settings_provider
+    return ConfigWatcher(
+        provider.reload,
+        lambda _settings: [provider.env_path],
+        name="daemon-settings",
+        **kwargs,
     )
+
+
+def _read_environment(env_path: Path) -> Mapping[str, str]:
+    # Process environment wins over the .env file, matching load_dotenv(override=False),
+    # but os.environ is left untouched so a later reload sees edits to the file.
+    values = {key: value for key, value in dotenv_values(env_path).items() if value is not None}
+    values.update(os.environ)
+    return values
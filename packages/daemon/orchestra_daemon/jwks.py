@@ -0,0 +1,191 @@
+"""Asynchronous JWKS key cache with background refresh and kid-miss handling."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import httpx
+from jwt import PyJWKSet
+from jwt.exceptions import PyJWKClientError, PyJWKSetError
+
+
+logger = logging.getLogger(__name__)
+
+Fetcher = Callable[[], Awaitable[Dict[str, Any]]]
+
+# Unknown kids remembered at once; random kids in garbage tokens evict the oldest.
+MAX_NEGATIVE_ENTRIES = 1024
+
+
+class JWKSUnavailableError(PyJWKClientError):
+    """Raised when the key set cannot be fetched and no cached key applies."""
+
+
+class UnknownKeyError(PyJWKClientError):
+    """Raised when a token references a ``kid`` that the key set does not contain."""
+
+
+class JWKSCache:
+    """Keep signing keys in memory so verification never waits on the network.
+
+    Keys are refreshed by a background task every ``refresh_interval`` seconds.
+    A token with an unknown ``kid`` triggers at most one refetch per
+    ``min_refetch_interval`` (concurrent misses share it); a ``kid`` that is
+    still missing afterwards is remembered for ``negative_ttl`` seconds so
+    garbage tokens cannot force repeated fetches; at most ``max_negative``
+    such kids are kept. ``generation`` increases whenever the set of key ids
+    changes.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        *,
+        fetch: Optional[Fetcher] = None,
+        refresh_interval: float = 300.0,
+        min_refetch_interval: float = 10.0,
+        negative_ttl: float = 60.0,
+        max_negative: int = MAX_NEGATIVE_ENTRIES,
+        timeout: float = 5.0,
+    ) -> None:
+        self._url = url
+        self._fetch = fetch or self._http_fetch
+        self._refresh_interval = refresh_interval
+        self._min_refetch_interval = min_refetch_interval
+        self._negative_ttl = negative_ttl
+        self._max_negative = max_negative
+        self._timeout = timeout
+
+        self._keys: Dict[Optional[str], Any] = {}
+        self._negative: "OrderedDict[Optional[str], float]" = OrderedDict()
+        self._last_fetch: Optional[float] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self.generation = 0
+        self.fetches = 0
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    async def get_key(self, kid: Optional[str]) -> Any:
+        self._bind_loop()
+        key = self._lookup(kid)
+        if key is not None:
+            return key
+
+        now = time.monotonic()
+        expires = self._negative.get(kid)
+        if expires is not None and expires > now:
+            raise UnknownKeyError(f"Unknown signing key '{kid}'")
+
+        assert self._lock is not None
+        async with self._lock:
+            key = self._lookup(kid)
+            if key is not None:
+                return key
+            if self._last_fetch is None or time.monotonic() - self._last_fetch >= self._min_refetch_interval:
+                await self._refresh_locked()
+            key = self._lookup(kid)
+
+        if key is None:
+            self._remember_missing(kid)
+            raise UnknownKeyError(f"Unknown signing key '{kid}'")
+        return key
+
+    @property
+    def loop(self) -> Optional[asyncio.AbstractEventLoop]:
+        """Event loop the cache is bound to, once it has been used."""
+
+        return self._loop
+
+    async def refresh(self) -> bool:
+        """Fetch the key set now; returns True if the key ids changed."""
+
+        self._bind_loop()
+        assert self._lock is not None
+        async with self._lock:
+            return await self._refresh_locked()
+
+    def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            try:
+                task.cancel()
+            except RuntimeError:  # owning loop already closed
+                pass
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+    def _lookup(self, kid: Optional[str]) -> Any:
+        key = self._keys.get(kid)
+        if key is None and kid is None and len(self._keys) == 1:
+            key = next(iter(self._keys.values()))
+        return key
+
+    def _remember_missing(self, kid: Optional[str]) -> None:
+        now = time.monotonic()
+        negative = self._negative
+        # Entries are kept in expiry order (the TTL is fixed), so expired ones lead.
+        while negative and next(iter(negative.values())) <= now:
+            negative.popitem(last=False)
+        negative.pop(kid, None)
+        negative[kid] = now + self._negative_ttl
+        while len(negative) > self._max_negative:
+            negative.popitem(last=False)
+
+    def _bind_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if loop is self._loop:
+            return
+        # Locks and tasks belong to one loop; rebind when used from a new one.
+        self.stop()
+        self._loop = loop
+        self._lock = asyncio.Lock()
+        if self._refresh_interval > 0:
+            self._task = loop.create_task(self._refresh_loop())
+
+    async def _refresh_locked(self) -> bool:
+        self._last_fetch = time.monotonic()
+        self.fetches += 1
+        try:
+            data = await self._fetch()
+            keys = await asyncio.to_thread(_parse_keys, data)
+        except (httpx.HTTPError, OSError, ValueError, PyJWKSetError) as exc:
+            if not self._keys:
+                raise JWKSUnavailableError(f"Unable to fetch JWKS from {self._url}: {exc}") from exc
+            logger.warning("JWKS refresh failed, keeping %d cached keys: %s", len(self._keys), exc)
+            return False
+
+        changed = set(keys) != set(self._keys)
+        self._keys = keys
+        if changed:
+            self.generation += 1
+            self._negative.clear()
+        return changed
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._refresh_interval)
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:  # pragma: no cover - keep refreshing
+                logger.warning("background JWKS refresh failed: %s", exc)
+
+    async def _http_fetch(self) -> Dict[str, Any]:
+        async with httpx.AsyncClient(timeout=self._timeout) as client:
+            response = await client.get(self._url)
+            response.raise_for_status()
+            return response.json()
+
+
+def _parse_keys(data: Dict[str, Any]) -> Dict[Optional[str], Any]:
+    key_set = PyJWKSet.from_dict(data)
+    return {jwk.key_id: jwk.key for jwk in key_set.keys if jwk.public_key_use in (None, "sig")}
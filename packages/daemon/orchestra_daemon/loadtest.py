@@ -0,0 +1,504 @@
+"""Load generator for the observe WebSocket.
+
+Opens ``--observers`` clients subscribed to one topic and ``--publishers``
+clients that send envelopes to it at ``--rate`` messages per second in total,
+then reports end-to-end broadcast latency percentiles, delivered throughput,
+messages lost to overflow or rate limiting, and the daemon's resident memory.
+The report is JSON so runs can be diffed::
+
+    python -m orchestra_daemon.loadtest --observers 500 --rate 200 --duration 30 --output run.json
+
+The daemon under test is either started here (``--server inprocess``, uvicorn
+on a thread of this process, the default; ``--server subprocess``, a separate
+``uvicorn`` process) or already running (``--url``). Clients connect in
+insecure mode, or with ``--auth token`` using tokens signed by a key minted
+for the run (in-process only, since the daemon must trust that key).
+``--no-rate-limit`` disables the inbound budgets of a daemon started here.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import urlencode
+
+import httpx
+import websockets
+
+from .config import settings_provider
+
+
+MESSAGE_TYPE = "loadtest"
+SERVERS = ("inprocess", "subprocess")
+AUTH_MODES = ("insecure", "token")
+_AUDIENCE = "orchestra-loadtest"
+_ISSUER = "https://loadtest.invalid/"
+
+
+@dataclass
+class LoadTestConfig:
+    observers: int = 100
+    publishers: int = 1
+    rate: float = 50.0
+    duration: float = 10.0
+    topic: str = "run:loadtest"
+    payload_bytes: int = 256
+    batch_ms: int = 0
+    server: str = "inprocess"
+    url: Optional[str] = None
+    pid: Optional[int] = None
+    auth: str = "insecure"
+    rate_limit: bool = True
+    drain_seconds: float = 2.0
+    connect_concurrency: int = 100
+
+
+@dataclass
+class _Counters:
+    published: int = 0
+    acked: int = 0
+    rate_limited: int = 0
+    errors: int = 0
+    reconnects: int = 0
+    delivered: int = 0
+    latencies: List[float] = field(default_factory=list)
+    connect_times: List[float] = field(default_factory=list)
+
+
+# ----------------------------------------------------------------------
+# Daemon under test
+# ----------------------------------------------------------------------
+class _Daemon:
+    url: str
+    pid: Optional[int] = None
+
+    def stop(self) -> None:
+        pass
+
+    def rss_bytes(self) -> Optional[int]:
+        return _rss_bytes(self.pid) if self.pid is not None else None
+
+
+class _ExternalDaemon(_Daemon):
+    def __init__(self, url: str, pid: Optional[int]) -> None:
+        self.url = url.rstrip("/")
+        self.pid = pid
+
+
+class _InProcessDaemon(_Daemon):
+    """uvicorn on a thread; RSS then includes the load generator itself."""
+
+    def __init__(self) -> None:
+        import uvicorn
+
+        from .app import app
+
+        sock = socket.socket()
+        sock.bind(("127.0.0.1", 0))
+        self._server = uvicorn.Server(uvicorn.Config(app, log_level="warning", lifespan="off", ws_max_queue=1024))
+        self._thread = threading.Thread(target=self._server.run, kwargs={"sockets": [sock]}, daemon=True)
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        self.url = f"http://127.0.0.1:{sock.getsockname()[1]}"
+        self.pid = os.getpid()
+
+    def stop(self) -> None:
+        self._server.should_exit = True
+        self._thread.join(5)
+
+
+class _SubprocessDaemon(_Daemon):
+    def __init__(self, env: Dict[str, str]) -> None:
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        package_root = Path(__file__).resolve().parents[1]
+        self._process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "orchestra_daemon.app:app", "--port", str(port), "--log-level", "warning"],
+            cwd=package_root,
+            env={**os.environ, **env, "PYTHONPATH": os.pathsep.join([str(package_root), str(package_root.parents[1])])},
+        )
+        self.url = f"http://127.0.0.1:{port}"
+        self.pid = self._process.pid
+        deadline = time.monotonic() + 15
+        while True:
+            try:
+                httpx.get(f"{self.url}/api/health", timeout=1.0).raise_for_status()
+                return
+            except httpx.HTTPError:
+                if self._process.poll() is not None or time.monotonic() > deadline:
+                    self.stop()
+                    raise RuntimeError("daemon subprocess did not become healthy")
+                time.sleep(0.1)
+
+    def stop(self) -> None:
+        self._process.terminate()
+        try:
+            self._process.wait(10)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+
+
+def _rss_bytes(pid: int) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as handle:
+            for line in handle:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+@contextmanager
+def _environment(values: Dict[str, str]) -> Iterator[None]:
+    previous = {key: os.environ.get(key) for key in values}
+    os.environ.update(values)
+    try:
+        yield
+    finally:
+        for key, value in previous.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+def _daemon_env(config: LoadTestConfig) -> Dict[str, str]:
+    env = {"ORCHESTRA_DAEMON_ALLOW_INSECURE_WS": "1"}
+    if config.auth == "token":
+        env.update({"AUTH0_DOMAIN": "loadtest.invalid", "AUTH0_AUDIENCE": _AUDIENCE, "AUTH0_ISSUER": _ISSUER})
+    if not config.rate_limit:
+        for scope in ("CONNECTION", "SUBJECT", "GLOBAL"):
+            env[f"DAEMON_RATE_LIMIT_{scope}_RATE"] = "0"
+    return env
+
+
+class _TokenMinter:
+    """Sign tokens with a throwaway key and make the in-process daemon trust it."""
+
+    def __init__(self) -> None:
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import rsa
+        from jwt.algorithms import RSAAlgorithm
+
+        from . import auth
+        from .jwks import JWKSCache
+
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self._private_pem = key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        )
+        jwk = RSAAlgorithm.to_jwk(key.public_key(), as_dict=True)
+        jwk.update({"kid": "loadtest", "use": "sig", "alg": "RS256"})
+
+        async def fetch() -> Dict:
+            return {"keys": [jwk]}
+
+        cache = JWKSCache("https://loadtest.invalid/.well-known/jwks.json", fetch=fetch)
+        self._auth = auth
+        self._original = auth._get_jwks_cache
+        auth._get_jwks_cache = lambda: cache
+
+    def token(self, subject: str) -> str:
+        from jwt import encode
+
+        claims = {"sub": subject, "aud": _AUDIENCE, "iss": _ISSUER, "exp": int(time.time()) + 3600}
+        return encode(claims, self._private_pem, algorithm="RS256", headers={"kid": "loadtest"})
+
+    def restore(self) -> None:
+        self._auth._get_jwks_cache = self._original
+
+
+# ----------------------------------------------------------------------
+# Clients
+# ----------------------------------------------------------------------
+class _Run:
+    def __init__(self, config: LoadTestConfig, base_url: str, minter: Optional[_TokenMinter]) -> None:
+        self.config = config
+        self.ws_url = base_url.replace("http", "ws", 1) + "/ws/observe"
+        self.minter = minter
+        self.counters = _Counters()
+        self.filler = "x" * config.payload_bytes
+        self._connect_slots = asyncio.Semaphore(config.connect_concurrency)
+
+    def _url(self, name: str, topics: str, batch_ms: int = 0) -> str:
+        params = {"topics": topics}
+        if batch_ms:
+            params["batch"] = str(batch_ms)
+        if self.minter is not None:
+            params["token"] = self.minter.token(name)
+        return f"{self.ws_url}?{urlencode(params)}"
+
+    async def _connect(self, url: str):
+        async with self._connect_slots:
+            started = time.perf_counter()
+            ws = await websockets.connect(url, max_size=None, open_timeout=30)
+            self.counters.connect_times.append(time.perf_counter() - started)
+            return ws
+
+    async def observe(self, index: int, ready: asyncio.Event, done: asyncio.Event) -> None:
+        counters = self.counters
+        ws = await self._connect(self._url(f"observer-{index}", self.config.topic, self.config.batch_ms))
+        ready.set()
+        try:
+            while not done.is_set():
+                try:
+                    raw = await asyncio.wait_for(ws.recv(), 0.25)
+                except asyncio.TimeoutError:
+                    continue
+                now = time.perf_counter()
+                data = json.loads(raw)
+                for message in data if isinstance(data, list) else [data]:
+                    if message.get("type") == MESSAGE_TYPE:
+                        counters.delivered += 1
+                        counters.latencies.append(now - message["payload"]["sent"])
+        except websockets.ConnectionClosed:
+            counters.errors += 1
+        finally:
+            await ws.close()
+
+    async def publish(self, index: int, deadline: float) -> None:
+        counters = self.counters
+        interval = self.config.publishers / self.config.rate
+        # Publishers subscribe elsewhere so they only read their own acks.
+        url = self._url(f"publisher-{index}", "loadtest:publishers")
+        next_send = time.perf_counter() + interval * index / self.config.publishers
+        while time.perf_counter() < deadline:
+            ws = await self._connect(url)
+            reader = asyncio.create_task(self._read_replies(ws))
+            try:
+                while time.perf_counter() < deadline and not reader.done():
+                    await asyncio.sleep(max(0.0, next_send - time.perf_counter()))
+                    next_send += interval
+                    message = {
+                        "type": MESSAGE_TYPE,
+                        "topic": self.config.topic,
+                        "payload": {"sent": time.perf_counter(), "publisher": index, "data": self.filler},
+                    }
+                    await ws.send(json.dumps(message))
+                    counters.published += 1
+            except websockets.ConnectionClosed:
+                pass
+            # Give the last acks a moment before closing.
+            await asyncio.sleep(0.2)
+            await ws.close()
+            await asyncio.gather(reader, return_exceptions=True)
+            if time.perf_counter() < deadline:
+                # Hard rate limiting closes the socket; reconnect and carry on.
+                counters.reconnects += 1
+
+    async def _read_replies(self, ws) -> None:
+        counters = self.counters
+        try:
+            async for raw in ws:
+                message = json.loads(raw)
+                kind = message.get("type")
+                if kind == "ack" and message.get("echo") == MESSAGE_TYPE:
+                    counters.acked += 1
+                elif kind == "error" and message.get("error") == "rate_limited":
+                    counters.rate_limited += 1
+                elif kind == "error":
+                    counters.errors += 1
+        except websockets.ConnectionClosed:
+            pass
+
+
+async def _drive(config: LoadTestConfig, daemon: _Daemon, minter: Optional[_TokenMinter]) -> Dict:
+    run = _Run(config, daemon.url, minter)
+    rss: List[int] = []
+    metrics_before = await _scrape(daemon.url)
+
+    done = asyncio.Event()
+    readies = [asyncio.Event() for _ in range(config.observers)]
+    observers = [asyncio.create_task(run.observe(index, ready, done)) for index, ready in enumerate(readies)]
+    await asyncio.gather(*(ready.wait() for ready in readies))
+    rss_start = daemon.rss_bytes()
+
+    async def sample_rss() -> None:
+        while not done.is_set():
+            value = daemon.rss_bytes()
+            if value is not None:
+                rss.append(value)
+            await asyncio.sleep(0.5)
+
+    sampler = asyncio.create_task(sample_rss())
+    started = time.perf_counter()
+    deadline = started + config.duration
+    await asyncio.gather(*(run.publish(index, deadline) for index in range(config.publishers)))
+    publish_seconds = time.perf_counter() - started
+
+    drain_until = time.perf_counter() + config.drain_seconds
+    while time.perf_counter() < drain_until and run.counters.delivered < run.counters.acked * config.observers:
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - started
+    rss_end = daemon.rss_bytes()
+    metrics_after = await _scrape(daemon.url)
+    done.set()
+    await asyncio.gather(sampler, *observers, return_exceptions=True)
+
+    counters = run.counters
+    expected = counters.acked * config.observers
+    return {
+        "published": counters.published,
+        "accepted": counters.acked,
+        "rate_limited": counters.rate_limited,
+        "publisher_reconnects": counters.reconnects,
+        "errors": counters.errors,
+        "expected_deliveries": expected,
+        "delivered": counters.delivered,
+        "lost": max(0, expected - counters.delivered),
+        "publish_seconds": round(publish_seconds, 3),
+        "elapsed_seconds": round(elapsed, 3),
+        "publish_rate": round(counters.published / publish_seconds, 1) if publish_seconds else 0.0,
+        "delivered_per_second": round(counters.delivered / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": _summary(counters.latencies),
+        "connect_ms": _summary(counters.connect_times),
+        "daemon": {
+            "pid": daemon.pid,
+            "rss_bytes_start": rss_start,
+            "rss_bytes_peak": max(rss, default=rss_start),
+            "rss_bytes_end": rss_end,
+            "rss_includes_load_generator": config.server == "inprocess" and config.url is None,
+            "metrics": _delta(metrics_before, metrics_after),
+        },
+    }
+
+
+def _summary(samples: List[float]) -> Dict[str, Optional[float]]:
+    if not samples:
+        return {"count": 0, "mean": None, "p50": None, "p90": None, "p99": None, "p999": None, "max": None}
+    ordered = sorted(samples)
+
+    def at(fraction: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000, 3)
+
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered) * 1000, 3),
+        "p50": at(0.5),
+        "p90": at(0.9),
+        "p99": at(0.99),
+        "p999": at(0.999),
+        "max": round(ordered[-1] * 1000, 3),
+    }
+
+
+async def _scrape(base_url: str) -> Dict[str, float]:
+    """Counter values from ``/metrics`` (empty if the daemon does not serve it)."""
+
+    try:
+        async with httpx.AsyncClient() as client:
+            response = await client.get(f"{base_url}/metrics", timeout=5.0)
+            response.raise_for_status()
+    except httpx.HTTPError:
+        return {}
+    values = {}
+    for line in response.text.splitlines():
+        if line.startswith("orchestra_") and "_total" in line:
+            series, value = line.rsplit(" ", 1)
+            values[series] = float(value)
+    return values
+
+
+def _delta(before: Dict[str, float], after: Dict[str, float]) -> Dict[str, float]:
+    return {series: value - before.get(series, 0.0) for series, value in sorted(after.items())}
+
+
+# ----------------------------------------------------------------------
+# Entry points
+# ----------------------------------------------------------------------
+def run_load_test(config: LoadTestConfig) -> Dict:
+    """Run one load test and return the JSON-serialisable report."""
+
+    if config.auth not in AUTH_MODES:
+        raise ValueError(f"Unknown auth mode '{config.auth}'")
+    if config.server not in SERVERS:
+        raise ValueError(f"Unknown server '{config.server}'")
+    if config.auth == "token" and (config.url is not None or config.server != "inprocess"):
+        raise ValueError("--auth token only works with the in-process daemon")
+    if config.rate <= 0 or config.publishers < 1 or config.observers < 1:
+        raise ValueError("rate, publishers and observers must be positive")
+
+    started_at = datetime.now(timezone.utc).isoformat()
+    in_process = config.url is None and config.server == "inprocess"
+    minter: Optional[_TokenMinter] = None
+    daemon: Optional[_Daemon] = None
+    env = _daemon_env(config)
+    with _environment(env if in_process else {}):
+        if in_process:
+            settings_provider.clear()
+        try:
+            if config.url is not None:
+                daemon = _ExternalDaemon(config.url, config.pid)
+            elif config.server == "subprocess":
+                daemon = _SubprocessDaemon(env)
+            else:
+                if config.auth == "token":
+                    minter = _TokenMinter()
+                daemon = _InProcessDaemon()
+            result = asyncio.run(_drive(config, daemon, minter))
+        finally:
+            if daemon is not None:
+                daemon.stop()
+            if minter is not None:
+                minter.restore()
+            if in_process:
+                settings_provider.clear()
+    return {"started_at": started_at, "config": asdict(config), **result}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Load test the orchestra daemon observe WebSocket.")
+    parser.add_argument("--observers", type=int, default=100)
+    parser.add_argument("--publishers", type=int, default=1)
+    parser.add_argument("--rate", type=float, default=50.0, help="Messages per second across all publishers")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to publish for")
+    parser.add_argument("--topic", default="run:loadtest")
+    parser.add_argument("--payload-bytes", type=int, default=256)
+    parser.add_argument("--batch-ms", type=int, default=0, help="Observer batch window (0 disables batching)")
+    parser.add_argument("--server", choices=SERVERS, default="inprocess")
+    parser.add_argument("--url", help="Test a daemon that is already running, e.g. http://127.0.0.1:8000")
+    parser.add_argument("--pid", type=int, help="PID of the --url daemon, for RSS sampling")
+    parser.add_argument("--auth", choices=AUTH_MODES, default="insecure")
+    parser.add_argument("--no-rate-limit", dest="rate_limit", action="store_false")
+    parser.add_argument("--drain-seconds", type=float, default=2.0)
+    parser.add_argument("--connect-concurrency", type=int, default=100)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    output = args.output
+    config = LoadTestConfig(**{key: value for key, value in vars(args).items() if key != "output"})
+    try:
+        report = run_load_test(config)
+    except ValueError as exc:
+        parser.error(str(exc))
+    text = json.dumps(report, indent=2)
+    if output:
+        Path(output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    latency = report["latency_ms"]
+    print(
+        f"{report['delivered']}/{report['expected_deliveries']} delivered, "
+        f"{report['delivered_per_second']:.0f} msgs/s, p50 {latency['p50']} ms, p99 {latency['p99']} ms, "
+        f"{report['rate_limited']} rate limited",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
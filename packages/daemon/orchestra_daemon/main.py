@@ -2,13 +2,28 @@
 
 from __future__ import annotations
 
+from typing import Dict, Optional
+
 import uvicorn
 
 from .app import app
+from .config import Settings, get_settings
+
+
+def ws_ping_options(settings: Settings) -> Dict[str, Optional[float]]:
+    """Protocol-level WebSocket pings derived from ``read_timeout_seconds``.
+
+    Clients answer pings without any application code, and uvicorn closes a
+    peer that misses one, so a dead observer is gone within the read timeout.
+    A timeout of 0 disables pings.
+    """
+
+    half = settings.read_timeout_seconds / 2 or None
+    return {"ws_ping_interval": half, "ws_ping_timeout": half}
 
 
 def run() -> None:  # pragma: no cover - thin wrapper
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run(app, host="0.0.0.0", port=8000, **ws_ping_options(get_settings()))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,220 @@
+"""Minimal Prometheus-style metrics for the daemon.
+
+Counters and fixed-bucket histograms are plain Python objects updated inline
+on the hot paths: an increment is one attribute add and an observation one
+``bisect`` plus two adds, with no locks. They are updated from the event loop
+only, so the lack of locking loses nothing. Values that already live elsewhere
+(connection counts, queue depths, rate limiter counters) are not duplicated;
+the scrape handler reads them and passes them to ``render`` as samples.
+
+``Registry.render`` produces the Prometheus text exposition format (0.0.4).
+Each uvicorn worker keeps its own registry, so scrape every worker.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds, from a cached JWT lookup (~µs) up to a slow JWKS fetch.
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+FANOUT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+LabelValues = Tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class Sample:
+    """One value read at scrape time."""
+
+    name: str
+    kind: str  # "counter" or "gauge"
+    help: str
+    value: float
+    labels: Optional[Dict[str, str]] = None
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[LabelValues, _Metric] = {}
+
+    def labels(self, *values: str):
+        """Child metric for one label combination (cache it on hot paths)."""
+
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self) -> "_Metric":
+        raise NotImplementedError
+
+    def _series(self) -> Iterable[Tuple[LabelValues, "_Metric"]]:
+        if self.labelnames:
+            return sorted(self._children.items())
+        return [((), self)]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {_escape_help(self.help)}", f"# TYPE {self.name} {self.kind}"]
+        for values, series in self._series():
+            lines.extend(series._render_values(self.name, dict(zip(self.labelnames, values))))
+        return lines
+
+    def _render_values(self, name: str, labels: Dict[str, str]) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help, labelnames)
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def _new_child(self) -> "Counter":
+        return Counter(self.name, self.help)
+
+    def _render_values(self, name: str, labels: Dict[str, str]) -> List[str]:
+        return [f"{name}{_format_labels(labels)} {_format_value(self.value)}"]
+
+
+class Histogram(_Metric):
+    """Cumulative histogram over fixed upper bounds (``+Inf`` is implicit)."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        *,
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        # bisect_left puts a value equal to a bound in that bound's bucket (le).
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def _new_child(self) -> "Histogram":
+        return Histogram(self.name, self.help, buckets=self.buckets)
+
+    def _render_values(self, name: str, labels: Dict[str, str]) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += count
+            bucket_labels = {**labels, "le": _format_value(bound)}
+            lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(self.sum)}")
+        lines.append(f"{name}_count{_format_labels(labels)} {self.count}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        *,
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets=buckets))
+
+    def render(self, samples: Iterable[Sample] = ()) -> str:
+        """Text exposition of every registered metric followed by ``samples``."""
+
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        families: Dict[str, List[Sample]] = {}
+        for sample in samples:
+            families.setdefault(sample.name, []).append(sample)
+        for name, family in families.items():
+            lines.append(f"# HELP {name} {_escape_help(family[0].help)}")
+            lines.append(f"# TYPE {name} {family[0].kind}")
+            for sample in family:
+                lines.append(f"{name}{_format_labels(sample.labels or {})} {_format_value(sample.value)}")
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{_escape_label(str(value))}"' for key, value in labels.items())
+    return "{" + pairs + "}"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+# ----------------------------------------------------------------------
+# Daemon metrics
+# ----------------------------------------------------------------------
+REGISTRY = Registry()
+
+WS_CONNECTIONS = REGISTRY.counter("orchestra_ws_connections_total", "Observe sockets accepted.")
+WS_REJECTED = REGISTRY.counter(
+    "orchestra_ws_handshake_rejected_total", "Observe handshakes refused, by reason.", ("reason",)
+)
+WS_HANDSHAKE_SECONDS = REGISTRY.histogram(
+    "orchestra_ws_handshake_seconds", "Time from the upgrade request to a registered connection."
+)
+JWT_VERIFY_SECONDS = REGISTRY.histogram(
+    "orchestra_jwt_verify_seconds", "verify_jwt_async latency, by result.", ("result",)
+)
+WS_MESSAGES_RECEIVED = REGISTRY.counter("orchestra_ws_messages_received_total", "Messages read from observers.")
+PUBLISHED = REGISTRY.counter("orchestra_publish_total", "Envelopes delivered to this worker by the backplane.")
+PUBLISH_SECONDS = REGISTRY.histogram(
+    "orchestra_publish_fanout_seconds", "Time to encode, record and queue one envelope for every subscriber."
+)
+PUBLISH_FANOUT = REGISTRY.histogram(
+    "orchestra_publish_fanout_subscribers", "Connections an envelope was queued for.", buckets=FANOUT_BUCKETS
+)
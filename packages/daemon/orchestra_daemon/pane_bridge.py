@@ -0,0 +1,316 @@
+"""Stream the secondary pane of live delegation runs to observe subscribers."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Set
+
+from orchestra.load_balancer import parse_run_session
+from orchestra.run_history import RunHistory
+from orchestra.summary import summarise
+from orchestra.tmux_manager import TmuxError, TmuxManager
+
+from .websocket import ConnectionManager
+
+
+logger = logging.getLogger(__name__)
+
+RUN_TOPIC_PREFIX = "run:"
+CLAIM_PREFIX = "pane:"
+
+
+def run_topic(run_id: str) -> str:
+    return f"{RUN_TOPIC_PREFIX}{run_id}"
+
+
+def _claim_name(run_id: str) -> str:
+    return f"{CLAIM_PREFIX}{run_id}"
+
+
+class PaneBridge:
+    """Share one tmux reader per run between all of its observers.
+
+    A reader starts when ``run:<id>`` gains its first subscriber and stops when
+    the last one leaves (wildcard subscribers receive the events but do not
+    keep a reader alive). Each reader tails the run's secondary pane with
+    ``TmuxManager.iter_pane_lines`` on its own thread and publishes:
+
+    * ``pane.output`` - the new lines since the previous batch
+    * ``pane.status`` - ``summarise`` of the recent lines whenever the status
+      changes, plus a final event when the session ends
+
+    A run that is recorded as running but has no secondary session yet (queued
+    or still spawning) is reported as ``waiting`` and its reader polls for the
+    session until it appears, the run finishes or the last subscriber leaves.
+
+    With several daemon workers the reader is claimed through the backplane,
+    so only one worker tails a pane; the others receive its events through
+    the backplane and take over if the owner releases the claim.
+    """
+
+    def __init__(
+        self,
+        connections: ConnectionManager,
+        *,
+        tmux_factory: Callable[[], TmuxManager] = TmuxManager,
+        history_factory: Callable[[], RunHistory] = RunHistory,
+        poll_interval: float = 0.5,
+        status_interval: float = 2.0,
+        history_lines: int = 200,
+    ) -> None:
+        self._connections = connections
+        self._tmux_factory = tmux_factory
+        self._tmux: Optional[TmuxManager] = None
+        self._tmux_lock = threading.Lock()
+        self._history = history_factory()
+        self.poll_interval = poll_interval
+        self.status_interval = status_interval
+        self.history_lines = history_lines
+        self._readers: Dict[str, _PaneReader] = {}
+        self._claiming: Set[str] = set()
+        self._denied: Set[str] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._detach: List[Callable[[], None]] = []
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def attach(self) -> None:
+        """Start following topic subscriptions; call from the event loop."""
+
+        self._loop = asyncio.get_running_loop()
+        if not self._detach:
+            self._detach = [
+                self._connections.add_topic_listener(self.on_topic_change),
+                self._connections.backplane.on_release(self._on_claim_released),
+            ]
+
+    def close(self, timeout: float = 2.0) -> None:
+        """Stop every reader and wait (bounded) for their threads to exit.
+
+        Safe to call from a worker thread (e.g. via ``asyncio.to_thread``).
+        """
+
+        for detach in self._detach:
+            detach()
+        self._detach = []
+        readers = list(self._readers.values())
+        self._readers.clear()
+        self._denied.clear()
+        for reader in readers:
+            reader.stop()
+            self._call_soon(self._connections.backplane.release, _claim_name(reader.run_id))
+        deadline = time.monotonic() + timeout
+        for reader in readers:
+            reader.thread.join(max(0.0, deadline - time.monotonic()))
+
+    @property
+    def active_runs(self) -> List[str]:
+        return sorted(self._readers)
+
+    def on_topic_change(self, topic: str, active: bool) -> None:
+        if not topic.startswith(RUN_TOPIC_PREFIX):
+            return
+        run_id = topic[len(RUN_TOPIC_PREFIX):]
+        if active:
+            self.start(run_id)
+        else:
+            self.stop(run_id)
+
+    def start(self, run_id: str) -> bool:
+        """Claim the run's pane and start its reader; the claim completes asynchronously."""
+
+        if run_id in self._readers or run_id in self._claiming or self._loop is None:
+            return False
+        self._claiming.add(run_id)
+        self._loop.create_task(self._claim_and_start(run_id))
+        return True
+
+    def stop(self, run_id: str) -> None:
+        self._denied.discard(run_id)
+        reader = self._readers.pop(run_id, None)
+        if reader is not None:
+            reader.stop()
+            self._connections.backplane.release(_claim_name(run_id))
+
+    async def _claim_and_start(self, run_id: str) -> None:
+        backplane = self._connections.backplane
+        try:
+            granted = await backplane.acquire(_claim_name(run_id))
+        finally:
+            self._claiming.discard(run_id)
+        if not self._connections.subscriber_count(run_topic(run_id)) or run_id in self._readers:
+            if granted and run_id not in self._readers:
+                backplane.release(_claim_name(run_id))
+            return
+        if not granted:
+            # Another worker tails this pane and its events reach us via the backplane.
+            self._denied.add(run_id)
+            return
+        self._denied.discard(run_id)
+        reader = _PaneReader(self, run_id)
+        self._readers[run_id] = reader
+        reader.thread.start()
+
+    def _on_claim_released(self, name: str) -> None:
+        run_id = name[len(CLAIM_PREFIX):] if name.startswith(CLAIM_PREFIX) else None
+        # Only take over runs we were refused, so finished runs are not restarted in a loop.
+        if run_id in self._denied and self._connections.subscriber_count(run_topic(run_id)):
+            self._denied.discard(run_id)
+            self.start(run_id)
+
+    # ------------------------------------------------------------------
+    # Used by reader threads
+    # ------------------------------------------------------------------
+    def _get_tmux(self) -> TmuxManager:
+        with self._tmux_lock:
+            if self._tmux is None:
+                self._tmux = self._tmux_factory()
+            return self._tmux
+
+    def _run_pending(self, run_id: str) -> bool:
+        """Whether the run is recorded as running, so its session may still appear."""
+
+        record = self._history.get_run(run_id)
+        return record is not None and record.get("status") == "running"
+
+    def _call_soon(self, callback: Callable, *args) -> None:
+        loop = self._loop
+        if loop is None:
+            return
+        try:
+            loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:  # loop closed during shutdown
+            pass
+
+    def _publish(self, topic: str, payload: Dict, *, coalesce: bool = True) -> None:
+        self._call_soon(lambda: self._connections.publish_nowait(topic, payload, coalesce=coalesce))
+
+    def _forget(self, reader: "_PaneReader") -> None:
+        if self._readers.get(reader.run_id) is reader:
+            del self._readers[reader.run_id]
+            self._connections.backplane.release(_claim_name(reader.run_id))
+
+
+class _PaneReader:
+    def __init__(self, bridge: PaneBridge, run_id: str) -> None:
+        self.bridge = bridge
+        self.run_id = run_id
+        self.topic = run_topic(run_id)
+        self.session: Optional[str] = None
+        self.tail: Deque[str] = deque(maxlen=bridge.history_lines)
+        self._pending: List[str] = []
+        self._lock = threading.Lock()
+        self._flush_scheduled = False
+        self._stop = threading.Event()
+        self._last_status: Optional[tuple] = None
+        self.thread = threading.Thread(target=self._run, name=f"pane-bridge-{run_id}", daemon=True)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        state = "ended"
+        error: Optional[str] = None
+        try:
+            tmux = self.bridge._get_tmux()
+            self.session = self._wait_for_session(tmux)
+            if self.session is None:
+                state = "stopped" if self._stop.is_set() else "not_found"
+                return
+            last_summary = 0.0
+            for line in tmux.iter_pane_lines(
+                self.session, poll_interval=self.bridge.poll_interval, stop=self._stop
+            ):
+                self._push(line)
+                now = time.monotonic()
+                if now - last_summary >= self.bridge.status_interval:
+                    last_summary = now
+                    self._emit_status("running")
+            if self._stop.is_set():
+                state = "stopped"
+        except TmuxError as exc:
+            state, error = "error", str(exc)
+            logger.warning("pane bridge for run %s failed: %s", self.run_id, exc)
+        finally:
+            self._flush_from_thread()
+            if state != "stopped":
+                self._emit_status(state, error=error, force=True)
+            self.bridge._call_soon(self.bridge._forget, self)
+
+    def _wait_for_session(self, tmux: TmuxManager) -> Optional[str]:
+        waiting = False
+        while True:
+            session = _find_secondary_session(tmux, self.run_id)
+            if session is not None or not self.bridge._run_pending(self.run_id):
+                return session
+            if not waiting:
+                waiting = True
+                self._emit_status("waiting")
+            if self._stop.wait(self.bridge.poll_interval):
+                return None
+
+    def _push(self, line: str) -> None:
+        with self._lock:
+            self._pending.append(line)
+            self.tail.append(line)
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+        # Lines that arrive before the loop runs the flush join the same batch.
+        self.bridge._call_soon(self._flush)
+
+    def _take_pending(self) -> List[str]:
+        with self._lock:
+            lines, self._pending = self._pending, []
+            self._flush_scheduled = False
+        return lines
+
+    def _flush(self) -> None:
+        lines = self._take_pending()
+        if lines:
+            self.bridge._connections.publish_nowait(self.topic, self._output(lines), coalesce=False)
+
+    def _flush_from_thread(self) -> None:
+        lines = self._take_pending()
+        if lines:
+            self.bridge._publish(self.topic, self._output(lines), coalesce=False)
+
+    def _output(self, lines: List[str]) -> Dict:
+        return {
+            "type": "pane.output",
+            "topic": self.topic,
+            "payload": {"run_id": self.run_id, "session": self.session, "lines": lines},
+        }
+
+    def _emit_status(self, state: str, *, error: Optional[str] = None, force: bool = False) -> None:
+        with self._lock:
+            recent = list(self.tail)
+        summary = summarise(recent)
+        key = (state, summary.status, summary.files_modified)
+        if not force and key == self._last_status:
+            return
+        self._last_status = key
+        payload = {
+            "run_id": self.run_id,
+            "session": self.session,
+            "state": state,
+            "status": summary.status,
+            "files_modified": summary.files_modified,
+            "details": summary.details,
+        }
+        if error is not None:
+            payload["error"] = error
+        self.bridge._publish(self.topic, {"type": "pane.status", "topic": self.topic, "payload": payload})
+
+
+def _find_secondary_session(tmux: TmuxManager, run_id: str) -> Optional[str]:
+    for name in tmux.list_sessions():
+        parsed = parse_run_session(name)
+        if parsed is not None and parsed[0] == run_id and parsed[1] == "secondary":
+            return name
+    return None
@@ -0,0 +1,201 @@
+"""Token-bucket rate limiting for inbound observe messages."""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+
+RATE_LIMIT_MODES = ("hard", "soft")
+SCOPES = ("connection", "subject", "global")
+
+
+class RateLimitError(RuntimeError):
+    """Raised when a connection exceeds the allowed message rate."""
+
+
+@dataclass
+class TokenBucket:
+    """Classic token bucket refilled lazily on access, so every call is O(1)."""
+
+    rate: float
+    burst: float
+    tokens: float
+    updated: float
+
+    def refill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, cost: float) -> float:
+        """Seconds until ``cost`` tokens are available (0 if they are now)."""
+
+        if self.tokens >= cost:
+            return 0.0
+        if self.rate <= 0:
+            return float("inf")
+        return (cost - self.tokens) / self.rate
+
+
+@dataclass(frozen=True)
+class Limit:
+    rate: float
+    burst: float
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+
+@dataclass(frozen=True)
+class Decision:
+    allowed: bool
+    delay: float = 0.0
+    scope: Optional[str] = None
+
+
+@dataclass
+class _Subject:
+    bucket: TokenBucket
+    connections: int = 0
+
+
+@dataclass
+class RateLimitCounters:
+    allowed: int = 0
+    throttled: int = 0
+    throttle_seconds: float = 0.0
+    rejected: Dict[str, int] = field(default_factory=lambda: {scope: 0 for scope in SCOPES})
+
+
+class RateLimiter:
+    """Budgets per connection, per JWT subject (shared by all its tabs) and global.
+
+    A message must fit all three buckets. In ``hard`` mode a message that does
+    not fit is rejected. In ``soft`` mode the tokens are reserved anyway (the
+    buckets go into debt) and the caller is told how long to wait before
+    handling it; only waits longer than ``max_delay`` are rejected. A limit
+    with ``rate <= 0`` is disabled.
+    """
+
+    def __init__(
+        self,
+        *,
+        per_connection: Limit = Limit(10, 10),
+        per_subject: Limit = Limit(20, 20),
+        global_limit: Limit = Limit(1000, 2000),
+        mode: str = "hard",
+        max_delay: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if mode not in RATE_LIMIT_MODES:
+            raise ValueError(f"Unknown rate limit mode '{mode}'")
+        self._clock = clock
+        self._connections: Dict[Hashable, TokenBucket] = {}
+        self._subjects: Dict[str, _Subject] = {}
+        self._global: Optional[TokenBucket] = None
+        self.configure(
+            per_connection=per_connection,
+            per_subject=per_subject,
+            global_limit=global_limit,
+            mode=mode,
+            max_delay=max_delay,
+        )
+        self.counters = RateLimitCounters()
+
+    def configure(
+        self,
+        *,
+        per_connection: Limit,
+        per_subject: Limit,
+        global_limit: Limit,
+        mode: str,
+        max_delay: float,
+    ) -> None:
+        if mode not in RATE_LIMIT_MODES:
+            raise ValueError(f"Unknown rate limit mode '{mode}'")
+        self.per_connection = per_connection
+        self.per_subject = per_subject
+        self.global_limit = global_limit
+        self.mode = mode
+        self.max_delay = max_delay
+        for bucket in self._connections.values():
+            _retune(bucket, per_connection)
+        for entry in self._subjects.values():
+            _retune(entry.bucket, per_subject)
+        if self._global is None:
+            self._global = self._bucket(global_limit)
+        else:
+            _retune(self._global, global_limit)
+
+    @property
+    def limits(self) -> Tuple[Limit, Limit, Limit, str, float]:
+        return self.per_connection, self.per_subject, self.global_limit, self.mode, self.max_delay
+
+    def attach(self, key: Hashable, subject: str) -> None:
+        self._connections[key] = self._bucket(self.per_connection)
+        entry = self._subjects.get(subject)
+        if entry is None:
+            entry = self._subjects[subject] = _Subject(self._bucket(self.per_subject))
+        entry.connections += 1
+
+    def detach(self, key: Hashable, subject: str) -> None:
+        self._connections.pop(key, None)
+        entry = self._subjects.get(subject)
+        if entry is not None:
+            entry.connections -= 1
+            if entry.connections <= 0:
+                del self._subjects[subject]
+
+    def acquire(self, key: Hashable, subject: str, cost: float = 1.0) -> Decision:
+        now = self._clock()
+        buckets = []
+        connection = self._connections.get(key)
+        if connection is not None and self.per_connection.enabled:
+            buckets.append(("connection", connection))
+        entry = self._subjects.get(subject)
+        if entry is not None and self.per_subject.enabled:
+            buckets.append(("subject", entry.bucket))
+        if self._global is not None and self.global_limit.enabled:
+            buckets.append(("global", self._global))
+
+        delay, scope = 0.0, None
+        for name, bucket in buckets:
+            bucket.refill(now)
+            wait = bucket.wait_time(cost)
+            if wait > delay:
+                delay, scope = wait, name
+
+        if delay > 0 and (self.mode == "hard" or delay > self.max_delay):
+            self.counters.rejected[scope] += 1
+            return Decision(False, delay, scope)
+        for _, bucket in buckets:
+            bucket.tokens -= cost
+        if delay > 0:
+            self.counters.throttled += 1
+            self.counters.throttle_seconds += delay
+            return Decision(True, delay, scope)
+        self.counters.allowed += 1
+        return Decision(True)
+
+    def stats(self) -> Dict[str, float]:
+        stats = {
+            "rate_limit_allowed": self.counters.allowed,
+            "rate_limit_throttled": self.counters.throttled,
+            "rate_limit_throttle_seconds": round(self.counters.throttle_seconds, 6),
+            "rate_limit_subjects": len(self._subjects),
+        }
+        for scope, count in self.counters.rejected.items():
+            stats[f"rate_limit_rejected_{scope}"] = count
+        return stats
+
+    def _bucket(self, limit: Limit) -> TokenBucket:
+        return TokenBucket(rate=limit.rate, burst=limit.burst, tokens=limit.burst, updated=self._clock())
+
+
+def _retune(bucket: TokenBucket, limit: Limit) -> None:
+    bucket.rate = limit.rate
+    bucket.burst = limit.burst
+    bucket.tokens = min(bucket.tokens, limit.burst)
@@ -0,0 +1,115 @@
+"""Bounded per-topic history of published frames for late-joining observers."""
+
+from __future__ import annotations
+
+import heapq
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Iterable, List, Tuple
+
+from .topics import topic_matches
+
+
+@dataclass
+class _TopicLog:
+    entries: Deque[Tuple[int, str]] = field(default_factory=deque)
+    sizes: Deque[int] = field(default_factory=deque)  # UTF-8 length of each entry's frame
+    bytes: int = 0
+    evicted_through: int = 0
+
+
+class ReplayBuffer:
+    """Keep the most recent encoded frames of every topic, tagged by sequence.
+
+    Sequence numbers come from the backplane and increase strictly across
+    topics (and workers), so a client that saw ``seq`` N can resume with
+    ``since=N`` across any mix of topics. Each topic keeps at most
+    ``max_events`` frames and ``max_bytes`` of UTF-8 encoded frames; at most
+    ``max_topics`` topics are retained, least recently published first out.
+    ``max_events=0`` disables retention (``seq`` still tracks the latest).
+    """
+
+    def __init__(self, *, max_events: int = 256, max_bytes: int = 1 << 20, max_topics: int = 1024) -> None:
+        self.max_events = max_events
+        self.max_bytes = max_bytes
+        self.max_topics = max_topics
+        self.seq = 0
+        self._logs: "OrderedDict[str, _TopicLog]" = OrderedDict()
+        # Highest sequence lost with a whole topic; replays older than this may be incomplete.
+        self._dropped_topics_through = 0
+        self.evicted = 0
+        # Running totals over every topic, so ``stats`` is O(1) per scrape.
+        self._events = 0
+        self._bytes = 0
+
+    def configure(self, *, max_events: int, max_bytes: int, max_topics: int) -> None:
+        self.max_events = max_events
+        self.max_bytes = max_bytes
+        self.max_topics = max_topics
+        for log in self._logs.values():
+            self._trim(log)
+        self._trim_topics()
+
+    def append(self, topic: str, seq: int, frame: str) -> None:
+        self.seq = max(self.seq, seq)
+        if self.max_events <= 0:
+            return
+        log = self._logs.get(topic)
+        if log is None:
+            log = self._logs[topic] = _TopicLog()
+        else:
+            self._logs.move_to_end(topic)
+        size = len(frame.encode("utf-8"))
+        log.entries.append((seq, frame))
+        log.sizes.append(size)
+        log.bytes += size
+        self._events += 1
+        self._bytes += size
+        self._trim(log)
+        self._trim_topics()
+
+    def since(self, seq: int, subscriptions: Iterable[str]) -> Tuple[List[Tuple[int, str]], bool]:
+        """Frames newer than ``seq`` on topics matching ``subscriptions``, in order.
+
+        The flag is True when frames newer than ``seq`` may already have been
+        evicted, i.e. the replay is not guaranteed to be gapless.
+        """
+
+        subscriptions = list(subscriptions)
+        truncated = self._dropped_topics_through > seq
+        streams = []
+        for topic, log in self._logs.items():
+            if not any(topic_matches(subscription, topic) for subscription in subscriptions):
+                continue
+            if log.evicted_through > seq:
+                truncated = True
+            streams.append([entry for entry in log.entries if entry[0] > seq])
+        return list(heapq.merge(*streams)), truncated
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "seq": self.seq,
+            "topics": len(self._logs),
+            "events": self._events,
+            "bytes": self._bytes,
+            "evicted": self.evicted,
+        }
+
+    def _trim(self, log: _TopicLog) -> None:
+        while log.entries and (len(log.entries) > self.max_events or log.bytes > self.max_bytes):
+            seq, _ = log.entries.popleft()
+            size = log.sizes.popleft()
+            log.bytes -= size
+            log.evicted_through = seq
+            self.evicted += 1
+            self._events -= 1
+            self._bytes -= size
+
+    def _trim_topics(self) -> None:
+        while len(self._logs) > max(self.max_topics, 0) or (self.max_events <= 0 and self._logs):
+            _, log = self._logs.popitem(last=False)
+            if log.entries:
+                self._dropped_topics_through = max(self._dropped_topics_through, log.entries[-1][0])
+                self.evicted += len(log.entries)
+                self._events -= len(log.entries)
+                self._bytes -= log.bytes
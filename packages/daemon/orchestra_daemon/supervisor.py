@@ -0,0 +1,319 @@
+"""Daemon-hosted supervisor that owns delegation runs.
+
+With ``DAEMON_SUPERVISOR=1`` the daemon plans and executes delegations on its
+own worker threads (at most ``DAEMON_SUPERVISOR_MAX_RUNS`` at a time), so a
+run outlives the CLI that submitted it and always reaches a ``completed``
+event and a final history record. Clients submit through the local unix
+socket (``orchestra delegate --via-daemon``) or ``POST /api/runs``, then
+follow the run's events; observers also receive them on ``run:<id>`` as
+``delegation.<type>`` envelopes.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import AsyncIterator, Callable, Deque, Dict, List, Optional
+
+from orchestra.config import OrchestraConfig, load_config
+from orchestra.delegation import DelegationError, DelegationRequest, execute_delegation, plan_delegation
+from orchestra.run_history import RunHistory
+from orchestra.search_index import SearchIndex
+from orchestra.tmux_manager import TmuxError, TmuxManager
+from orchestra.tracing import Tracer, activate
+from orchestra.transcripts import TranscriptStore
+
+from .pane_bridge import run_topic
+from .websocket import ConnectionManager
+
+
+logger = logging.getLogger(__name__)
+
+# ``output`` events stay off the topic: the pane bridge already streams the pane.
+UNPUBLISHED_EVENTS = frozenset({"output"})
+# Nor are they kept for replay: a finished run's output lives in its
+# transcript, and up to ``retain_finished`` runs stay in memory.
+LIVE_ONLY_EVENTS = frozenset({"output"})
+
+
+class SupervisedRun:
+    """Events of one run; touched only on the event loop.
+
+    Lifecycle events are kept in ``events`` for replay. Events in
+    ``LIVE_ONLY_EVENTS`` only reach the followers attached when they happen.
+    """
+
+    def __init__(self, request: DelegationRequest) -> None:
+        self.request = request
+        self.run_id: Optional[str] = None
+        # Planning and execution run on different threads; both record into this.
+        self.tracer = Tracer() if request.profile else None
+        self.events: List[Dict] = []
+        self.stop = threading.Event()
+        self.future: Optional[Future] = None
+        self._changed = asyncio.Event()
+        self._followers: Dict[int, Deque[Dict]] = {}
+
+    @property
+    def done(self) -> bool:
+        return bool(self.events) and self.events[-1]["type"] == "completed"
+
+    @property
+    def status(self) -> str:
+        if self.done:
+            return self.events[-1]["status"]
+        return "running" if any(event["type"] == "started" for event in self.events) else "queued"
+
+    def append(self, event: Dict) -> None:
+        if self.done:
+            return
+        if event["type"] not in LIVE_ONLY_EVENTS:
+            self.events.append(event)
+        for backlog in self._followers.values():
+            backlog.append(event)
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def follow(self, since: int = 0) -> AsyncIterator[Dict]:
+        """Yield retained events from index ``since`` on, then live ones until ``completed``."""
+
+        # Snapshot and attach without awaiting in between: nothing is missed or repeated.
+        replay = self.events[since:]
+        backlog: Deque[Dict] = deque()
+        if not self.done:
+            self._followers[id(backlog)] = backlog
+        try:
+            for event in replay:
+                yield event
+            while True:
+                while backlog:
+                    yield backlog.popleft()
+                if self.done:
+                    return
+                await self._changed.wait()
+        finally:
+            self._followers.pop(id(backlog), None)
+
+
+class RunSupervisor:
+    def __init__(
+        self,
+        connections: ConnectionManager,
+        *,
+        max_runs: int = 4,
+        tmux_factory: Callable[[], TmuxManager] = TmuxManager,
+        config_loader: Callable[[], OrchestraConfig] = load_config,
+        history_factory: Callable[[], RunHistory] = RunHistory,
+        transcript_factory: Callable[[], TranscriptStore] = TranscriptStore,
+        search_factory: Callable[[], SearchIndex] = SearchIndex,
+        retain_finished: int = 256,
+    ) -> None:
+        self._connections = connections
+        self.max_runs = max(1, max_runs)
+        self._tmux_factory = tmux_factory
+        self._tmux: Optional[TmuxManager] = None
+        self._tmux_lock = threading.Lock()
+        self._config_loader = config_loader
+        # Planning is serialized so each plan sees the runs queued before it;
+        # ``_pending`` (run id -> secondary tool) covers them until they finish.
+        self._plan_lock = threading.Lock()
+        self._pending: Dict[str, str] = {}
+        self._history = history_factory()
+        self._transcripts = transcript_factory()
+        self._search_index = search_factory()
+        self.retain_finished = retain_finished
+        self._executor = ThreadPoolExecutor(max_workers=self.max_runs, thread_name_prefix="orchestra-run")
+        self._runs: "OrderedDict[str, SupervisedRun]" = OrderedDict()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.socket_path: Optional[str] = None
+        self._closed = False
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    async def start(self, socket_path: Optional[str] = None) -> None:
+        """Bind the loop and, if given, serve submissions on ``socket_path``."""
+
+        self._loop = asyncio.get_running_loop()
+        if socket_path:
+            path = Path(socket_path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if path.is_socket():
+                path.unlink()  # left behind by a daemon that did not shut down cleanly
+            self._server = await asyncio.start_unix_server(self._serve, path=str(path))
+            # Anyone who can connect can spawn agents; keep it to this user.
+            os.chmod(path, 0o600)
+            self.socket_path = str(path)
+
+    async def close(self, timeout: float = 5.0) -> None:
+        """Stop accepting runs, interrupt running ones and wait (bounded) for them."""
+
+        self._closed = True
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+            if self.socket_path:
+                Path(self.socket_path).unlink(missing_ok=True)
+        pending = []
+        for run in self._runs.values():
+            if run.future is None or run.done:
+                continue
+            run.stop.set()
+            if run.future.cancel():
+                # Never started; release the slot its plan reserved in history.
+                self._history.complete_run(run.run_id, status="cancelled")
+                with self._plan_lock:
+                    self._pending.pop(run.run_id, None)
+                self._record(run, {"type": "completed", "run_id": run.run_id, "status": "cancelled"})
+            else:
+                pending.append(asyncio.wrap_future(run.future))
+        if pending:
+            await asyncio.wait(pending, timeout=timeout)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # ------------------------------------------------------------------
+    # Runs
+    # ------------------------------------------------------------------
+    def get(self, run_id: str) -> Optional[SupervisedRun]:
+        return self._runs.get(run_id)
+
+    @property
+    def active_runs(self) -> int:
+        return sum(1 for run in self._runs.values() if not run.done)
+
+    async def submit(self, request: DelegationRequest) -> SupervisedRun:
+        """Plan ``request`` and queue it; planning errors raise ``DelegationError``."""
+
+        if self._closed or self._loop is None:
+            raise DelegationError("Run supervisor is not accepting runs")
+        run = SupervisedRun(request)
+        # Events emitted while planning are replayed to the submitter with the rest.
+        plan = await asyncio.to_thread(self._plan, run)
+        run.run_id = plan.run_id
+        for event in run.events:
+            self._publish(run, event)
+        position = max(0, self.active_runs - self.max_runs + 1)
+        self._runs[plan.run_id] = run
+        self._prune()
+        self._record(run, {"type": "queued", "run_id": plan.run_id, "position": position})
+        queued_at = time.perf_counter_ns()
+        run.future = self._executor.submit(self._execute, run, plan, queued_at)
+        return run
+
+    def _plan(self, run: SupervisedRun):
+        try:
+            config = self._config_loader()
+        except FileNotFoundError as exc:
+            raise DelegationError(f"Configuration file not found: {exc}") from exc
+        except ValueError as exc:
+            raise DelegationError(f"Invalid configuration: {exc}") from exc
+        with self._plan_lock, activate(run.tracer):
+            plan = plan_delegation(
+                run.request,
+                manager=self._get_tmux(),
+                config=config,
+                history=self._history,
+                emit=lambda event: self._emit(run, event),
+                pending=dict(self._pending),
+            )
+            self._pending[plan.run_id] = plan.secondary
+        return plan
+
+    def _execute(self, run: SupervisedRun, plan, queued_at: int) -> None:
+        if run.tracer is not None:
+            run.tracer.add("supervisor.queue_wait", queued_at, time.perf_counter_ns())
+        try:
+            with activate(run.tracer):
+                execute_delegation(
+                    plan,
+                    manager=self._get_tmux(),
+                    history=self._history,
+                    emit=lambda event: self._emit(run, event),
+                    stop=run.stop,
+                    transcripts=self._transcripts,
+                    search_index=self._search_index,
+                )
+        except Exception as exc:  # already recorded as failed; make sure followers finish
+            logger.warning("run %s failed: %s", plan.run_id, exc)
+            self._emit(run, {"type": "completed", "run_id": plan.run_id, "status": "failed", "error": str(exc)})
+        finally:
+            with self._plan_lock:
+                self._pending.pop(plan.run_id, None)
+
+    def _emit(self, run: SupervisedRun, event: Dict) -> None:
+        loop = self._loop
+        if loop is None:
+            return
+        try:
+            loop.call_soon_threadsafe(self._record, run, event)
+        except RuntimeError:  # loop closed during shutdown
+            pass
+
+    def _record(self, run: SupervisedRun, event: Dict) -> None:
+        if run.done:
+            return
+        run.append(event)
+        if run.run_id is not None:
+            self._publish(run, event)
+
+    def _publish(self, run: SupervisedRun, event: Dict) -> None:
+        if event["type"] in UNPUBLISHED_EVENTS:
+            return
+        topic = run_topic(run.run_id)
+        self._connections.publish_nowait(
+            topic,
+            {"type": f"delegation.{event['type']}", "topic": topic, "payload": event},
+            coalesce=False,
+        )
+
+    def _prune(self) -> None:
+        finished = [run_id for run_id, run in self._runs.items() if run.done]
+        for run_id in finished[: max(0, len(finished) - self.retain_finished)]:
+            del self._runs[run_id]
+
+    def _get_tmux(self) -> TmuxManager:
+        with self._tmux_lock:
+            if self._tmux is None:
+                try:
+                    self._tmux = self._tmux_factory()
+                except TmuxError as exc:
+                    raise DelegationError(str(exc)) from exc
+            return self._tmux
+
+    # ------------------------------------------------------------------
+    # Socket protocol
+    # ------------------------------------------------------------------
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            line = await reader.readline()
+            try:
+                message = json.loads(line)
+                if not isinstance(message, dict) or message.get("op") != "submit":
+                    raise DelegationError("expected a submit message")
+                run = await self.submit(DelegationRequest.from_dict(message.get("request") or {}))
+            except (DelegationError, ValueError) as exc:
+                await _send(writer, {"op": "error", "error": str(exc)})
+                return
+            await _send(writer, {"op": "accepted", "run_id": run.run_id})
+            if message.get("detach"):
+                return
+            async for event in run.follow():
+                await _send(writer, {"op": "event", "event": event})
+        except (OSError, asyncio.IncompleteReadError):
+            pass  # the client went away; the run carries on
+        finally:
+            writer.close()
+
+
+async def _send(writer: asyncio.StreamWriter, message: Dict) -> None:
+    writer.write(json.dumps(message, separators=(",", ":")).encode("utf-8") + b"\n")
+    await writer.drain()
@@ -0,0 +1,88 @@
+"""Bounded cache of already-verified JWT claims."""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+
+class VerifiedTokenCache:
+    """LRU cache of verified claims keyed by a SHA-256 digest of the token.
+
+    An entry lives for at most ``ttl`` seconds and never past the token's own
+    ``exp`` claim. Entries remember the JWKS generation they were verified
+    against, so a key rotation turns every older entry into a miss.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = 1024,
+        ttl: float = 300.0,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[bytes, Tuple[Dict, float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, token: str, generation: int) -> Optional[Dict]:
+        if self._max_entries <= 0:
+            self.misses += 1
+            return None
+        key = self._digest(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            claims, expires_at, entry_generation = entry
+            if expires_at <= self._clock() or entry_generation != generation:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(claims)
+
+    def put(self, token: str, claims: Dict, generation: int) -> None:
+        if self._max_entries <= 0:
+            return
+        expires_at = self._clock() + self._ttl
+        exp = claims.get("exp")
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, float(exp))
+        if expires_at <= self._clock():
+            return
+        key = self._digest(token)
+        with self._lock:
+            self._entries[key] = (dict(claims), expires_at, generation)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
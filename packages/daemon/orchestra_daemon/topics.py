@@ -0,0 +1,127 @@
+"""Topic-to-subscriber index for the observe WebSocket.
+
+Topics are ``:``-separated paths such as ``run:42``, ``agent:claude`` or
+``event:status``. A subscription is either an exact topic or a wildcard:
+``*`` matches everything and ``run:*`` matches every topic below ``run:``.
+Publishing looks up the exact topic plus one wildcard bucket per path prefix,
+so its cost depends on the topic depth, not on the number of subscriptions.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Hashable, Iterable, List, Set
+
+
+WILDCARD = "*"
+SEPARATOR = ":"
+MAX_TOPIC_LENGTH = 200
+
+
+class InvalidTopicError(ValueError):
+    """Raised for topics that are empty, too long or misuse the wildcard."""
+
+
+def validate_topic(topic: object) -> str:
+    if not isinstance(topic, str) or not topic or len(topic) > MAX_TOPIC_LENGTH:
+        raise InvalidTopicError(f"Invalid topic {topic!r}")
+    segments = topic.split(SEPARATOR)
+    if any(not segment for segment in segments):
+        raise InvalidTopicError(f"Invalid topic {topic!r}")
+    if any(WILDCARD in segment for segment in segments[:-1]) or (
+        WILDCARD in segments[-1] and segments[-1] != WILDCARD
+    ):
+        raise InvalidTopicError(f"Wildcards are only allowed as the last segment: {topic!r}")
+    return topic
+
+
+def is_wildcard(topic: str) -> bool:
+    return topic == WILDCARD or topic.endswith(SEPARATOR + WILDCARD)
+
+
+def _wildcard_prefix(topic: str) -> str:
+    # "*" -> "", "run:*" -> "run:"
+    return topic[: -len(WILDCARD)]
+
+
+def _prefixes(topic: str) -> Iterable[str]:
+    yield ""
+    index = topic.find(SEPARATOR)
+    while index != -1:
+        yield topic[: index + 1]
+        index = topic.find(SEPARATOR, index + 1)
+
+
+class TopicIndex:
+    """Map topics to subscriber keys, answering "who wants ``topic``" quickly."""
+
+    def __init__(self) -> None:
+        self._exact: Dict[str, Set[Hashable]] = {}
+        self._wildcards: Dict[str, Set[Hashable]] = {}
+        self._by_key: Dict[Hashable, Set[str]] = {}
+
+    def subscribe(self, key: Hashable, topic: str) -> bool:
+        """Add ``topic`` for ``key``; returns False if it was already subscribed."""
+
+        topics = self._by_key.setdefault(key, set())
+        if topic in topics:
+            return False
+        topics.add(topic)
+        if is_wildcard(topic):
+            self._wildcards.setdefault(_wildcard_prefix(topic), set()).add(key)
+        else:
+            self._exact.setdefault(topic, set()).add(key)
+        return True
+
+    def unsubscribe(self, key: Hashable, topic: str) -> bool:
+        topics = self._by_key.get(key)
+        if not topics or topic not in topics:
+            return False
+        topics.discard(topic)
+        if not topics:
+            del self._by_key[key]
+        if is_wildcard(topic):
+            bucket, name = self._wildcards, _wildcard_prefix(topic)
+        else:
+            bucket, name = self._exact, topic
+        subscribers = bucket.get(name)
+        if subscribers is not None:
+            subscribers.discard(key)
+            if not subscribers:
+                del bucket[name]
+        return True
+
+    def remove(self, key: Hashable) -> List[str]:
+        """Drop every subscription of ``key`` and return the topics it held."""
+
+        topics = list(self._by_key.get(key, ()))
+        for topic in topics:
+            self.unsubscribe(key, topic)
+        return topics
+
+    def match(self, topic: str) -> Set[Hashable]:
+        matched: Set[Hashable] = set(self._exact.get(topic, ()))
+        if self._wildcards:
+            for prefix in _prefixes(topic):
+                subscribers = self._wildcards.get(prefix)
+                if subscribers:
+                    matched |= subscribers
+        return matched
+
+    def topics_for(self, key: Hashable) -> Set[str]:
+        return set(self._by_key.get(key, ()))
+
+    def subscriber_count(self, topic: str) -> int:
+        """Number of keys subscribed to exactly ``topic`` (wildcards excluded)."""
+
+        return len(self._exact.get(topic, ()))
+
+    def __len__(self) -> int:
+        return len(self._exact) + len(self._wildcards)
+
+
+def topic_matches(subscription: str, topic: str) -> bool:
+    """Whether ``subscription`` (exact or wildcard) receives ``topic``."""
+
+    if is_wildcard(subscription):
+        return topic.startswith(_wildcard_prefix(subscription))
+    return subscription == topic
@@ -2,65 +2,609 @@
 
 from __future__ import annotations
 
+import asyncio
+import json
+import logging
 import time
 from collections import deque
 from dataclasses import dataclass, field
-from typing import Deque, Dict, Iterable
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Set
 
-from fastapi import WebSocket
+from fastapi import WebSocket, status
+from fastapi.websockets import WebSocketState
 
+from .backplane import Backplane, InProcessBackplane
+from .metrics import PUBLISH_FANOUT, PUBLISH_SECONDS, PUBLISHED, WS_MESSAGES_RECEIVED
+from .ratelimit import Limit, RateLimiter, RateLimitError
+from .replay import ReplayBuffer
+from .topics import WILDCARD, InvalidTopicError, TopicIndex, is_wildcard, validate_topic
 
-class RateLimitError(RuntimeError):
-    """Raised when a connection exceeds the allowed message rate."""
+try:  # pragma: no cover - optional dependency
+    import orjson
+except ImportError:  # pragma: no cover - exercised when orjson is absent
+    orjson = None
+
+
+logger = logging.getLogger(__name__)
+
+TopicListener = Callable[[str, bool], None]
+
+OVERFLOW_POLICIES = ("drop_oldest", "coalesce", "disconnect")
+SUBSCRIPTION_MESSAGES = ("subscribe", "unsubscribe")
+MAX_BATCH_WINDOW_MS = 1000
+MAX_BATCH_SIZE = 1000
+
+
+def encode_json(payload: Any) -> str:
+    """Encode an envelope once into the text frame sent to every subscriber."""
+
+    if orjson is not None:
+        return orjson.dumps(payload).decode("utf-8")
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+
+
+@dataclass
+class Outbound:
+    frame: str
+    coalesce_key: Optional[str] = None
 
 
 @dataclass
 class Connection:
+    """One observer socket with its own bounded outbound queue and writer task.
+
+    Producers call ``enqueue`` which never awaits; the writer task drains the
+    queue to the socket so a slow client only ever delays itself. When the
+    queue is full the overflow policy decides what happens:
+
+    * ``drop_oldest`` - discard the oldest queued message
+    * ``coalesce`` - replace a queued message with the same coalesce key,
+      otherwise discard the oldest
+    * ``disconnect`` - evict the client as a slow consumer
+
+    With a ``batch_window`` (seconds) the writer gathers frames for up to that
+    long, or until ``batch_max`` are ready, and sends them as one JSON array.
+    Under the ``coalesce`` policy only the newest message per coalesce key is
+    kept within a batch; the other policies deliver every batched message.
+    """
+
     websocket: WebSocket
     subject: str
     metadata: Dict[str, str]
-    timestamps: Deque[float] = field(default_factory=lambda: deque(maxlen=20))
+    max_queue: int = 256
+    overflow_policy: str = "drop_oldest"
+    queue: Deque[Outbound] = field(default_factory=deque)
+    sent: int = 0
+    dropped: int = 0
+    coalesced: int = 0
+    closed: bool = False
+    on_evict: Optional[Callable[["Connection"], None]] = None
+    batch_window: float = 0.0
+    batch_max: int = 64
+    clock: Callable[[], float] = time.monotonic
+    send_started: Optional[float] = None
+    _wakeup: asyncio.Event = field(default_factory=asyncio.Event, init=False, repr=False)
+    _writer: Optional[asyncio.Task] = field(default=None, init=False, repr=False)
+    _closing: bool = field(default=False, init=False, repr=False)
+
+    # ------------------------------------------------------------------
+    # Outbound queue
+    # ------------------------------------------------------------------
+    def start(self) -> None:
+        if self._writer is None:
+            self._writer = asyncio.get_running_loop().create_task(self._drain())
+
+    def enqueue(self, payload: Any, *, coalesce_key: Optional[str] = None, force: bool = False) -> bool:
+        """Encode ``payload`` and queue it; see ``enqueue_frame``."""
+
+        return self.enqueue_frame(encode_json(payload), coalesce_key=coalesce_key, force=force)
+
+    def enqueue_frame(self, frame: str, *, coalesce_key: Optional[str] = None, force: bool = False) -> bool:
+        """Queue an already encoded text frame; returns False if it was not accepted.
+
+        ``force`` bypasses the bound for replies to the client's own messages
+        (acks and errors), which are already limited by the inbound rate limit.
+        """
+
+        if self.closed or self._closing:
+            return False
+        if not force and len(self.queue) >= self.max_queue:
+            if not self._handle_overflow(coalesce_key, frame):
+                return False
+            self._wakeup.set()
+            return True
+        self.queue.append(Outbound(frame, coalesce_key))
+        self._wakeup.set()
+        return True
 
-    def record_activity(self, max_per_second: int) -> None:
-        now = time.monotonic()
-        while self.timestamps and now - self.timestamps[0] > 1:
-            self.timestamps.popleft()
-        if len(self.timestamps) >= max_per_second:
-            raise RateLimitError
-        self.timestamps.append(now)
+    async def close(self, code: int = status.WS_1000_NORMAL_CLOSURE, *, flush_timeout: float = 1.0) -> None:
+        """Flush what is queued (bounded by ``flush_timeout``) and close the socket."""
+
+        self._closing = True
+        self._wakeup.set()
+        writer = self._writer
+        if writer is not None and not writer.done():
+            try:
+                await asyncio.wait_for(asyncio.shield(writer), flush_timeout)
+            except Exception:
+                writer.cancel()
+        self.stop()
+        if self.websocket.application_state != WebSocketState.DISCONNECTED:
+            try:
+                await self.websocket.close(code=code)
+            except Exception:  # pragma: no cover - socket already gone
+                pass
+
+    def stop(self) -> None:
+        self.closed = True
+        self._wakeup.set()
+        if self._writer is not None and not self._writer.done():
+            self._writer.cancel()
+        self.queue.clear()
+
+    def _handle_overflow(self, coalesce_key: Optional[str], frame: str) -> bool:
+        if self.overflow_policy == "disconnect":
+            self.dropped += 1 + len(self.queue)
+            self.queue.clear()
+            self.closed = True
+            if self.on_evict is not None:
+                self.on_evict(self)
+            return False
+        if self.overflow_policy == "coalesce" and coalesce_key is not None:
+            for item in reversed(self.queue):
+                if item.coalesce_key == coalesce_key:
+                    item.frame = frame
+                    self.coalesced += 1
+                    return True
+        self.queue.popleft()
+        self.dropped += 1
+        self.queue.append(Outbound(frame, coalesce_key))
+        return True
+
+    async def _drain(self) -> None:
+        try:
+            while True:
+                if not self.queue:
+                    if self._closing or self.closed:
+                        return
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                item = self.queue.popleft()
+                if self.batch_window <= 0:
+                    await self._send(item.frame)
+                    self.sent += 1
+                    continue
+                frames = await self._collect_batch(item)
+                await self._send("[" + ",".join(frames) + "]")
+                self.sent += len(frames)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # The peer went away mid-send; stop accepting work for it.
+            self.closed = True
+            self.queue.clear()
+            if self.on_evict is not None:
+                self.on_evict(self)
+
+    async def _send(self, frame: str) -> None:
+        # A send that never completes means the peer stopped reading; the reaper watches this.
+        self.send_started = self.clock()
+        await self.websocket.send_text(frame)
+        self.send_started = None
+
+    async def _collect_batch(self, first: Outbound) -> List[str]:
+        batch = [first]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.batch_window
+        while len(batch) < self.batch_max:
+            if self.queue:
+                batch.append(self.queue.popleft())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0 or self._closing or self.closed:
+                break
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+        if self.overflow_policy != "coalesce":
+            return [item.frame for item in batch]
+        # Per-tick coalescing: a newer message with the same key supersedes older ones.
+        latest: Dict[str, int] = {}
+        for index, item in enumerate(batch):
+            if item.coalesce_key is not None:
+                latest[item.coalesce_key] = index
+        frames = [
+            item.frame
+            for index, item in enumerate(batch)
+            if item.coalesce_key is None or latest[item.coalesce_key] == index
+        ]
+        self.coalesced += len(batch) - len(frames)
+        return frames
+
+
+def parse_topics(raw: Any) -> List[str]:
+    """Normalise a topic list from a message (list) or query string (comma separated)."""
+
+    if isinstance(raw, str):
+        raw = [part.strip() for part in raw.split(",") if part.strip()]
+    if not isinstance(raw, list) or not raw:
+        raise InvalidTopicError("Expected a non-empty list of topics")
+    return [validate_topic(topic) for topic in raw]
 
 
 class ConnectionManager:
-    def __init__(self, *, max_messages_per_second: int = 10) -> None:
+    """Track observer connections and route published envelopes by topic.
+
+    Connections subscribe to topics (see ``topics.py``); ``publish`` only
+    touches the subscribers of the topic. New connections subscribe to ``*``
+    unless they ask for specific topics, which keeps plain clients seeing
+    every message as before.
+
+    Topic listeners are told when an exact topic gains its first subscriber
+    and loses its last one, so producers (such as the pane bridge) only run
+    while somebody is watching. Wildcard subscriptions do not count.
+
+    Every published envelope gets a global ``seq`` and is kept in the replay
+    buffer, so a reconnecting client can pass ``since`` to ``connect`` and
+    receive what it missed before any live message.
+
+    Publishes travel through the ``backplane`` (in-process by default), which
+    numbers them and calls ``deliver`` in every worker sharing it.
+
+    With a ``stall_timeout`` a reaper task evicts connections whose writer has
+    been stuck in a single send for that long, i.e. a peer that stopped
+    reading. Quiet observers are never evicted for being quiet; dead peers
+    are detected by the server's protocol-level pings, which end the read
+    loop and disconnect them.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_messages_per_second: int = 10,
+        queue_size: int = 256,
+        overflow_policy: str = "drop_oldest",
+        max_topics: int = 64,
+        replay: Optional[ReplayBuffer] = None,
+        backplane: Optional[Backplane] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        stall_timeout: float = 0.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy '{overflow_policy}'")
         self._connections: Dict[int, Connection] = {}
-        self._max_messages_per_second = max_messages_per_second
+        self._topics = TopicIndex()
+        self._subjects: Dict[str, Set[int]] = {}
+        self._max_topics = max_topics
+        self._topic_listeners: List[TopicListener] = []
+        self.replay = replay or ReplayBuffer()
+        self.backplane: Backplane
+        self.set_backplane(backplane or InProcessBackplane())
+        self.rate_limiter = rate_limiter or RateLimiter(
+            per_connection=Limit(max_messages_per_second, max_messages_per_second)
+        )
+        self._queue_size = queue_size
+        self._overflow_policy = overflow_policy
+        self._closed_dropped = 0
+        self._closed_coalesced = 0
+        self.slow_consumer_evictions = 0
+        self.stalled_evictions = 0
+        self.stall_timeout = stall_timeout
+        self._clock = clock
+        self._reaper: Optional[asyncio.Task] = None
 
-    async def connect(self, websocket: WebSocket, *, subject: str, metadata: Dict[str, str]) -> Connection:
+    async def connect(
+        self,
+        websocket: WebSocket,
+        *,
+        subject: str,
+        metadata: Dict[str, str],
+        queue_size: Optional[int] = None,
+        overflow_policy: Optional[str] = None,
+        topics: Optional[Iterable[str]] = None,
+        since: Optional[int] = None,
+        batch_window_ms: int = 0,
+        batch_max: int = 64,
+    ) -> Connection:
+        if not 0 <= batch_window_ms <= MAX_BATCH_WINDOW_MS or not 1 <= batch_max <= MAX_BATCH_SIZE:
+            raise ValueError("batch window or size out of range")
         await websocket.accept()
-        connection = Connection(websocket=websocket, subject=subject, metadata=metadata)
-        self._connections[id(websocket)] = connection
+        connection = Connection(
+            websocket=websocket,
+            subject=subject,
+            metadata=metadata,
+            max_queue=queue_size or self._queue_size,
+            overflow_policy=overflow_policy or self._overflow_policy,
+            on_evict=self._evict,
+            batch_window=batch_window_ms / 1000,
+            batch_max=batch_max,
+            clock=self._clock,
+        )
+        key = id(websocket)
+        self._connections[key] = connection
+        self._subjects.setdefault(subject, set()).add(key)
+        self.rate_limiter.attach(key, subject)
+        for topic in topics or (WILDCARD,):
+            self._add_topic(key, topic)
+        if since is not None:
+            # No await between subscribing and queueing the replay, so live
+            # publishes land strictly after the replayed frames: no gap, no dupes.
+            self._replay(connection, since)
+        connection.start()
+        self._ensure_reaper()
         return connection
 
     def disconnect(self, websocket: WebSocket) -> None:
-        self._connections.pop(id(websocket), None)
+        connection = self._connections.pop(id(websocket), None)
+        if connection is not None:
+            self._retire(connection)
+
+    def subscribe(self, connection: Connection, topics: Iterable[str]) -> List[str]:
+        key = id(connection.websocket)
+        topics = list(topics)
+        if len(self._topics.topics_for(key) | set(topics)) > self._max_topics:
+            raise InvalidTopicError(f"At most {self._max_topics} topics per connection")
+        for topic in topics:
+            self._add_topic(key, topic)
+        return self.topics_for(connection)
+
+    def unsubscribe(self, connection: Connection, topics: Iterable[str]) -> List[str]:
+        key = id(connection.websocket)
+        for topic in topics:
+            self._drop_topic(key, topic)
+        return self.topics_for(connection)
+
+    def topics_for(self, connection: Connection) -> List[str]:
+        return sorted(self._topics.topics_for(id(connection.websocket)))
+
+    def set_backplane(self, backplane: Backplane) -> None:
+        """Swap the transport; start it with ``await manager.backplane.start()``."""
+
+        self.backplane = backplane
+        backplane.bind(self.deliver)
+
+    def add_topic_listener(self, listener: TopicListener) -> Callable[[], None]:
+        self._topic_listeners.append(listener)
+
+        def remove() -> None:
+            if listener in self._topic_listeners:
+                self._topic_listeners.remove(listener)
+
+        return remove
+
+    def subscriber_count(self, topic: str) -> int:
+        return self._topics.subscriber_count(topic)
+
+    async def publish(self, topic: str, payload: Dict, *, coalesce: bool = True) -> int:
+        """Publish ``payload`` on ``topic``; returns how many local subscribers got it.
+
+        The count is 0 when delivery happens asynchronously via a remote backplane.
+        """
+
+        return self.publish_nowait(topic, payload, coalesce=coalesce)
+
+    def publish_nowait(self, topic: str, payload: Dict, *, coalesce: bool = True) -> int:
+        """``publish`` for callbacks running on the event loop outside a coroutine.
+
+        ``coalesce=False`` keeps the message out of the ``coalesce`` overflow
+        policy, for streams such as pane output where every message matters.
+        """
+
+        return self.backplane.publish(topic, payload, coalesce)
+
+    def deliver(self, topic: str, payload: Dict, seq: int, coalesce: bool = True) -> int:
+        """Record a numbered envelope for replay and queue it for local subscribers."""
+
+        started = time.perf_counter()
+        payload = {**payload, "seq": seq}
+        frame = encode_json(payload)
+        self.replay.append(topic, seq, frame)
+        delivered = 0
+        keys = self._topics.match(topic)
+        if keys:
+            coalesce_key = _coalesce_key(payload) if coalesce else None
+            for key in keys:
+                connection = self._connections.get(key)
+                if connection is not None and connection.enqueue_frame(frame, coalesce_key=coalesce_key):
+                    delivered += 1
+        PUBLISHED.inc()
+        PUBLISH_FANOUT.observe(delivered)
+        PUBLISH_SECONDS.observe(time.perf_counter() - started)
+        return delivered
 
     async def broadcast(self, payload: Dict) -> None:
+        """Deliver ``payload`` to every connection regardless of subscriptions."""
+
+        coalesce_key = _coalesce_key(payload)
+        frame = encode_json(payload)
         for connection in list(self._connections.values()):
-            await connection.websocket.send_json(payload)
+            connection.enqueue_frame(frame, coalesce_key=coalesce_key)
 
     async def handle_incoming(self, connection: Connection, message: Dict) -> Dict:
-        connection.record_activity(self._max_messages_per_second)
+        WS_MESSAGES_RECEIVED.inc()
+        decision = self.rate_limiter.acquire(id(connection.websocket), connection.subject)
+        if not decision.allowed:
+            raise RateLimitError(decision.scope)
+        if decision.delay:
+            # Soft throttling: hold this client's read loop instead of disconnecting it.
+            await asyncio.sleep(decision.delay)
         if not isinstance(message, dict) or "type" not in message:
             return {"type": "error", "error": "invalid_message"}
 
+        kind = message.get("type")
+        try:
+            if kind in SUBSCRIPTION_MESSAGES:
+                topics = parse_topics(message.get("topics"))
+                if kind == "subscribe":
+                    current = self.subscribe(connection, topics)
+                else:
+                    current = self.unsubscribe(connection, topics)
+                return {"type": kind, "topics": current}
+            # Messages without an explicit topic are published under their event type.
+            topic = validate_topic(message.get("topic") or f"event:{kind}")
+        except InvalidTopicError:
+            return {"type": "error", "error": "invalid_topic"}
+
         envelope = {
-            "type": message.get("type"),
+            "type": kind,
+            "topic": topic,
             "payload": message.get("payload"),
             "from": connection.subject,
             "meta": connection.metadata,
         }
-        await self.broadcast(envelope)
+        await self.publish(topic, envelope)
         return envelope
 
-    def list_subjects(self) -> Iterable[str]:
-        return [conn.subject for conn in self._connections.values()]
+    def list_subjects(self, topic: Optional[str] = None) -> Iterable[str]:
+        """Connected subjects, optionally only those receiving ``topic``."""
+
+        if topic is None:
+            return list(self._subjects)
+        subjects = {
+            self._connections[key].subject for key in self._topics.match(topic) if key in self._connections
+        }
+        return sorted(subjects)
+
+    def stats(self) -> Dict[str, int]:
+        connections = list(self._connections.values())
+        depths = [len(conn.queue) for conn in connections]
+        replay = self.replay.stats()
+        return {
+            "connections": len(connections),
+            "queue_depth": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "sent": sum(conn.sent for conn in connections),
+            "dropped": self._closed_dropped + sum(conn.dropped for conn in connections),
+            "coalesced": self._closed_coalesced + sum(conn.coalesced for conn in connections),
+            "slow_consumer_evictions": self.slow_consumer_evictions,
+            "stalled_evictions": self.stalled_evictions,
+            "topics": len(self._topics),
+            "replay_events": replay["events"],
+            "replay_bytes": replay["bytes"],
+            **self.rate_limiter.stats(),
+        }
+
+    def reap(self) -> int:
+        """Evict connections stuck in one send for ``stall_timeout``; returns evictions."""
+
+        if self.stall_timeout <= 0:
+            return 0
+        now = self._clock()
+        evicted = 0
+        for connection in list(self._connections.values()):
+            started = connection.send_started
+            if started is not None and now - started >= self.stall_timeout:
+                self._expire(connection)
+                evicted += 1
+        return evicted
+
+    async def close(self) -> None:
+        """Stop the reaper and drop every connection (daemon shutdown)."""
+
+        reaper, self._reaper = self._reaper, None
+        if reaper is not None and not reaper.done():
+            reaper.cancel()
+        for connection in list(self._connections.values()):
+            self.disconnect(connection.websocket)
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+    def _ensure_reaper(self) -> None:
+        if self.stall_timeout <= 0:
+            return
+        loop = asyncio.get_running_loop()
+        reaper = self._reaper
+        if reaper is not None and not reaper.done() and reaper.get_loop() is loop:
+            return
+        self._reaper = loop.create_task(self._reap_loop())
+
+    async def _reap_loop(self) -> None:
+        while self._connections and self.stall_timeout > 0:
+            await asyncio.sleep(max(self.stall_timeout / 6, 0.05))
+            self.reap()
+        # Restarted by the next connect.
+        self._reaper = None
+
+    def _replay(self, connection: Connection, since: int) -> None:
+        frames, truncated = self.replay.since(since, self._topics.topics_for(id(connection.websocket)))
+        for _, frame in frames:
+            connection.enqueue_frame(frame, force=True)
+        connection.enqueue(
+            {
+                "type": "replay.complete",
+                "since": since,
+                "seq": self.replay.seq,
+                "count": len(frames),
+                "truncated": truncated,
+            },
+            force=True,
+        )
+
+    def _add_topic(self, key: int, topic: str) -> None:
+        if self._topics.subscribe(key, topic) and self._topics.subscriber_count(topic) == 1:
+            self._notify_topic(topic, True)
+
+    def _drop_topic(self, key: int, topic: str) -> None:
+        if self._topics.unsubscribe(key, topic) and not is_wildcard(topic):
+            if self._topics.subscriber_count(topic) == 0:
+                self._notify_topic(topic, False)
+
+    def _notify_topic(self, topic: str, active: bool) -> None:
+        for listener in list(self._topic_listeners):
+            try:
+                listener(topic, active)
+            except Exception:  # pragma: no cover - a broken listener must not break routing
+                logger.exception("topic listener failed for %s", topic)
+
+    def _retire(self, connection: Connection) -> None:
+        key = id(connection.websocket)
+        self.rate_limiter.detach(key, connection.subject)
+        for topic in self._topics.topics_for(key):
+            self._drop_topic(key, topic)
+        keys = self._subjects.get(connection.subject)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._subjects[connection.subject]
+        self._closed_dropped += connection.dropped
+        self._closed_coalesced += connection.coalesced
+        connection.dropped = connection.coalesced = 0
+        connection.stop()
+
+    def _evict(self, connection: Connection) -> None:
+        if self._connections.pop(id(connection.websocket), None) is None:
+            return
+        if connection.overflow_policy == "disconnect":
+            self.slow_consumer_evictions += 1
+        self._retire(connection)
+        loop = asyncio.get_running_loop()
+        loop.create_task(_close_quietly(connection.websocket, status.WS_1008_POLICY_VIOLATION))
+
+    def _expire(self, connection: Connection) -> None:
+        if self._connections.pop(id(connection.websocket), None) is None:
+            return
+        self.stalled_evictions += 1
+        self._retire(connection)
+        loop = asyncio.get_running_loop()
+        loop.create_task(_close_quietly(connection.websocket, status.WS_1001_GOING_AWAY))
+
+
+def _coalesce_key(payload: Any) -> Optional[str]:
+    if not isinstance(payload, dict):
+        return None
+    topic = payload.get("topic")
+    return f"{topic}|{payload.get('type')}" if topic else payload.get("type")
+
+
+async def _close_quietly(websocket: WebSocket, code: int) -> None:
+    if websocket.application_state == WebSocketState.DISCONNECTED:
+        return
+    try:
+        await asyncio.wait_for(websocket.close(code=code), timeout=1.0)
+    except Exception:
+        pass
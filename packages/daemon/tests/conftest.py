@@ -4,22 +4,49 @@ import pytest
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.asymmetric import rsa
 from jwt import encode
+from jwt.algorithms import RSAAlgorithm
 
 from orchestra_daemon import auth
-from orchestra_daemon.config import Settings
+from orchestra_daemon.config import settings_provider
+from orchestra_daemon.jwks import JWKSCache
+
+
+class LocalJWKS:
+    """In-memory stand-in for the Auth0 JWKS endpoint."""
+
+    def __init__(self) -> None:
+        self.keys: Dict[str, Dict] = {}
+        self.calls = 0
+        self.fail = False
+
+    def add_key(self, kid: str, public_pem: bytes) -> None:
+        public_key = serialization.load_pem_public_key(public_pem)
+        jwk = RSAAlgorithm.to_jwk(public_key, as_dict=True)
+        jwk.update({"kid": kid, "use": "sig", "alg": "RS256"})
+        self.keys[kid] = jwk
+
+    async def __call__(self) -> Dict:
+        self.calls += 1
+        if self.fail:
+            raise OSError("jwks endpoint unreachable")
+        return {"keys": list(self.keys.values())}
 
 
 @pytest.fixture(autouse=True)
 def clear_caches():
-    if hasattr(auth._get_settings, "cache_clear"):
-        auth._get_settings.cache_clear()
+    settings_provider.clear()
     if hasattr(auth._get_jwks_client, "cache_clear"):
         auth._get_jwks_client.cache_clear()
+    if hasattr(auth._get_jwks_cache, "cache_clear"):
+        auth._get_jwks_cache.cache_clear()
+    auth._get_token_cache.cache_clear()
     yield
-    if hasattr(auth._get_settings, "cache_clear"):
-        auth._get_settings.cache_clear()
     if hasattr(auth._get_jwks_client, "cache_clear"):
         auth._get_jwks_client.cache_clear()
+    if hasattr(auth._get_jwks_cache, "cache_clear"):
+        auth._get_jwks_cache.cache_clear()
+    auth._get_token_cache.cache_clear()
+    settings_provider.clear()
 
 
 @pytest.fixture
@@ -38,19 +65,19 @@ def rsa_keys():
 
 
 @pytest.fixture
-def auth_setup(monkeypatch, rsa_keys):
+def local_jwks(rsa_keys):
+    jwks = LocalJWKS()
+    jwks.add_key("test-key", rsa_keys[1])
+    return jwks
+
+
+@pytest.fixture
+def auth_setup(monkeypatch, rsa_keys, local_jwks):
     private_pem, public_pem = rsa_keys
     monkeypatch.setenv("AUTH0_DOMAIN", "example.com")
     monkeypatch.setenv("AUTH0_AUDIENCE", "test-audience")
     monkeypatch.setenv("AUTH0_ISSUER", "https://example.com/")
 
-    def fake_settings() -> Settings:
-        return Settings(
-            auth0_domain="example.com",
-            auth0_audience="test-audience",
-            auth0_issuer="https://example.com/",
-        )
-
     class DummyKey:
         def __init__(self, key: bytes) -> None:
             self.key = key
@@ -62,8 +89,9 @@ def auth_setup(monkeypatch, rsa_keys):
         def get_signing_key_from_jwt(self, token: str) -> DummyKey:
             return DummyKey(self._key)
 
-    monkeypatch.setattr(auth, "_get_settings", lambda: fake_settings())
     monkeypatch.setattr(auth, "_get_jwks_client", lambda: DummyClient(public_pem))
+    jwks_cache = JWKSCache("https://example.com/.well-known/jwks.json", fetch=local_jwks)
+    monkeypatch.setattr(auth, "_get_jwks_cache", lambda: jwks_cache)
 
     def make_token(claims: Dict) -> str:
         headers = {"kid": "test-key"}
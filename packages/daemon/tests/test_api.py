@@ -0,0 +1,128 @@
+import pytest
+
+from orchestra.run_history import RunHistory
+from orchestra.tmux_manager import PaneCapture
+from orchestra.transcripts import TranscriptStore
+
+from orchestra_daemon import api
+
+
+class SessionTmux:
+    def __init__(self, sessions, lines=()):
+        self.sessions = list(sessions)
+        self.lines = list(lines)
+
+    def list_sessions(self):
+        return list(self.sessions)
+
+    def session_exists(self, name):
+        return name in self.sessions
+
+    def capture_pane(self, name, *, pane="0", scrollback=None):
+        lines = self.lines[-scrollback:] if scrollback else self.lines
+        return PaneCapture(session=name, pane=pane, lines=list(lines), dead=False)
+
+
+@pytest.fixture
+def history(tmp_path):
+    history = RunHistory(tmp_path / "runs.json")
+    for index in range(5):
+        history.start_run(
+            f"r{index}",
+            task=f"task {index}",
+            primary="claude",
+            secondary="codex",
+            primary_session=f"run-r{index}-primary-claude",
+            secondary_session=f"run-r{index}-secondary-codex",
+            cleanup=False,
+            follow_mode=False,
+        )
+    history.complete_run("r0", status="success", summary={"status": "success", "details": ["done", "ok"]})
+    return history
+
+
+@pytest.fixture
+def transcripts(tmp_path):
+    return TranscriptStore(tmp_path / "transcripts")
+
+
+@pytest.fixture
+def api_client(client, auth_setup, history, transcripts):
+    tmux = SessionTmux(["run-r4-secondary-codex", "scratch"], lines=[f"line {n}" for n in range(600)])
+    client.app.dependency_overrides[api.get_history] = lambda: history
+    client.app.dependency_overrides[api.get_transcripts] = lambda: transcripts
+    client.app.dependency_overrides[api.get_tmux] = lambda: tmux
+    token = auth_setup({"sub": "dash", "aud": "test-audience", "iss": "https://example.com/"})
+    client.headers["Authorization"] = f"Bearer {token}"
+    yield client
+    client.app.dependency_overrides.clear()
+
+
+def test_routes_require_a_token(client):
+    assert client.get("/api/runs").status_code == 401
+
+
+def test_runs_are_paginated_newest_first(api_client):
+    first = api_client.get("/api/runs", params={"limit": 2})
+    assert first.status_code == 200
+    body = first.json()
+    assert [run["run_id"] for run in body["runs"]] == ["r4", "r3"]
+    assert (body["total"], body["next_offset"]) == (5, 2)
+
+    last = api_client.get("/api/runs", params={"offset": 4, "limit": 2}).json()
+    assert [run["run_id"] for run in last["runs"]] == ["r0"]
+    assert last["next_offset"] is None
+
+    filtered = api_client.get("/api/runs", params={"status": "success"}).json()
+    assert [run["run_id"] for run in filtered["runs"]] == ["r0"]
+    assert api_client.get("/api/runs", params={"limit": 0}).status_code == 422
+
+
+def test_etag_answers_304_until_the_history_changes(api_client, history):
+    response = api_client.get("/api/runs/r1")
+    assert response.json()["task"] == "task 1"
+    etag = response.headers["etag"]
+
+    cached = api_client.get("/api/runs", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+
+    history.complete_run("r1", status="failed")
+    fresh = api_client.get("/api/runs/r1", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.json()["status"] == "failed"
+    assert fresh.headers["etag"] != etag
+    assert api_client.get("/api/runs/missing").status_code == 404
+
+
+def test_sessions_are_described_and_paginated(api_client):
+    body = api_client.get("/api/sessions", params={"limit": 1}).json()
+    assert body["sessions"] == [{"name": "run-r4-secondary-codex", "run_id": "r4", "role": "secondary", "tool": "codex"}]
+    assert body["next_offset"] == 1
+
+
+def test_output_streams_live_pane_then_falls_back_to_summary(api_client):
+    live = api_client.get("/api/runs/r4/output", params={"scrollback": 300})
+    assert live.headers["x-orchestra-output-source"] == "live"
+    lines = live.text.splitlines()
+    assert len(lines) == 300 and lines[-1] == "line 599"
+
+    stored = api_client.get("/api/runs/r0/output")
+    assert stored.headers["x-orchestra-output-source"] == "summary"
+    assert stored.text == "done\nok\n"
+
+    assert api_client.get("/api/runs/r2/output").status_code == 404
+
+
+def test_output_of_a_finished_run_comes_from_its_transcript(api_client, transcripts):
+    with transcripts.writer("r0", "secondary", block_lines=64) as writer:
+        writer.write_lines(f"full {n}" for n in range(1000))
+    response = api_client.get("/api/runs/r0/output", params={"scrollback": 3})
+    assert response.headers["x-orchestra-output-source"] == "transcript"
+    assert response.text == "full 997\nfull 998\nfull 999\n"
+    assert api_client.get("/api/runs/r4/output", params={"role": "other"}).status_code == 422
+
+
+def test_sessions_report_missing_tmux(api_client):
+    api_client.app.dependency_overrides[api.get_tmux] = lambda: None
+    assert api_client.get("/api/sessions").status_code == 503
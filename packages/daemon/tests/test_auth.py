@@ -41,3 +41,9 @@ def test_verify_jwt_jwks_unavailable(monkeypatch):
         auth.verify_jwt("any-token")
 
     assert excinfo.value.status_code == 503
+
+
+def test_has_scope_reads_scope_string_and_permissions():
+    assert auth.has_scope({"scope": "openid runs:submit"}, "runs:submit")
+    assert auth.has_scope({"permissions": ["runs:read", "runs:submit"]}, "runs:submit")
+    assert not auth.has_scope({"scope": "runs:submit-all", "permissions": "runs:submit"}, "runs:submit")
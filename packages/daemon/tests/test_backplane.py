@@ -0,0 +1,127 @@
+import asyncio
+import contextlib
+import tempfile
+from pathlib import Path
+
+from orchestra_daemon.backplane import BackplaneBroker, UnixSocketBackplane
+from orchestra_daemon.pane_bridge import PaneBridge
+from orchestra_daemon.websocket import ConnectionManager
+
+from .test_connection_manager import FakeWebSocket
+from .test_pane_bridge import FakeTmux, wait_for
+
+
+@contextlib.asynccontextmanager
+async def workers(count):
+    """A stand-in broker plus ``count`` managers, each playing one daemon worker."""
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = str(Path(directory) / "backplane.sock")
+        broker = BackplaneBroker(path)
+        await broker.start()
+        managers = []
+        for _ in range(count):
+            manager = ConnectionManager(backplane=UnixSocketBackplane(path, reconnect_interval=0.05))
+            await manager.backplane.start()
+            managers.append(manager)
+        try:
+            yield broker, managers
+        finally:
+            for manager in managers:
+                await manager.backplane.close()
+            await broker.close()
+
+
+def test_publishes_fan_out_to_every_worker_in_one_order():
+    async def scenario():
+        async with workers(3) as (broker, managers):
+            sockets = [FakeWebSocket() for _ in managers]
+            for manager, ws in zip(managers, sockets):
+                await manager.connect(ws, subject="s", metadata={}, topics=["run:*"])
+
+            for n in range(6):
+                await managers[n % 3].publish("run:1", {"type": "output", "topic": "run:1", "n": n})
+            await wait_for(lambda: all(len(ws.sent) == 6 for ws in sockets))
+
+            late = FakeWebSocket()
+            await managers[2].connect(late, subject="late", metadata={}, topics=["run:1"], since=3)
+            await wait_for(lambda: late.sent)
+            return broker, sockets, late
+
+    broker, sockets, late = asyncio.run(scenario())
+
+    orders = [[(msg["seq"], msg["n"]) for msg in ws.sent] for ws in sockets]
+    assert orders[0] == orders[1] == orders[2]
+    assert [seq for seq, _ in orders[0]] == list(range(1, 7))
+    assert [msg["seq"] for msg in late.sent[:-1]] == [4, 5, 6]
+    assert broker.seq == 6
+
+
+def test_claims_are_exclusive_and_released_on_disconnect():
+    async def scenario():
+        async with workers(2) as (_, (first, second)):
+            released = []
+            second.backplane.on_release(released.append)
+            assert await first.backplane.acquire("pane:abc")
+            assert not await second.backplane.acquire("pane:abc")
+            assert await first.backplane.acquire("pane:abc")  # re-entrant for the owner
+
+            await first.backplane.close()
+            await wait_for(lambda: released == ["pane:abc"])
+            assert await second.backplane.acquire("pane:abc")
+
+    asyncio.run(scenario())
+
+
+def test_stalled_worker_is_evicted_and_its_claims_released():
+    async def scenario():
+        async with workers(1) as (broker, (active,)):
+            broker.max_buffer = 4096
+            released = []
+            active.backplane.on_release(released.append)
+            # A worker that claims a pane and then never reads again.
+            _, stalled = await asyncio.open_unix_connection(broker.path)
+            stalled.write(b'{"op":"acquire","name":"pane:abc","id":1}\n')
+            await wait_for(lambda: "pane:abc" in broker._claims)
+            assert not await active.backplane.acquire("pane:abc")
+
+            for n in range(200):
+                await active.publish("run:1", {"type": "output", "topic": "run:1", "text": "x" * 65536})
+                await asyncio.sleep(0.005)  # the active worker keeps up with its own echoes
+                if broker.evictions:
+                    break
+            await wait_for(lambda: released == ["pane:abc"])
+            assert await active.backplane.acquire("pane:abc")
+            stalled.close()
+            return broker
+
+    broker = asyncio.run(scenario())
+    assert broker.evictions == 1
+
+
+def test_pane_is_tailed_once_across_workers():
+    tmux = FakeTmux(["run-abc-secondary-codex"])
+
+    async def scenario():
+        async with workers(2) as (_, managers):
+            bridges = [PaneBridge(manager, tmux_factory=lambda: tmux, status_interval=0) for manager in managers]
+            sockets = [FakeWebSocket(), FakeWebSocket()]
+            for bridge, manager, ws in zip(bridges, managers, sockets):
+                bridge.attach()
+                await manager.connect(ws, subject="s", metadata={}, topics=["run:abc"])
+            await wait_for(lambda: sum(len(bridge.active_runs) for bridge in bridges) == 1)
+
+            tmux.lines.put("hello")
+            await wait_for(lambda: all(
+                any(msg["type"] == "pane.output" for msg in ws.sent) for ws in sockets
+            ))
+            owner = next(i for i, bridge in enumerate(bridges) if bridge.active_runs)
+
+            # The owner's observer leaves; the other worker takes the pane over.
+            managers[owner].disconnect(sockets[owner])
+            await wait_for(lambda: bridges[1 - owner].active_runs == ["abc"])
+            for bridge in bridges:
+                await asyncio.to_thread(bridge.close)
+
+    asyncio.run(scenario())
+    assert tmux.readers == 2
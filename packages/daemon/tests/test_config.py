@@ -0,0 +1,97 @@
+import pytest
+
+from orchestra_daemon.config import SettingsProvider, get_settings, load_settings, watch_settings
+
+
+def write_env(path, audience):
+    path.write_text(f"AUTH0_DOMAIN=example.com\nAUTH0_AUDIENCE={audience}\n")
+
+
+def test_load_settings_reads_env_file_without_mutating_environ(tmp_path, monkeypatch):
+    for key in ("AUTH0_DOMAIN", "AUTH0_AUDIENCE", "AUTH0_ISSUER"):
+        monkeypatch.delenv(key, raising=False)
+    env_file = tmp_path / ".env"
+    write_env(env_file, "aud-1")
+
+    settings = load_settings(env_file)
+
+    assert settings.auth0_audience == "aud-1"
+    assert settings.auth0_issuer == "https://example.com/"
+    import os
+
+    assert "AUTH0_AUDIENCE" not in os.environ
+
+
+def test_process_environment_overrides_env_file(tmp_path, monkeypatch):
+    env_file = tmp_path / ".env"
+    write_env(env_file, "from-file")
+    monkeypatch.setenv("AUTH0_AUDIENCE", "from-env")
+
+    assert load_settings(env_file).auth0_audience == "from-env"
+
+
+def test_watch_settings_swaps_snapshot_on_change(tmp_path, monkeypatch):
+    for key in ("AUTH0_DOMAIN", "AUTH0_AUDIENCE", "AUTH0_ISSUER"):
+        monkeypatch.delenv(key, raising=False)
+    env_file = tmp_path / ".env"
+    write_env(env_file, "aud-1")
+    watcher = watch_settings(env_file, use_inotify=False)
+    events = []
+    watcher.subscribe(events.append)
+    before = watcher.current
+
+    assert watcher.check() is None
+
+    write_env(env_file, "aud-2-longer")
+    event = watcher.check()
+
+    assert event is not None and event.ok
+    assert watcher.current.auth0_audience == "aud-2-longer"
+    assert before.auth0_audience == "aud-1"
+    assert events == [event]
+    assert event.generation == 2
+
+
+def test_settings_provider_caches_until_reload(tmp_path, monkeypatch):
+    for key in ("AUTH0_DOMAIN", "AUTH0_AUDIENCE", "AUTH0_ISSUER"):
+        monkeypatch.delenv(key, raising=False)
+    env_file = tmp_path / ".env"
+    write_env(env_file, "aud-1")
+    provider = SettingsProvider(env_file)
+    seen = []
+    provider.subscribe(seen.append)
+
+    first = provider.get()
+    write_env(env_file, "aud-2")
+
+    assert provider.get() is first
+    reloaded = provider.reload()
+    assert reloaded.auth0_audience == "aud-2"
+    assert provider.get() is reloaded
+    assert seen == [reloaded]
+
+
+def test_auth_shares_the_provider_snapshot(monkeypatch):
+    monkeypatch.setenv("AUTH0_DOMAIN", "example.com")
+    monkeypatch.setenv("AUTH0_AUDIENCE", "test-audience")
+    from orchestra_daemon import auth
+
+    assert auth._get_settings() is get_settings()
+
+
+def test_rate_limit_settings(tmp_path, monkeypatch):
+    env_file = tmp_path / ".env"
+    env_file.write_text(
+        "AUTH0_DOMAIN=example.com\nAUTH0_AUDIENCE=aud\n"
+        "DAEMON_RATE_LIMIT_MODE=soft\nDAEMON_RATE_LIMIT_SUBJECT_RATE=5\n"
+    )
+
+    settings = load_settings(env_file)
+
+    assert settings.rate_limit_mode == "soft"
+    assert settings.rate_limit_subject_rate == settings.rate_limit_subject_burst == 5.0
+    assert settings.rate_limit_connection_rate == 10.0
+
+    monkeypatch.setenv("DAEMON_RATE_LIMIT_MODE", "sometimes")
+    with pytest.raises(RuntimeError):
+        load_settings(env_file)
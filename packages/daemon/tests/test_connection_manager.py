@@ -0,0 +1,359 @@
+import asyncio
+import gc
+import json
+import tracemalloc
+
+from fastapi.websockets import WebSocketState
+
+from orchestra_daemon.websocket import ConnectionManager
+
+
+class FakeWebSocket:
+    """Minimal stand-in for a Starlette WebSocket."""
+
+    def __init__(self, *, stalled: bool = False) -> None:
+        self.sent = []
+        self.frames = []
+        self.closed_with = None
+        self.application_state = WebSocketState.CONNECTED
+        self._release = asyncio.Event()
+        if not stalled:
+            self._release.set()
+
+    async def accept(self):
+        return None
+
+    async def send_text(self, frame):
+        await self._release.wait()
+        self.frames.append(frame)
+        self.sent.append(json.loads(frame))
+
+    async def close(self, code=1000):
+        self.closed_with = code
+        self.application_state = WebSocketState.DISCONNECTED
+
+    def unstall(self):
+        self._release.set()
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_stalled_client_does_not_delay_others():
+    async def scenario():
+        manager = ConnectionManager(queue_size=4)
+        fast = [FakeWebSocket() for _ in range(3)]
+        slow = FakeWebSocket(stalled=True)
+        for ws in [*fast, slow]:
+            await manager.connect(ws, subject="s", metadata={})
+
+        for i in range(10):
+            await asyncio.wait_for(manager.broadcast({"type": "tick", "n": i}), timeout=0.1)
+        await settle()
+
+        stats = manager.stats()
+        assert all([msg["n"] for msg in ws.sent] == list(range(10)) for ws in fast)
+        assert slow.sent == []
+        assert stats["max_queue_depth"] == 4
+        assert stats["dropped"] >= 5
+
+        slow.unstall()
+        await settle()
+        # drop_oldest keeps the newest messages for the slow client.
+        assert [msg["n"] for msg in slow.sent][-3:] == [7, 8, 9]
+
+    asyncio.run(scenario())
+
+
+def test_disconnect_policy_evicts_slow_consumer():
+    async def scenario():
+        manager = ConnectionManager(queue_size=2, overflow_policy="disconnect")
+        fast = FakeWebSocket()
+        slow = FakeWebSocket(stalled=True)
+        await manager.connect(fast, subject="fast", metadata={})
+        await manager.connect(slow, subject="slow", metadata={})
+
+        for i in range(5):
+            await manager.broadcast({"type": "tick", "n": i})
+            await settle()
+
+        assert list(manager.list_subjects()) == ["fast"]
+        assert slow.closed_with == 1008
+        assert len(fast.sent) == 5
+        assert manager.stats()["slow_consumer_evictions"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_coalesce_policy_replaces_matching_message():
+    async def scenario():
+        manager = ConnectionManager(queue_size=2, overflow_policy="coalesce")
+        slow = FakeWebSocket(stalled=True)
+        await manager.connect(slow, subject="slow", metadata={})
+
+        await manager.broadcast({"type": "status", "value": 1})
+        await settle()  # the writer now holds message 1 in a blocked send
+        for value in range(2, 6):
+            await manager.broadcast({"type": "status", "value": value})
+        await manager.broadcast({"type": "log", "value": "x"})
+        slow.unstall()
+        await settle()
+
+        assert [msg["value"] for msg in slow.sent] == [1, 5, "x"]
+        assert manager.stats()["coalesced"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_forced_replies_bypass_the_bound():
+    async def scenario():
+        manager = ConnectionManager(queue_size=1)
+        ws = FakeWebSocket(stalled=True)
+        connection = await manager.connect(ws, subject="s", metadata={})
+        await settle()
+
+        for i in range(3):
+            assert connection.enqueue({"type": "ack", "n": i}, force=True)
+        assert len(connection.queue) == 3
+
+    asyncio.run(scenario())
+
+
+def test_broadcast_encodes_envelope_once(monkeypatch):
+    from orchestra_daemon import websocket as websocket_module
+
+    calls = []
+    original = websocket_module.encode_json
+    monkeypatch.setattr(websocket_module, "encode_json", lambda payload: calls.append(1) or original(payload))
+
+    async def scenario():
+        manager = ConnectionManager()
+        sockets = [FakeWebSocket() for _ in range(20)]
+        for ws in sockets:
+            await manager.connect(ws, subject="s", metadata={})
+        await manager.broadcast({"type": "tick", "payload": {"value": "é"}})
+        await settle()
+        return sockets
+
+    sockets = asyncio.run(scenario())
+
+    assert len(calls) == 1
+    assert all(ws.frames == [sockets[0].frames[0]] for ws in sockets)
+    assert sockets[0].sent[0]["payload"]["value"] == "é"
+
+
+def test_publish_reaches_only_matching_subscribers():
+    async def scenario():
+        manager = ConnectionManager()
+        everything = FakeWebSocket()
+        runs = FakeWebSocket()
+        one_run = FakeWebSocket()
+        await manager.connect(everything, subject="all", metadata={})
+        await manager.connect(runs, subject="runs", metadata={}, topics=["run:*"])
+        connection = await manager.connect(one_run, subject="one", metadata={}, topics=["run:1"])
+
+        assert await manager.publish("run:1", {"type": "output", "topic": "run:1"}) == 3
+        assert await manager.publish("run:2", {"type": "output", "topic": "run:2"}) == 2
+        assert await manager.publish("agent:claude", {"type": "status", "topic": "agent:claude"}) == 1
+        assert manager.list_subjects("run:2") == ["all", "runs"]
+
+        manager.unsubscribe(connection, ["run:1"])
+        assert await manager.publish("run:1", {"type": "output", "topic": "run:1"}) == 2
+        await settle()
+        return everything, runs, one_run
+
+    everything, runs, one_run = asyncio.run(scenario())
+
+    assert len(everything.sent) == 4
+    assert [msg["topic"] for msg in runs.sent] == ["run:1", "run:2", "run:1"]
+    assert [msg["topic"] for msg in one_run.sent] == ["run:1"]
+
+
+def test_subscription_messages_update_the_index():
+    async def scenario():
+        manager = ConnectionManager(max_topics=2)
+        ws = FakeWebSocket()
+        connection = await manager.connect(ws, subject="s", metadata={}, topics=["run:1"])
+
+        reply = await manager.handle_incoming(connection, {"type": "subscribe", "topics": ["agent:*"]})
+        assert reply == {"type": "subscribe", "topics": ["agent:*", "run:1"]}
+        too_many = await manager.handle_incoming(connection, {"type": "subscribe", "topics": ["event:x"]})
+        assert too_many["error"] == "invalid_topic"
+        bad = await manager.handle_incoming(connection, {"type": "subscribe", "topics": ["run*"]})
+        assert bad["error"] == "invalid_topic"
+
+        envelope = await manager.handle_incoming(connection, {"type": "status", "payload": {}})
+        assert envelope["topic"] == "event:status"
+
+        manager.disconnect(ws)
+        assert manager.list_subjects() == []
+        assert manager.stats()["topics"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_reconnect_with_since_resumes_without_gaps():
+    async def scenario():
+        manager = ConnectionManager()
+        first = FakeWebSocket()
+        await manager.connect(first, subject="s", metadata={}, topics=["run:1"])
+        for n in range(3):
+            await manager.publish("run:1", {"type": "output", "topic": "run:1", "n": n})
+        await manager.publish("run:2", {"type": "output", "topic": "run:2", "n": 99})
+        await settle()
+        last_seen = first.sent[-1]["seq"]
+        manager.disconnect(first)
+
+        for n in range(3, 6):
+            await manager.publish("run:1", {"type": "output", "topic": "run:1", "n": n})
+
+        second = FakeWebSocket()
+        await manager.connect(second, subject="s", metadata={}, topics=["run:1"], since=last_seen)
+        await manager.publish("run:1", {"type": "output", "topic": "run:1", "n": 6})
+        await settle()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    received = [msg["n"] for msg in first.sent] + [msg["n"] for msg in second.sent if "n" in msg]
+    assert received == list(range(7))
+    marker = next(msg for msg in second.sent if msg["type"] == "replay.complete")
+    assert marker["count"] == 3 and not marker["truncated"]
+    assert second.sent.index(marker) == 3  # replayed frames first, then live traffic
+    seqs = [msg["seq"] for msg in second.sent if "n" in msg]
+    assert seqs == sorted(seqs)
+
+
+def batched_run(overflow_policy):
+    async def scenario():
+        manager = ConnectionManager()
+        ws = FakeWebSocket()
+        await manager.connect(
+            ws, subject="s", metadata={}, overflow_policy=overflow_policy, batch_window_ms=50, batch_max=4
+        )
+        for n in range(3):
+            await manager.publish("run:1", {"type": "pane.output", "topic": "run:1", "n": n}, coalesce=False)
+            await manager.publish("run:1", {"type": "pane.status", "topic": "run:1", "n": n})
+        await asyncio.sleep(0.15)
+        return manager, ws
+
+    return asyncio.run(scenario())
+
+
+def test_batching_sends_array_frames_and_coalesces_per_tick():
+    manager, ws = batched_run("coalesce")
+
+    assert all(isinstance(frame, list) for frame in ws.sent)
+    # Six messages, batch_max=4: the first tick drops the superseded status 0.
+    messages = [[(msg["type"], msg["n"]) for msg in frame] for frame in ws.sent]
+    assert messages == [
+        [("pane.output", 0), ("pane.output", 1), ("pane.status", 1)],
+        [("pane.output", 2), ("pane.status", 2)],
+    ]
+    assert manager.stats()["coalesced"] == 1
+    assert manager.stats()["sent"] == 5
+
+
+def test_batching_keeps_every_message_without_the_coalesce_policy():
+    manager, ws = batched_run("drop_oldest")
+
+    messages = [(msg["type"], msg["n"]) for frame in ws.sent for msg in frame]
+    assert messages == [(kind, n) for n in range(3) for kind in ("pane.output", "pane.status")]
+    assert manager.stats()["coalesced"] == 0
+
+
+def test_batch_window_is_validated():
+    async def scenario():
+        manager = ConnectionManager()
+        for kwargs in ({"batch_window_ms": -1}, {"batch_window_ms": 5000}, {"batch_max": 0}):
+            try:
+                await manager.connect(FakeWebSocket(), subject="s", metadata={}, **kwargs)
+            except ValueError:
+                continue
+            raise AssertionError(f"accepted {kwargs}")
+
+    asyncio.run(scenario())
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_quiet_connections_stay_and_stalled_sends_are_reaped():
+    async def scenario():
+        clock = FakeClock()
+        manager = ConnectionManager(stall_timeout=30, clock=clock)
+        quiet, stalled = FakeWebSocket(), FakeWebSocket(stalled=True)
+        await manager.connect(quiet, subject="a", metadata={})
+        await manager.connect(stalled, subject="b", metadata={})
+
+        # Nobody has sent anything for an hour: passive observers are left alone.
+        clock.now = 3600
+        assert manager.reap() == 0
+        await manager.broadcast({"type": "tick"})
+        await settle()
+
+        clock.now = 3629
+        assert manager.reap() == 0
+        clock.now = 3630
+        assert manager.reap() == 1
+        await settle()
+        await manager.broadcast({"type": "tock"})
+        await settle()
+        stats = manager.stats()
+        await manager.close()
+        return stats, quiet, stalled
+
+    stats, quiet, stalled = asyncio.run(scenario())
+
+    assert quiet.sent == [{"type": "tick"}, {"type": "tock"}]
+    assert quiet.closed_with is None
+    assert stalled.closed_with == 1001
+    assert stats["connections"] == 1
+    assert stats["stalled_evictions"] == 1
+
+
+def test_connection_churn_leaves_no_state_behind():
+    async def scenario():
+        clock = FakeClock()
+        manager = ConnectionManager(stall_timeout=10, clock=clock)
+        live = FakeWebSocket()
+        await manager.connect(live, subject="live", metadata={}, topics=["run:live"])
+        baseline = manager.stats()
+
+        tracemalloc.start()
+        peaks = []
+        for round_ in range(5):
+            abandoned = [FakeWebSocket(stalled=True) for _ in range(100)]
+            for index, ws in enumerate(abandoned):
+                await manager.connect(ws, subject=f"gone-{index}", metadata={}, topics=[f"run:{round_}-{index}"])
+            await manager.broadcast({"type": "ping", "round": round_})
+            await settle()
+            clock.now += 11
+            assert manager.reap() == 100
+            await settle()
+            gc.collect()
+            peaks.append(tracemalloc.get_traced_memory()[0])
+        tracemalloc.stop()
+
+        stats = manager.stats()
+        await manager.broadcast({"type": "note"})
+        await settle()
+        await manager.close()
+        return live, stats, baseline, peaks
+
+    live, stats, baseline, peaks = asyncio.run(scenario())
+
+    assert live.sent[-1] == {"type": "note"}
+    assert stats["connections"] == 1
+    assert stats["stalled_evictions"] == 500
+    for key in ("topics", "rate_limit_subjects"):
+        assert stats[key] == baseline[key] == 1
+    # Memory after each round stays flat once the first round has warmed up.
+    assert max(peaks[1:]) - peaks[1] < 64 * 1024
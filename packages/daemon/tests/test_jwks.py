@@ -0,0 +1,167 @@
+import asyncio
+import threading
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException
+from jwt import encode
+
+from orchestra_daemon import auth
+from orchestra_daemon.jwks import JWKSCache, UnknownKeyError
+
+
+CLAIMS = {"sub": "user-1", "aud": "test-audience", "iss": "https://example.com/"}
+
+
+def new_key_pair():
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_pem = private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption(),
+    )
+    public_pem = private_key.public_key().public_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo,
+    )
+    return private_pem, public_pem
+
+
+def test_verify_jwt_async_success(auth_setup, local_jwks):
+    token = auth_setup(CLAIMS)
+
+    claims = asyncio.run(auth.verify_jwt_async(token))
+
+    assert claims["sub"] == "user-1"
+    assert local_jwks.calls == 1
+
+
+def test_signature_check_runs_off_the_event_loop(auth_setup, monkeypatch):
+    token = auth_setup(CLAIMS)
+    threads = []
+    original = auth.decode
+
+    def recording_decode(*args, **kwargs):
+        threads.append(threading.current_thread().name)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(auth, "decode", recording_decode)
+
+    async def scenario():
+        return await asyncio.gather(*(auth.verify_jwt_async(token) for _ in range(8)))
+
+    results = asyncio.run(scenario())
+
+    assert len(results) == 8
+    assert threads and all(name.startswith("jwt-verify") for name in threads)
+
+
+def test_kid_miss_refetches_rotated_keys(auth_setup, local_jwks):
+    private_pem, public_pem = new_key_pair()
+    auth_setup(CLAIMS)
+
+    async def scenario():
+        cache = auth._get_jwks_cache()
+        await cache.refresh()
+        generation = cache.generation
+        local_jwks.add_key("rotated", public_pem)
+        token = encode(CLAIMS, private_pem, algorithm="RS256", headers={"kid": "rotated"})
+        cache._min_refetch_interval = 0
+        claims = await auth.verify_jwt_async(token)
+        return claims, cache.generation > generation
+
+    claims, rotated = asyncio.run(scenario())
+
+    assert claims["sub"] == "user-1"
+    assert rotated
+
+
+def test_unknown_kid_is_negatively_cached(local_jwks):
+    cache = JWKSCache("https://example.com/jwks", fetch=local_jwks, min_refetch_interval=0, refresh_interval=0)
+
+    async def scenario():
+        for _ in range(5):
+            with pytest.raises(UnknownKeyError):
+                await cache.get_key("missing")
+
+    asyncio.run(scenario())
+
+    assert local_jwks.calls == 1
+
+
+def test_negative_cache_is_bounded_and_drops_expired_kids(local_jwks):
+    bounded = JWKSCache("https://example.com/jwks", fetch=local_jwks, refresh_interval=0, max_negative=3)
+    expiring = JWKSCache("https://example.com/jwks", fetch=local_jwks, refresh_interval=0, negative_ttl=0)
+
+    async def scenario():
+        for cache in (bounded, expiring):
+            for number in range(10):
+                with pytest.raises(UnknownKeyError):
+                    await cache.get_key(f"random-{number}")
+
+    asyncio.run(scenario())
+
+    assert list(bounded._negative) == ["random-7", "random-8", "random-9"]
+    assert list(expiring._negative) == ["random-9"]
+
+
+def test_jwks_unavailable_maps_to_503(auth_setup, local_jwks):
+    token = auth_setup(CLAIMS)
+    local_jwks.fail = True
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(auth.verify_jwt_async(token))
+
+    assert excinfo.value.status_code == 503
+
+
+def test_unknown_kid_maps_to_401(auth_setup):
+    private_pem, _ = new_key_pair()
+    auth_setup(CLAIMS)
+    token = encode(CLAIMS, private_pem, algorithm="RS256", headers={"kid": "nobody"})
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(auth.verify_jwt_async(token))
+
+    assert excinfo.value.status_code == 401
+
+
+def test_background_refresh_keeps_keys_current(local_jwks):
+    _, public_pem = new_key_pair()
+    cache = JWKSCache("https://example.com/jwks", fetch=local_jwks, refresh_interval=0.01)
+
+    async def scenario():
+        await cache.get_key("test-key")
+        local_jwks.add_key("background", public_pem)
+        for _ in range(100):
+            if "background" in cache._keys:
+                break
+            await asyncio.sleep(0.01)
+        cache.stop()
+        return "background" in cache._keys
+
+    assert asyncio.run(scenario())
+    assert local_jwks.calls >= 2
+
+
+def test_settings_reload_tears_down_on_the_event_loop(monkeypatch, local_jwks):
+    monkeypatch.setenv("AUTH0_DOMAIN", "example.com")
+    monkeypatch.setenv("AUTH0_AUDIENCE", "test-audience")
+
+    async def scenario():
+        cache = auth._get_jwks_cache()
+        cache._fetch = local_jwks
+        await cache.get_key("test-key")
+        task = cache._task
+        # The watcher thread runs while the loop is busy; nothing may be torn down yet.
+        watcher = threading.Thread(target=auth._on_settings_reload, args=(auth._get_settings(),))
+        watcher.start()
+        watcher.join()
+        assert auth._get_jwks_cache.cache_info().currsize == 1 and not task.cancelling()
+        await asyncio.sleep(0)
+        assert auth._get_jwks_cache.cache_info().currsize == 0
+        await asyncio.sleep(0)
+        return task
+
+    assert asyncio.run(scenario()).cancelled()
@@ -0,0 +1,30 @@
+import json
+
+from orchestra_daemon.loadtest import LoadTestConfig, main, run_load_test
+
+
+def test_in_process_run_reports_deliveries_and_latency():
+    config = LoadTestConfig(observers=5, publishers=2, rate=20, duration=0.5, rate_limit=False, drain_seconds=1.0)
+
+    report = run_load_test(config)
+
+    assert report["accepted"] == report["published"] > 0
+    assert report["delivered"] == report["expected_deliveries"] == report["accepted"] * 5
+    assert report["lost"] == 0
+    assert report["latency_ms"]["count"] == report["delivered"]
+    assert report["latency_ms"]["p50"] <= report["latency_ms"]["p99"]
+    assert report["daemon"]["metrics"]["orchestra_publish_total"] == report["accepted"]
+    assert report["daemon"]["rss_bytes_peak"] > 0
+
+
+def test_cli_writes_json_report_and_counts_rate_limits(tmp_path):
+    output = tmp_path / "report.json"
+
+    main(["--observers", "2", "--rate", "40", "--duration", "1", "--drain-seconds", "0.5", "--output", str(output)])
+
+    report = json.loads(output.read_text())
+    assert report["config"]["rate_limit"] is True
+    # 40/s against a burst of 10 on one connection: hard mode rejects and closes.
+    assert report["rate_limited"] >= 1
+    assert report["publisher_reconnects"] >= 1
+    assert report["delivered"] == report["accepted"] * 2
@@ -0,0 +1,72 @@
+import pytest
+
+from orchestra_daemon import metrics
+from orchestra_daemon.metrics import Registry, Sample
+
+
+def _value(text: str, series: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(series + " "):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{series} not in exposition")
+
+
+def test_histogram_buckets_are_cumulative_and_inclusive():
+    registry = Registry()
+    histogram = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+
+    text = registry.render()
+
+    assert "# TYPE latency_seconds histogram" in text
+    assert _value(text, 'latency_seconds_bucket{le="0.1"}') == 2
+    assert _value(text, 'latency_seconds_bucket{le="1"}') == 3
+    assert _value(text, 'latency_seconds_bucket{le="+Inf"}') == 4
+    assert _value(text, "latency_seconds_count") == 4
+    assert _value(text, "latency_seconds_sum") == pytest.approx(3.65)
+
+
+def test_labelled_counters_and_scrape_samples_render():
+    registry = Registry()
+    counter = registry.counter("requests_total", "Requests.", ("code",))
+    counter.labels("200").inc()
+    counter.labels("200").inc(2)
+    counter.labels('a"b').inc()
+    with pytest.raises(ValueError):
+        counter.labels()
+    with pytest.raises(ValueError):
+        registry.counter("requests_total", "Again.")
+
+    text = registry.render([Sample("open", "gauge", "Open things.", 7), Sample("open", "gauge", "", 1, {"k": "v"})])
+
+    assert _value(text, 'requests_total{code="200"}') == 3
+    assert _value(text, 'requests_total{code="a\\"b"}') == 1
+    assert text.count("# TYPE open gauge") == 1
+    assert _value(text, "open") == 7
+    assert _value(text, 'open{k="v"}') == 1
+
+
+def test_metrics_endpoint_reports_handshakes_and_publishes(client, auth_setup):
+    before = metrics.REGISTRY.render()
+    token = auth_setup({"sub": "user-7", "aud": "test-audience", "iss": "https://example.com/"})
+    with client.websocket_connect(f"/ws/observe?token={token}") as websocket:
+        websocket.send_json({"type": "ping", "payload": {}})
+        websocket.receive_json()
+        websocket.receive_json()
+        response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    for series, grew_by in (
+        ("orchestra_ws_connections_total", 1),
+        ("orchestra_ws_handshake_seconds_count", 1),
+        ('orchestra_jwt_verify_seconds_count{result="ok"}', 1),
+        ("orchestra_ws_messages_received_total", 1),
+        ("orchestra_publish_total", 1),
+    ):
+        previous = _value(before, series) if series + " " in before else 0
+        assert _value(text, series) == previous + grew_by
+    assert _value(text, "orchestra_ws_connections") == 1
+    assert _value(text, 'orchestra_rate_limited_total{scope="connection"}') == 0
@@ -0,0 +1,145 @@
+import asyncio
+import queue
+import threading
+
+from orchestra.run_history import RunHistory
+
+from orchestra_daemon.pane_bridge import PaneBridge
+from orchestra_daemon.websocket import ConnectionManager
+
+from .test_connection_manager import FakeWebSocket
+
+
+class FakeTmux:
+    """Feeds pane lines from a queue; ``None`` ends the session."""
+
+    def __init__(self, sessions):
+        self.sessions = sessions
+        self.lines = queue.Queue()
+        self.readers = 0
+        self.stopped = threading.Event()
+
+    def list_sessions(self):
+        return list(self.sessions)
+
+    def iter_pane_lines(self, session_name, *, poll_interval=0.5, stop=None):
+        self.readers += 1
+        while not stop.is_set():
+            try:
+                line = self.lines.get(timeout=0.01)
+            except queue.Empty:
+                continue
+            if line is None:
+                return
+            yield line
+        self.stopped.set()
+
+
+async def wait_for(predicate, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "condition not met in time"
+        await asyncio.sleep(0.01)
+
+
+def test_one_reader_serves_every_subscriber():
+    tmux = FakeTmux(["run-abc-primary-claude", "run-abc-secondary-codex", "scratch"])
+
+    async def scenario():
+        manager = ConnectionManager()
+        bridge = PaneBridge(manager, tmux_factory=lambda: tmux, status_interval=0)
+        bridge.attach()
+        observers = [FakeWebSocket() for _ in range(3)]
+        for ws in observers:
+            await manager.connect(ws, subject="s", metadata={}, topics=["run:abc"])
+        await wait_for(lambda: bridge.active_runs == ["abc"])
+
+        tmux.lines.put("working")
+        tmux.lines.put("✅ completed")
+        await wait_for(lambda: all(
+            any(msg["type"] == "pane.status" and msg["payload"]["status"] == "completed" for msg in ws.sent)
+            for ws in observers
+        ))
+
+        for ws in observers:
+            manager.disconnect(ws)
+        await asyncio.to_thread(tmux.stopped.wait, 2.0)
+        await wait_for(lambda: not bridge.active_runs)
+        bridge.close()
+        return observers
+
+    observers = asyncio.run(scenario())
+
+    assert tmux.readers == 1
+    assert tmux.stopped.is_set()
+    lines = [line for msg in observers[0].sent if msg["type"] == "pane.output" for line in msg["payload"]["lines"]]
+    assert lines == ["working", "✅ completed"]
+    assert observers[0].sent[0]["payload"]["session"] == "run-abc-secondary-codex"
+
+
+def test_session_end_publishes_final_status():
+    tmux = FakeTmux(["run-xyz-secondary-claude"])
+
+    async def scenario():
+        manager = ConnectionManager()
+        bridge = PaneBridge(manager, tmux_factory=lambda: tmux)
+        bridge.attach()
+        ws = FakeWebSocket()
+        await manager.connect(ws, subject="s", metadata={}, topics=["run:xyz"])
+        missing = FakeWebSocket()
+        await manager.connect(missing, subject="m", metadata={}, topics=["run:nope"])
+
+        tmux.lines.put("Error: boom")
+        tmux.lines.put(None)
+        await wait_for(lambda: any(msg["payload"].get("state") == "ended" for msg in ws.sent))
+        await wait_for(lambda: missing.sent)
+        await wait_for(lambda: not bridge.active_runs)
+        bridge.close()
+        return ws, missing
+
+    ws, missing = asyncio.run(scenario())
+
+    final = ws.sent[-1]["payload"]
+    assert final["state"] == "ended"
+    assert final["status"] == "failed"
+    assert missing.sent[0]["payload"]["state"] == "not_found"
+
+
+def test_reader_waits_for_a_queued_runs_session(tmp_path):
+    tmux = FakeTmux([])
+    history = RunHistory(tmp_path / "runs.json")
+    for run_id in ("queued", "done"):
+        history.start_run(
+            run_id,
+            task="t",
+            primary="claude",
+            secondary="codex",
+            primary_session=f"run-{run_id}-primary-claude",
+            secondary_session=f"run-{run_id}-secondary-codex",
+            cleanup=True,
+            follow_mode=False,
+        )
+    history.complete_run("done", status="completed")
+
+    async def scenario():
+        manager = ConnectionManager()
+        bridge = PaneBridge(manager, tmux_factory=lambda: tmux, history_factory=lambda: history, poll_interval=0.01)
+        bridge.attach()
+        ws = FakeWebSocket()
+        await manager.connect(ws, subject="s", metadata={}, topics=["run:queued", "run:done"])
+        await wait_for(lambda: any(msg["payload"].get("state") == "waiting" for msg in ws.sent))
+        await wait_for(lambda: bridge.active_runs == ["queued"])
+
+        tmux.sessions.append("run-queued-secondary-codex")
+        tmux.lines.put("working")
+        tmux.lines.put(None)
+        await wait_for(lambda: any(msg["payload"].get("state") == "ended" for msg in ws.sent))
+        bridge.close()
+        return ws.sent
+
+    sent = asyncio.run(scenario())
+
+    states = {(msg["topic"], msg["payload"].get("state")) for msg in sent if msg["type"] == "pane.status"}
+    assert {("run:done", "not_found"), ("run:queued", "waiting"), ("run:queued", "ended")} <= states
+    lines = [line for msg in sent if msg["type"] == "pane.output" for line in msg["payload"]["lines"]]
+    assert lines == ["working"]
@@ -0,0 +1,94 @@
+import asyncio
+
+from orchestra_daemon.ratelimit import Limit, RateLimiter
+from orchestra_daemon.websocket import ConnectionManager, RateLimitError
+
+from .test_connection_manager import FakeWebSocket
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_connection_bucket_refills_over_time():
+    clock = FakeClock()
+    limiter = RateLimiter(per_connection=Limit(10, 10), clock=clock)
+    limiter.attach("a", "user")
+
+    assert all(limiter.acquire("a", "user").allowed for _ in range(10))
+    rejected = limiter.acquire("a", "user")
+    assert not rejected.allowed and rejected.scope == "connection"
+
+    clock.now += 0.25
+    assert [limiter.acquire("a", "user").allowed for _ in range(3)] == [True, True, False]
+    stats = limiter.stats()
+    assert stats["rate_limit_allowed"] == 12
+    assert stats["rate_limit_rejected_connection"] == 2
+
+
+def test_subject_budget_is_shared_between_tabs():
+    clock = FakeClock()
+    limiter = RateLimiter(per_connection=Limit(10, 10), per_subject=Limit(12, 12), clock=clock)
+    limiter.attach("tab-1", "user")
+    limiter.attach("tab-2", "user")
+    limiter.attach("other", "someone-else")
+
+    allowed = sum(limiter.acquire(tab, "user").allowed for tab in ["tab-1", "tab-2"] * 10)
+    assert allowed == 12
+    assert limiter.acquire("other", "someone-else").allowed
+    assert limiter.stats()["rate_limit_rejected_subject"] == 8
+
+    limiter.detach("tab-1", "user")
+    limiter.detach("tab-2", "user")
+    assert limiter.stats()["rate_limit_subjects"] == 1
+
+
+def test_global_budget_protects_the_broadcast_path():
+    limiter = RateLimiter(global_limit=Limit(5, 5), clock=FakeClock())
+    for index in range(10):
+        limiter.attach(index, f"user-{index}")
+
+    results = [limiter.acquire(index, f"user-{index}") for index in range(10)]
+    assert sum(result.allowed for result in results) == 5
+    assert {result.scope for result in results if not result.allowed} == {"global"}
+
+
+def test_soft_mode_delays_instead_of_rejecting():
+    clock = FakeClock()
+    limiter = RateLimiter(per_connection=Limit(10, 2), mode="soft", max_delay=0.25, clock=clock)
+    limiter.attach("a", "user")
+
+    decisions = [limiter.acquire("a", "user") for _ in range(5)]
+    assert [decision.allowed for decision in decisions] == [True, True, True, True, False]
+    assert [round(decision.delay, 3) for decision in decisions[:4]] == [0, 0, 0.1, 0.2]
+    assert limiter.stats()["rate_limit_throttled"] == 2
+
+
+def test_manager_throttles_softly_and_rejects_hard():
+    async def scenario():
+        soft = ConnectionManager(
+            rate_limiter=RateLimiter(per_connection=Limit(100, 1), mode="soft", max_delay=1.0)
+        )
+        connection = await soft.connect(FakeWebSocket(), subject="s", metadata={})
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        for _ in range(3):
+            await soft.handle_incoming(connection, {"type": "note"})
+        assert loop.time() - start >= 0.015
+
+        hard = ConnectionManager(max_messages_per_second=1)
+        connection = await hard.connect(FakeWebSocket(), subject="s", metadata={})
+        await hard.handle_incoming(connection, {"type": "note"})
+        try:
+            await hard.handle_incoming(connection, {"type": "note"})
+        except RateLimitError as exc:
+            assert str(exc) == "connection"
+        else:
+            raise AssertionError("expected RateLimitError")
+        assert hard.stats()["rate_limit_rejected_connection"] == 1
+
+    asyncio.run(scenario())
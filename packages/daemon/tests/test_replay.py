@@ -0,0 +1,64 @@
+from orchestra_daemon.replay import ReplayBuffer
+
+
+def fill(buffer, topic, count, size=10):
+    for _ in range(count):
+        buffer.append(topic, buffer.seq + 1, "x" * size)
+
+
+def test_since_merges_matching_topics_in_sequence_order():
+    buffer = ReplayBuffer()
+    for topic in ["run:1", "run:2", "agent:a", "run:1"]:
+        seq = buffer.seq + 1
+        buffer.append(topic, seq, f"{topic}#{seq}")
+
+    frames, truncated = buffer.since(0, ["run:*"])
+    assert [seq for seq, _ in frames] == [1, 2, 4]
+    assert not truncated
+    frames, _ = buffer.since(2, ["run:1", "agent:a"])
+    assert [frame for _, frame in frames] == ["agent:a#3", "run:1#4"]
+
+
+def test_limits_by_count_and_bytes_flag_truncation():
+    buffer = ReplayBuffer(max_events=5, max_bytes=35)
+    fill(buffer, "run:1", 8)
+
+    frames, truncated = buffer.since(0, ["run:1"])
+    assert [seq for seq, _ in frames] == [6, 7, 8]  # 3 x 10 bytes fit under 35
+    assert truncated
+    assert buffer.since(5, ["run:1"]) == (frames, False)
+
+    buffer.configure(max_events=2, max_bytes=1000, max_topics=1024)
+    assert [seq for seq, _ in buffer.since(0, ["*"])[0]] == [7, 8]
+
+
+def test_topic_limit_evicts_least_recent_topic():
+    buffer = ReplayBuffer(max_topics=2)
+    fill(buffer, "run:1", 1)
+    fill(buffer, "run:2", 1)
+    fill(buffer, "run:3", 1)
+
+    frames, truncated = buffer.since(0, ["*"])
+    assert [seq for seq, _ in frames] == [2, 3]
+    assert truncated
+    assert buffer.stats()["topics"] == 2
+
+
+def test_disabled_buffer_still_numbers_events():
+    buffer = ReplayBuffer(max_events=0)
+    fill(buffer, "run:1", 3)
+    assert buffer.seq == 3
+    assert buffer.since(0, ["*"]) == ([], False)
+    assert buffer.stats()["events"] == buffer.stats()["bytes"] == 0
+
+
+def test_byte_limit_counts_encoded_bytes_and_totals_track_evictions():
+    buffer = ReplayBuffer(max_events=10, max_bytes=40, max_topics=1)
+    for _ in range(3):
+        buffer.append("run:1", buffer.seq + 1, "✅" * 5)  # 5 characters, 15 bytes
+
+    assert [seq for seq, _ in buffer.since(0, ["*"])[0]] == [2, 3]
+    assert (buffer.stats()["events"], buffer.stats()["bytes"]) == (2, 30)
+
+    fill(buffer, "run:2", 1)  # evicts the whole run:1 log
+    assert (buffer.stats()["events"], buffer.stats()["bytes"]) == (1, 10)
@@ -0,0 +1,282 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from orchestra.config import OrchestraConfig, ToolConfig
+from orchestra.delegation import DelegationError, DelegationRequest, submit_to_daemon
+from orchestra.run_history import RunHistory
+from orchestra.search_index import SearchIndex
+from orchestra.tmux_manager import PaneCapture
+from orchestra.transcripts import TranscriptStore
+
+from orchestra_daemon import api
+from orchestra_daemon.supervisor import RunSupervisor, SupervisedRun
+from orchestra_daemon.websocket import ConnectionManager
+
+from .test_connection_manager import FakeWebSocket
+from .test_pane_bridge import wait_for
+
+
+class SpawnTmux:
+    def __init__(self, lines=("✅ completed",)):
+        self.lines = list(lines)
+        self.sessions = []
+        self.killed = []
+
+    def list_sessions(self):
+        return list(self.sessions)
+
+    def spawn_session(self, name, command=None, *, kill_existing=False):
+        self.sessions.append(name)
+
+    def kill_session(self, name):
+        self.killed.append(name)
+
+    def capture_pane(self, name, *, pane="0", scrollback=None):
+        return PaneCapture(session=name, pane=pane, lines=list(self.lines), dead=False)
+
+
+def make_config(tmp_path):
+    wrapper = tmp_path / "wrapper.sh"
+    return OrchestraConfig(
+        tools={
+            "claude": ToolConfig("claude", wrapper),
+            "codex": ToolConfig("codex", wrapper, capacity=4),
+        },
+        routing={},
+        default_tool="codex",
+    )
+
+
+def make_supervisor(tmp_path, tmux, **kwargs):
+    manager = ConnectionManager()
+    supervisor = RunSupervisor(
+        manager,
+        tmux_factory=lambda: tmux,
+        config_loader=lambda: make_config(tmp_path),
+        history_factory=lambda: RunHistory(tmp_path / "runs.json"),
+        transcript_factory=lambda: TranscriptStore(tmp_path / "transcripts"),
+        search_factory=lambda: SearchIndex(tmp_path / "search.db"),
+        **kwargs,
+    )
+    return manager, supervisor
+
+
+def test_run_completes_records_history_and_publishes(tmp_path):
+    tmux = SpawnTmux()
+
+    async def scenario():
+        manager, supervisor = make_supervisor(tmp_path, tmux)
+        await supervisor.start()
+        observer = FakeWebSocket()
+        await manager.connect(observer, subject="s", metadata={}, topics=["run:*"])
+        run = await supervisor.submit(DelegationRequest(task="Write docs", wait=0, cleanup=True))
+        events = [event async for event in run.follow()]
+        await wait_for(lambda: any(msg["type"] == "delegation.completed" for msg in observer.sent))
+        await supervisor.close()
+        return run, events, observer.sent
+
+    run, events, published = asyncio.run(scenario())
+    assert [event["type"] for event in events] == [
+        "routed",
+        "queued",
+        "started",
+        "spawning",
+        "spawning",
+        "transcript",
+        "summary",
+        "completed",
+    ]
+    assert events[-1] == {"type": "completed", "run_id": run.run_id, "status": "completed"}
+    assert {msg["type"] for msg in published} >= {"delegation.routed", "delegation.started", "delegation.summary"}
+    assert len(tmux.killed) == 2
+    assert RunHistory(tmp_path / "runs.json").get_run(run.run_id)["status"] == "completed"
+    assert [hit.run_id for hit in SearchIndex(tmp_path / "search.db").search("docs")] == [run.run_id]
+
+
+def test_runs_beyond_capacity_queue_and_close_finishes_every_run(tmp_path):
+    tmux = SpawnTmux(lines=["still working"])
+
+    async def scenario():
+        _, supervisor = make_supervisor(tmp_path, tmux, max_runs=1)
+        await supervisor.start()
+        first = await supervisor.submit(DelegationRequest(task="long", secondary="codex", wait=30))
+        second = await supervisor.submit(DelegationRequest(task="next", secondary="codex", wait=30))
+        await wait_for(lambda: first.status == "running")
+        await supervisor.close(timeout=2)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert second.events[0] == {"type": "queued", "run_id": second.run_id, "position": 1}
+    assert first.events[-1]["status"] == "interrupted"
+    assert second.events[-1]["status"] == "cancelled"
+    history = RunHistory(tmp_path / "runs.json")
+    assert history.get_run(first.run_id)["status"] == "interrupted"
+    assert history.get_run(second.run_id)["status"] == "cancelled"
+
+
+def test_a_burst_of_submissions_never_exceeds_capacity(tmp_path):
+    tmux = SpawnTmux(lines=["still working"])
+
+    async def scenario():
+        _, supervisor = make_supervisor(tmp_path, tmux, max_runs=1)
+        await supervisor.start()
+        outcomes = await asyncio.gather(
+            *(supervisor.submit(DelegationRequest(task=f"t{n}", secondary="codex", wait=30)) for n in range(6)),
+            return_exceptions=True,
+        )
+        await supervisor.close(timeout=2)
+        return outcomes
+
+    outcomes = asyncio.run(scenario())
+    rejected = [outcome for outcome in outcomes if isinstance(outcome, DelegationError)]
+    assert len(rejected) == 2 and all("at capacity (4/4)" in str(exc) for exc in rejected)
+
+
+def test_socket_clients_stream_or_detach(tmp_path):
+    socket_path = tmp_path / "daemon.sock"
+
+    async def scenario():
+        _, supervisor = make_supervisor(tmp_path, SpawnTmux())
+        await supervisor.start(str(socket_path))
+        assert socket_path.stat().st_mode & 0o777 == 0o600
+        streamed = []
+        run_id = await asyncio.to_thread(
+            submit_to_daemon,
+            DelegationRequest(task="Fix bug", secondary="codex", wait=0),
+            socket_path=socket_path,
+            on_event=streamed.append,
+        )
+        detached = await asyncio.to_thread(
+            submit_to_daemon,
+            DelegationRequest(task="Fix bug", secondary="codex", wait=0),
+            socket_path=socket_path,
+            detach=True,
+        )
+        with pytest.raises(DelegationError, match="Unknown tool"):
+            await asyncio.to_thread(
+                submit_to_daemon, DelegationRequest(task="x", secondary="nope"), socket_path=socket_path
+            )
+        await wait_for(lambda: supervisor.get(detached).done)
+        await supervisor.close()
+        return run_id, streamed
+
+    run_id, streamed = asyncio.run(scenario())
+    assert streamed[-1]["run_id"] == run_id and streamed[-1]["type"] == "completed"
+    assert not Path(socket_path).exists()
+
+
+def test_invalid_config_is_a_submission_error(tmp_path):
+    def broken_config():
+        raise ValueError("Unknown routing_mode 'bogus'")
+
+    async def scenario():
+        _, supervisor = make_supervisor(tmp_path, SpawnTmux())
+        supervisor._config_loader = broken_config
+        await supervisor.start()
+        try:
+            # A DelegationError is what POST /api/runs turns into a 400.
+            with pytest.raises(DelegationError, match="Invalid configuration: Unknown routing_mode"):
+                await supervisor.submit(DelegationRequest(task="x"))
+        finally:
+            await supervisor.close()
+
+    asyncio.run(scenario())
+
+
+def test_submit_route_needs_the_supervisor(client, auth_setup, tmp_path):
+    claims = {"sub": "dash", "aud": "test-audience", "iss": "https://example.com/"}
+    observer = auth_setup(claims)
+    response = client.post("/api/runs", json={"task": "x"}, headers={"Authorization": f"Bearer {observer}"})
+    assert response.status_code == 403
+    assert response.json()["detail"] == "insufficient_scope"
+
+    token = auth_setup({**claims, "permissions": ["runs:submit"]})
+    client.headers["Authorization"] = f"Bearer {token}"
+    assert client.post("/api/runs", json={"task": "x"}).status_code == 503
+
+    _, supervisor = make_supervisor(tmp_path, SpawnTmux())
+    client.app.dependency_overrides[api.get_supervisor] = lambda: supervisor
+    try:
+        response = client.post("/api/runs", json={"task": "x", "colour": "red"})
+        assert response.status_code == 400
+        assert "colour" in response.json()["detail"]
+        assert client.get("/api/runs/missing/events").status_code == 404
+    finally:
+        client.app.dependency_overrides.clear()
+
+
+def test_profiled_runs_trace_planning_queueing_and_execution(tmp_path, monkeypatch):
+    monkeypatch.setenv("ORCHESTRA_STATE_DIR", str(tmp_path))
+
+    async def scenario():
+        _, supervisor = make_supervisor(tmp_path, SpawnTmux())
+        await supervisor.start()
+        run = await supervisor.submit(DelegationRequest(task="Fix bug", secondary="codex", wait=0, profile=True))
+        events = [event async for event in run.follow()]
+        await supervisor.close()
+        return run, events
+
+    run, events = asyncio.run(scenario())
+    assert [event["type"] for event in events][-2:] == ["trace", "completed"]
+    spans = RunHistory(tmp_path / "runs.json").get_run(run.run_id)["trace"]["spans"]
+    assert {"delegate.plan", "supervisor.queue_wait", "delegate.spawn", "summary.summarise"} <= set(spans)
+    assert (tmp_path / "traces" / f"{run.run_id}.json").exists()
+
+
+def test_daemon_supervisor_plans_against_the_watched_config(tmp_path, monkeypatch):
+    from orchestra import config as config_module
+    from orchestra_daemon import app as app_module
+    from orchestra_daemon.config import Settings
+
+    monkeypatch.setenv("ORCHESTRA_STATE_DIR", str(tmp_path / "state"))
+    (tmp_path / "codex.sh").write_text("#!/bin/sh\n")
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text("tools:\n  codex:\n    wrapper: ./codex.sh\nrouting:\n  default: codex\n")
+    monkeypatch.setattr(config_module, "DEFAULT_CONFIG_PATH", config_path)
+
+    async def scenario():
+        settings = Settings(
+            auth0_domain="example.com",
+            auth0_audience="test-audience",
+            auth0_issuer="https://example.com/",
+            supervisor_enabled=True,
+            supervisor_socket=str(tmp_path / "daemon.sock"),
+        )
+        await app_module._start_supervisor(settings)
+        try:
+            loader = app_module.supervisor._config_loader
+            first = loader()
+            assert loader() is first
+            config_path.write_text(config_path.read_text() + "routing_mode: adaptive\n")
+            assert app_module.config_watcher.check().ok
+            assert loader().routing_mode == "adaptive"
+        finally:
+            await app_module.shutdown_event()
+        assert app_module.config_watcher is None
+
+    asyncio.run(scenario())
+
+
+def test_output_reaches_live_followers_but_is_not_retained():
+    async def scenario():
+        run = SupervisedRun(DelegationRequest(task="stream"))
+        run.append({"type": "started", "run_id": "r1"})
+        live = asyncio.create_task(_collect(run.follow()))
+        await asyncio.sleep(0)
+        for n in range(3):
+            run.append({"type": "output", "line": f"line {n}"})
+        run.append({"type": "completed", "run_id": "r1", "status": "completed"})
+        late = await _collect(run.follow(1))
+        return run, await live, late
+
+    run, live, late = asyncio.run(scenario())
+    assert [event["type"] for event in live] == ["started", "output", "output", "output", "completed"]
+    assert [event["type"] for event in run.events] == ["started", "completed"]
+    assert late == [{"type": "completed", "run_id": "r1", "status": "completed"}]
+    assert run._followers == {}
+
+
+async def _collect(events):
+    return [event async for event in events]
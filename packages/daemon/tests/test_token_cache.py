@@ -0,0 +1,90 @@
+import asyncio
+import time
+
+from orchestra_daemon import auth
+from orchestra_daemon.token_cache import VerifiedTokenCache
+
+
+class FakeClock:
+    def __init__(self, now=1_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_at_token_exp_before_ttl():
+    clock = FakeClock()
+    cache = VerifiedTokenCache(ttl=300, clock=clock)
+    cache.put("token", {"sub": "a", "exp": clock.now + 10}, generation=1)
+
+    assert cache.get("token", 1) == {"sub": "a", "exp": clock.now + 10}
+    clock.now += 11
+    assert cache.get("token", 1) is None
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = VerifiedTokenCache(ttl=5, clock=clock)
+    cache.put("token", {"sub": "a"}, generation=1)
+
+    clock.now += 6
+    assert cache.get("token", 1) is None
+
+
+def test_key_rotation_invalidates_entries():
+    cache = VerifiedTokenCache()
+    cache.put("token", {"sub": "a"}, generation=1)
+
+    assert cache.get("token", 2) is None
+    assert cache.get("token", 1) is None
+
+
+def test_lru_eviction_and_stats():
+    cache = VerifiedTokenCache(max_entries=2)
+    for token in ("a", "b"):
+        cache.put(token, {"sub": token}, generation=1)
+    cache.get("a", 1)
+    cache.put("c", {"sub": "c"}, generation=1)
+
+    assert cache.get("b", 1) is None
+    assert cache.get("a", 1) is not None
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 2 and stats["misses"] == 1
+    assert stats["hit_rate"] == 2 / 3
+
+
+def test_reconnects_skip_signature_verification(auth_setup, monkeypatch):
+    token = auth_setup(
+        {"sub": "user-1", "aud": "test-audience", "iss": "https://example.com/", "exp": int(time.time()) + 60}
+    )
+    decodes = []
+    original = auth.decode
+    monkeypatch.setattr(auth, "decode", lambda *a, **kw: decodes.append(1) or original(*a, **kw))
+
+    async def reconnect_storm():
+        for _ in range(5):
+            await auth.verify_jwt_async(token)
+
+    asyncio.run(reconnect_storm())
+
+    assert len(decodes) == 1
+    stats = auth.verification_stats()
+    assert stats["hits"] == 4
+    assert stats["jwks_fetches"] == 1
+
+
+def test_rejected_tokens_are_not_cached(auth_setup):
+    auth_setup({"sub": "user-1", "aud": "test-audience", "iss": "https://example.com/"})
+
+    async def attempt():
+        for _ in range(2):
+            try:
+                await auth.verify_jwt_async("not-a-token")
+            except Exception:
+                pass
+
+    asyncio.run(attempt())
+
+    assert auth.verification_stats()["size"] == 0
@@ -0,0 +1,36 @@
+import pytest
+
+from orchestra_daemon.topics import InvalidTopicError, TopicIndex, validate_topic
+
+
+def test_match_combines_exact_and_wildcard_subscribers():
+    index = TopicIndex()
+    index.subscribe("a", "run:42")
+    index.subscribe("b", "run:*")
+    index.subscribe("c", "*")
+    index.subscribe("d", "agent:claude")
+
+    assert index.match("run:42") == {"a", "b", "c"}
+    assert index.match("run:7") == {"b", "c"}
+    assert index.match("agent:claude") == {"c", "d"}
+    assert index.match("runner") == {"c"}
+
+
+def test_remove_drops_every_subscription():
+    index = TopicIndex()
+    index.subscribe("a", "run:42")
+    index.subscribe("a", "event:*")
+    index.subscribe("b", "run:42")
+
+    assert sorted(index.remove("a")) == ["event:*", "run:42"]
+    assert index.match("run:42") == {"b"}
+    assert index.match("event:status") == set()
+    assert index.subscriber_count("run:42") == 1
+    assert index.unsubscribe("b", "run:42")
+    assert len(index) == 0
+
+
+@pytest.mark.parametrize("topic", ["", "run:", ":x", "run*", "*:run", "run:4*", None, "x" * 201])
+def test_validate_topic_rejects_malformed_topics(topic):
+    with pytest.raises(InvalidTopicError):
+        validate_topic(topic)
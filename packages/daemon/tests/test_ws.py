@@ -1,8 +1,13 @@
+import time
+
 import pytest
 from importlib import reload
 
 from starlette.websockets import WebSocketDisconnect
 
+from orchestra_daemon.config import Settings
+from orchestra_daemon.main import ws_ping_options
+
 
 def test_websocket_requires_token(client):
     with pytest.raises(WebSocketDisconnect):
@@ -56,3 +61,75 @@ def test_websocket_insecure_mode(monkeypatch):
         assert broadcast["from"] == "local-debug"
         ack = websocket.receive_json()
         assert ack == {"type": "ack", "echo": "ping"}
+
+
+def test_websocket_topic_subscriptions(client, auth_setup):
+    token = auth_setup({"sub": "user-3", "aud": "test-audience", "iss": "https://example.com/"})
+    with client.websocket_connect(f"/ws/observe?token={token}&topics=run:1") as websocket:
+        # Not subscribed to event:ping, so only the ack comes back.
+        websocket.send_json({"type": "ping", "payload": {}})
+        assert websocket.receive_json() == {"type": "ack", "echo": "ping"}
+
+        websocket.send_json({"type": "subscribe", "topics": ["event:*"]})
+        assert websocket.receive_json() == {"type": "ack", "echo": "subscribe", "topics": ["event:*", "run:1"]}
+
+        websocket.send_json({"type": "ping", "payload": {}})
+        assert websocket.receive_json()["topic"] == "event:ping"
+        assert websocket.receive_json()["type"] == "ack"
+
+        websocket.send_json({"type": "subscribe", "topics": "bad*"})
+        assert websocket.receive_json() == {"type": "error", "error": "invalid_topic"}
+
+
+def test_websocket_since_replays_missed_events(client, auth_setup):
+    token = auth_setup({"sub": "user-4", "aud": "test-audience", "iss": "https://example.com/"})
+    with client.websocket_connect(f"/ws/observe?token={token}&topics=event:note") as websocket:
+        for value in range(3):
+            websocket.send_json({"type": "note", "payload": {"value": value}})
+            published = websocket.receive_json()
+            websocket.receive_json()
+            if value == 0:
+                first_seq = published["seq"]
+
+    with client.websocket_connect(f"/ws/observe?token={token}&topics=event:note&since={first_seq}") as websocket:
+        replayed = [websocket.receive_json() for _ in range(2)]
+        marker = websocket.receive_json()
+    assert [msg["payload"]["value"] for msg in replayed] == [1, 2]
+    assert marker["type"] == "replay.complete" and marker["count"] == 2
+
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect(f"/ws/observe?token={token}&since=-1") as websocket:
+            websocket.receive_json()
+
+
+def test_websocket_batch_mode_sends_arrays(client, auth_setup):
+    token = auth_setup({"sub": "user-5", "aud": "test-audience", "iss": "https://example.com/"})
+    with client.websocket_connect(f"/ws/observe?token={token}&batch=20") as websocket:
+        websocket.send_json({"type": "ping", "payload": {}})
+        received = []
+        while len(received) < 2:
+            frame = websocket.receive_json()
+            assert isinstance(frame, list)
+            received.extend(frame)
+    assert [msg["type"] for msg in received] == ["ping", "ack"]
+
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect(f"/ws/observe?token={token}&batch=abc") as websocket:
+            websocket.receive_json()
+
+
+def test_websocket_quiet_observer_outlives_the_read_timeout(client, auth_setup, monkeypatch):
+    monkeypatch.setenv("DAEMON_READ_TIMEOUT_SECONDS", "1")
+    token = auth_setup({"sub": "user-6", "aud": "test-audience", "iss": "https://example.com/"})
+    with client.websocket_connect(f"/ws/observe?token={token}") as websocket:
+        time.sleep(1.5)
+        websocket.send_json({"type": "status"})
+        assert websocket.receive_json()["type"] == "status"
+        assert websocket.receive_json() == {"type": "ack", "echo": "status"}
+
+
+def test_ws_ping_options_follow_the_read_timeout():
+    settings = Settings(auth0_domain="d", auth0_audience="a", auth0_issuer="i", read_timeout_seconds=30)
+    assert ws_ping_options(settings) == {"ws_ping_interval": 15.0, "ws_ping_timeout": 15.0}
+    disabled = Settings(auth0_domain="d", auth0_audience="a", auth0_issuer="i", read_timeout_seconds=0)
+    assert ws_ping_options(disabled) == {"ws_ping_interval": None, "ws_ping_timeout": None}
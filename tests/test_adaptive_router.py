@@ -0,0 +1,97 @@
+import random
+
+from orchestra.adaptive_router import AdaptiveRouter, AdaptiveRoutingConfig, compute_tool_stats
+from orchestra.run_history import RunHistory
+
+
+def make_run(tool, status, seconds, category="backend"):
+    return {
+        "secondary": tool,
+        "status": status,
+        "category": category,
+        "started_at": "2024-01-01T00:00:00+00:00",
+        "completed_at": f"2024-01-01T00:{seconds // 60:02d}:{seconds % 60:02d}+00:00",
+    }
+
+
+def test_compute_tool_stats_groups_by_category_and_tool():
+    runs = [
+        make_run("droid", "completed", 30),
+        make_run("droid", "failed", 90),
+        make_run("codex", "completed", 20, category=None),
+        {"secondary": "droid", "status": "running", "category": "backend"},
+    ]
+    stats = compute_tool_stats(runs)
+
+    droid = stats["backend"]["droid"]
+    assert droid.runs == 2
+    assert droid.success_rate == 0.5
+    assert droid.mean_duration == 60
+    assert stats["default"]["codex"].runs == 1
+
+
+def test_ucb_explores_untried_candidates_first():
+    stats = compute_tool_stats([make_run("droid", "completed", 30)])
+    router = AdaptiveRouter(AdaptiveRoutingConfig(strategy="ucb"), stats)
+
+    decision = router.select("backend", tools=["droid", "codex"], static_choice="droid")
+
+    assert decision.tool == "codex"
+    assert "exploring" in decision.reason
+    assert decision.scores["codex"]["runs"] == 0
+
+
+def test_ucb_prefers_faster_and_more_reliable_tool():
+    runs = [make_run("droid", "failed", 120) for _ in range(5)]
+    runs += [make_run("codex", "completed", 30) for _ in range(5)]
+    router = AdaptiveRouter(AdaptiveRoutingConfig(strategy="ucb", exploration=0.5), compute_tool_stats(runs))
+
+    decision = router.select("backend", tools=["droid", "codex"], static_choice="droid")
+
+    assert decision.tool == "codex"
+    assert decision.mode == "adaptive"
+    assert decision.scores["codex"]["score"] > decision.scores["droid"]["score"]
+
+
+def test_epsilon_greedy_exploits_without_exploration():
+    runs = [make_run("droid", "completed", 60), make_run("codex", "completed", 30)]
+    settings = AdaptiveRoutingConfig(strategy="epsilon", epsilon=0.0)
+    router = AdaptiveRouter(settings, compute_tool_stats(runs), rng=random.Random(1))
+
+    decision = router.select("backend", tools=["droid", "codex"], static_choice="droid")
+
+    assert decision.tool == "codex"
+
+
+def test_candidates_restrict_choices():
+    settings = AdaptiveRoutingConfig(strategy="ucb", candidates={"git": ["aider"]})
+    router = AdaptiveRouter(settings, {})
+
+    decision = router.select("git", tools=["aider", "codex", "droid"], static_choice="aider")
+
+    assert decision.tool == "aider"
+    assert set(decision.scores) == {"aider"}
+
+
+def test_routing_decision_is_stored_on_run(tmp_path):
+    history = RunHistory(tmp_path / "runs.json")
+    router = AdaptiveRouter(AdaptiveRoutingConfig(), {})
+    decision = router.select("backend", tools=["droid"], static_choice="droid")
+
+    history.start_run(
+        "abc",
+        task="Build API",
+        primary="claude",
+        secondary=decision.tool,
+        primary_session="p",
+        secondary_session="s",
+        cleanup=True,
+        follow_mode=False,
+        category="backend",
+        routing=decision.to_dict(),
+    )
+
+    record = history.get_run("abc")
+    assert record["category"] == "backend"
+    assert record["routing"]["tool"] == "droid"
+    assert record["routing"]["reason"]
@@ -0,0 +1,137 @@
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from orchestra import config as config_module
+from orchestra.config import load_config
+
+
+CONFIG_TEMPLATE = """
+tools:
+  droid:
+    wrapper: ./wrappers/droid.sh
+    capacity: {capacity}
+routing:
+  backend: droid
+  default: droid
+"""
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    monkeypatch.setenv("ORCHESTRA_STATE_DIR", str(tmp_path / "state"))
+    project = tmp_path / "project"
+    (project / "wrappers").mkdir(parents=True)
+    wrapper = project / "wrappers" / "droid.sh"
+    wrapper.write_text("#!/bin/sh\n")
+    config_path = project / "config.yaml"
+    config_path.write_text(CONFIG_TEMPLATE.format(capacity=1))
+    return config_path
+
+
+def forbid_yaml(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("YAML should not be parsed on a warm load")
+
+    monkeypatch.setattr(config_module.yaml, "safe_load", fail)
+
+
+def bump_mtime(path: Path) -> None:
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_warm_load_skips_yaml(workspace, monkeypatch):
+    cold = load_config(workspace)
+    forbid_yaml(monkeypatch)
+    warm = load_config(workspace)
+
+    assert warm == cold
+    assert warm.wrapper_for("droid") == workspace.parent / "wrappers" / "droid.sh"
+
+
+def test_touch_without_change_reuses_snapshot(workspace, monkeypatch):
+    load_config(workspace)
+    bump_mtime(workspace)
+    forbid_yaml(monkeypatch)
+    replaced = []
+    real_replace = os.replace
+    monkeypatch.setattr(config_module.os, "replace", lambda src, dst: replaced.append(dst) or real_replace(src, dst))
+
+    assert load_config(workspace).tools["droid"].capacity == 1
+    # The refreshed stamp is swapped in atomically, never written in place.
+    assert len(replaced) == 1 and Path(replaced[0]).suffix == ".json"
+    assert not list(Path(replaced[0]).parent.glob("*.tmp"))
+
+
+def test_config_edit_invalidates_snapshot(workspace):
+    load_config(workspace)
+    workspace.write_text(CONFIG_TEMPLATE.format(capacity=3))
+    bump_mtime(workspace)
+
+    assert load_config(workspace).tools["droid"].capacity == 3
+
+
+def test_removed_wrapper_invalidates_snapshot(workspace):
+    load_config(workspace)
+    (workspace.parent / "wrappers" / "droid.sh").unlink()
+
+    with pytest.raises(FileNotFoundError):
+        load_config(workspace)
+
+
+def test_shadowing_wrapper_invalidates_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setenv("ORCHESTRA_STATE_DIR", str(tmp_path / "state"))
+    root = tmp_path / "root"
+    (root / "wrappers").mkdir(parents=True)
+    (root / "wrappers" / "droid.sh").write_text("#!/bin/sh\n")
+    config_dir = root / "orchestra"
+    config_dir.mkdir()
+    config_path = config_dir / "config.yaml"
+    config_path.write_text(CONFIG_TEMPLATE.format(capacity=1))
+
+    assert load_config(config_path).wrapper_for("droid") == root / "wrappers" / "droid.sh"
+
+    (config_dir / "wrappers").mkdir()
+    (config_dir / "wrappers" / "droid.sh").write_text("#!/bin/sh\n")
+
+    assert load_config(config_path).wrapper_for("droid") == config_dir / "wrappers" / "droid.sh"
+
+
+
+@pytest.mark.parametrize("wrappers", [{"droid": {}}, [], {"droid": {"path": None}}, None])
+def test_corrupt_snapshot_is_a_cache_miss(workspace, wrappers):
+    cold = load_config(workspace)
+    snapshot_path = config_module._snapshot_path(workspace)
+    snapshot = json.loads(snapshot_path.read_text())
+    snapshot["wrappers"] = wrappers
+    snapshot_path.write_text(json.dumps(snapshot))
+
+    assert load_config(workspace) == cold
+
+def test_invalid_config_is_reported_without_a_traceback(workspace):
+    from click.testing import CliRunner
+
+    from orchestra import cli as cli_module
+
+    workspace.write_text(CONFIG_TEMPLATE.format(capacity=1) + "routing_mode: bogus\n")
+    result = CliRunner().invoke(cli_module.cli, ["--config", str(workspace), "run", "list"])
+    assert result.exit_code == 1
+    assert "Invalid configuration: Unknown routing_mode 'bogus'" in result.output
+
+
+@pytest.mark.parametrize(
+    "adaptive, message",
+    [
+        ("  candidates:\n    backend: droid\n", "must be a list of tool names"),
+        ("  candidates:\n    backend: [droid, codex]\n", "unknown tools: codex"),
+        ("  strategy: greedy\n", "Unknown adaptive_routing strategy 'greedy'"),
+        ("  epsilon: 1.5\n", "epsilon must be between 0 and 1"),
+    ],
+)
+def test_invalid_adaptive_routing_fails_at_load_time(workspace, adaptive, message):
+    workspace.write_text(CONFIG_TEMPLATE.format(capacity=1) + "adaptive_routing:\n" + adaptive)
+    with pytest.raises(ValueError, match=message):
+        load_config(workspace)
@@ -0,0 +1,98 @@
+import threading
+
+import pytest
+
+from orchestra.config import watch_config
+
+
+CONFIG = """
+tools:
+  droid:
+    wrapper: ./droid.sh
+routing:
+  default: {default}
+"""
+
+
+def make_config(tmp_path, monkeypatch, default="droid"):
+    monkeypatch.setenv("ORCHESTRA_STATE_DIR", str(tmp_path / "state"))
+    (tmp_path / "droid.sh").write_text("#!/bin/sh\n")
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(CONFIG.format(default=default))
+    return config_path
+
+
+def test_failed_reload_keeps_previous_snapshot(tmp_path, monkeypatch):
+    config_path = make_config(tmp_path, monkeypatch)
+    watcher = watch_config(config_path, use_inotify=False)
+    original = watcher.current
+
+    config_path.write_text("routing_mode: bogus-mode\n")
+    event = watcher.check()
+
+    assert event is not None and not event.ok
+    assert "bogus-mode" in event.error
+    assert watcher.current is original
+    assert watcher.check() is None
+
+
+def test_wrapper_removal_is_detected(tmp_path, monkeypatch):
+    config_path = make_config(tmp_path, monkeypatch)
+    watcher = watch_config(config_path, use_inotify=False)
+
+    (tmp_path / "droid.sh").unlink()
+    event = watcher.check()
+
+    assert event is not None and not event.ok
+    assert str(tmp_path / "droid.sh") in event.changed
+
+
+def test_background_polling_swaps_snapshot(tmp_path, monkeypatch):
+    config_path = make_config(tmp_path, monkeypatch)
+    watcher = watch_config(config_path, use_inotify=False, interval=0.01)
+    reloaded = threading.Event()
+    watcher.subscribe(lambda event: reloaded.set())
+    watcher.start()
+    try:
+        config_path.write_text(CONFIG.format(default="droid") + "routing_mode: adaptive\n")
+        assert reloaded.wait(5)
+    finally:
+        watcher.stop()
+
+    assert watcher.current.routing_mode == "adaptive"
+    assert watcher.generation == 2
+
+
+def test_failing_listener_does_not_block_the_others(tmp_path, monkeypatch):
+    config_path = make_config(tmp_path, monkeypatch)
+    watcher = watch_config(config_path, use_inotify=False)
+    seen = []
+
+    def broken(event):
+        raise RuntimeError("listener bug")
+
+    watcher.subscribe(broken)
+    watcher.subscribe(seen.append)
+    config_path.write_text(CONFIG.format(default="droid") + "routing_mode: adaptive\n")
+    event = watcher.check()
+
+    assert event is not None and event.ok
+    assert seen == [event]
+    assert watcher.current.routing_mode == "adaptive"
+
+
+def test_inotify_watch_swaps_snapshot(tmp_path, monkeypatch):
+    pytest.importorskip("watchfiles")
+    config_path = make_config(tmp_path, monkeypatch)
+    watcher = watch_config(config_path, interval=0.05)
+    reloaded = threading.Event()
+    watcher.subscribe(lambda event: reloaded.set())
+    watcher.start()
+    try:
+        config_path.write_text(CONFIG.format(default="droid") + "routing_mode: adaptive\n")
+        assert reloaded.wait(5)
+    finally:
+        watcher.stop()
+
+    assert watcher._use_inotify
+    assert watcher.current.routing_mode == "adaptive"
@@ -71,3 +71,15 @@ def test_task_validation(tmp_path: Path):
 
     assert result.returncode != 0
     assert "single line" in result.stderr.lower()
+
+
+def test_via_daemon_reports_missing_supervisor(tmp_path: Path):
+    env = {"ORCHESTRA_STATE_DIR": str(tmp_path / "state")}
+    result = run_cli(
+        ["delegate", "--task", "Generate hello world", "--detach", "--daemon-socket", str(tmp_path / "none.sock")],
+        env=env,
+    )
+
+    assert result.returncode != 0
+    assert "DAEMON_SUPERVISOR=1" in result.stderr
+    assert not (tmp_path / "state" / "runs.json").exists()
@@ -0,0 +1,149 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from click.testing import CliRunner
+
+from orchestra import cli as cli_module
+from orchestra.config import OrchestraConfig, ToolConfig
+from orchestra.delegation import DelegationRequest, execute_delegation, plan_delegation
+from orchestra.fake_tmux import FakeProgram, FakeTmuxBackend, ManualClock
+from orchestra.run_history import RunHistory
+from orchestra.search_index import SearchIndex
+from orchestra.tmux_backend import TmuxBackend
+from orchestra.tmux_manager import TmuxError, TmuxManager
+
+
+def make_config(tmp_path):
+    wrapper = tmp_path / "wrapper.sh"
+    return OrchestraConfig(
+        tools={"claude": ToolConfig("claude", wrapper), "codex": ToolConfig("codex", wrapper, capacity=64)},
+        routing={},
+        default_tool="codex",
+    )
+
+
+def counting(count, **kwargs):
+    return lambda session, command: FakeProgram([f"line {i}" for i in range(count)], **kwargs)
+
+
+def test_output_rate_scrollback_and_history_limit():
+    clock = ManualClock()
+    backend = FakeTmuxBackend(counting(10, rate=2), clock=clock, height=3, history_limit=4)
+    manager = TmuxManager(backend=backend)
+    manager.spawn_session("s", ["agent", "--role", "secondary"])
+
+    assert manager.capture_pane("s").lines == []
+    clock.advance(2)
+    assert manager.capture_pane("s").lines == ["line 1", "line 2", "line 3"]
+    assert manager.capture_pane("s", scrollback=1).lines == ["line 0", "line 1", "line 2", "line 3"]
+    manager.send_keys("s", "status")
+    assert manager.capture_pane("s").lines == ["line 2", "line 3", "status"]
+
+    clock.advance(60)
+    # Three visible lines plus four of history; the rest has scrolled away.
+    assert manager.capture_pane("s", scrollback=100).lines == ["status"] + [f"line {i}" for i in range(4, 10)]
+    assert backend.command("s") == "agent --role secondary"
+
+
+def test_process_death_removes_the_session_unless_it_remains_on_exit():
+    clock = ManualClock()
+    backend = FakeTmuxBackend(
+        lambda session, command: FakeProgram(["done"], exit_after=1, remain_on_exit=session == "kept"),
+        clock=clock,
+    )
+    manager = TmuxManager(backend=backend)
+    for name in ("gone", "kept", "crashed"):
+        manager.spawn_session(name)
+    with pytest.raises(TmuxError, match="already exists"):
+        manager.spawn_session("gone")
+
+    backend.kill_process("crashed")
+    clock.advance(1)
+    assert manager.list_sessions() == ["kept"]
+    capture = manager.capture_pane("kept")
+    assert capture.dead and capture.lines == ["done", "", "Pane is dead"]
+    with pytest.raises(TmuxError, match="not found"):
+        manager.capture_pane("gone")
+
+
+def test_follow_streams_every_line_and_stops_when_the_program_exits():
+    backend = FakeTmuxBackend(counting(40, rate=2000, exit_after=0.01, remain_on_exit=True), height=100)
+    manager = TmuxManager(backend=backend)
+    manager.spawn_session("s")
+    lines = list(manager.iter_pane_lines("s", poll_interval=0.005))
+    assert [line for line in lines if line.startswith("line")] == [f"line {i}" for i in range(40)]
+
+
+def test_incomplete_backends_fail_at_construction():
+    class Partial(TmuxBackend):
+        def has_session(self, session_name):
+            return False
+
+    with pytest.raises(TypeError, match="list_sessions"):
+        Partial()
+    FakeTmuxBackend()
+
+
+def test_delegate_cli_runs_in_process(tmp_path, monkeypatch):
+    monkeypatch.setenv("ORCHESTRA_STATE_DIR", str(tmp_path))
+    backend = FakeTmuxBackend(lambda session, command: FakeProgram(["Edited app.py", "✅ completed"], rate=100, exit_after=0.2))
+    monkeypatch.setattr(cli_module, "_build_manager", lambda binary: TmuxManager(backend=backend))
+
+    result = CliRunner().invoke(
+        cli_module.cli,
+        ["delegate", "--to", "codex", "--task", "Fix bug", "--follow", "--follow-interval", "0.1", "--cleanup"],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert "✅ completed" in result.output
+    assert backend.list_sessions() == []
+    run = json.loads((tmp_path / "runs.json").read_text())[-1]
+    assert run["status"] == "completed"
+
+
+def test_thousands_of_sessions_from_many_threads():
+    clock = ManualClock()
+    manager = TmuxManager(backend=FakeTmuxBackend(counting(5), clock=clock))
+    names = [f"orchestra-{i}" for i in range(4000)]
+
+    def lifecycle(name):
+        manager.spawn_session(name)
+        lines = manager.capture_pane(name).lines
+        manager.send_keys(name, "exit")
+        return lines
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        captures = list(pool.map(lifecycle, names))
+    assert all(lines == [f"line {i}" for i in range(5)] for lines in captures)
+    assert sorted(manager.list_sessions()) == sorted(names)
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        list(pool.map(manager.kill_session, names))
+    assert manager.list_sessions() == []
+
+
+def test_concurrent_delegations_share_one_fake_server(tmp_path):
+    backend = FakeTmuxBackend(lambda session, command: FakeProgram(["✅ completed"], exit_after=60))
+    manager = TmuxManager(backend=backend)
+    history = RunHistory(tmp_path / "runs.json")
+    index = SearchIndex(tmp_path / "search.db")
+    config = make_config(tmp_path)
+
+    def delegate(number):
+        plan = plan_delegation(
+            DelegationRequest(task=f"task {number}", secondary="codex", wait=0, cleanup=True, transcript="none"),
+            config=config,
+            manager=manager,
+            history=history,
+            emit=lambda event: None,
+        )
+        return execute_delegation(plan, manager=manager, history=history, emit=lambda event: None, search_index=index)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(delegate, range(40)))
+
+    assert {result["status"] for result in results} == {"completed"}
+    assert len({result["run_id"] for result in results}) == 40
+    assert backend.list_sessions() == []
+    assert len(index) == 40
@@ -0,0 +1,129 @@
+from datetime import datetime, timezone
+
+import pytest
+from click.testing import CliRunner
+
+from orchestra import cli as cli_module
+from orchestra.config import OrchestraConfig, ToolConfig
+from orchestra.delegation import DelegationError, DelegationRequest, plan_delegation
+from orchestra.run_history import RunHistory
+from orchestra.load_balancer import CapacityError, choose_tool, collect_load, parse_run_session
+
+
+NOW = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+class FakeManager:
+    def __init__(self, sessions):
+        self.sessions = list(sessions)
+        self.spawned = []
+
+    def list_sessions(self):
+        return list(self.sessions)
+
+    def spawn_session(self, name, command=None, **kwargs):
+        self.spawned.append(name)
+        raise RuntimeError("spawn should not be reached")
+
+
+def test_parse_run_session():
+    assert parse_run_session("run-abc123-secondary-droid") == ("abc123", "secondary", "droid")
+    assert parse_run_session("scratch") is None
+    assert parse_run_session("run-broken") is None
+
+
+def test_collect_load_counts_sessions_queue_and_latency():
+    sessions = [
+        "run-a-primary-claude",
+        "run-a-secondary-droid",
+        "run-b-secondary-droid",
+        "unrelated",
+    ]
+    runs = [
+        {"run_id": "c", "secondary": "aider", "status": "running", "started_at": "2024-01-01T11:59:00+00:00"},
+        {"run_id": "old", "secondary": "aider", "status": "running", "started_at": "2024-01-01T09:00:00+00:00"},
+        {
+            "run_id": "d",
+            "secondary": "aider",
+            "status": "completed",
+            "started_at": "2024-01-01T11:00:00+00:00",
+            "completed_at": "2024-01-01T11:00:30+00:00",
+        },
+    ]
+    loads = collect_load(sessions, runs, {"droid": 2, "aider": 1, "claude": 1}, now=NOW)
+
+    assert loads["droid"].active == 2
+    assert not loads["droid"].has_capacity
+    assert loads["aider"].queued == 1
+    assert loads["aider"].recent_latency == 30
+    assert loads["claude"].active == 0
+
+
+def test_choose_tool_spills_to_least_loaded_fallback():
+    loads = collect_load(
+        ["run-a-secondary-droid", "run-b-secondary-codex"],
+        [],
+        {"droid": 1, "aider": 2, "codex": 2},
+        now=NOW,
+    )
+
+    tool, reason = choose_tool("droid", ["codex", "aider"], loads)
+
+    assert tool == "aider"
+    assert "spilled" in reason
+
+
+def test_collect_load_counts_pending_runs_once():
+    runs = [
+        {"run_id": "fresh", "secondary": "droid", "status": "running", "started_at": "2024-01-01T11:59:00+00:00"},
+        {"run_id": "stale", "secondary": "droid", "status": "running", "started_at": "2024-01-01T09:00:00+00:00"},
+    ]
+    pending = {"fresh": "droid", "stale": "droid", "spawned": "droid", "unknown": "nope"}
+
+    loads = collect_load(["run-spawned-secondary-droid"], runs, {"droid": 4}, pending=pending, now=NOW)
+
+    assert (loads["droid"].active, loads["droid"].queued) == (1, 2)
+
+
+def test_choose_tool_keeps_preferred_with_free_slot():
+    loads = collect_load([], [], {"droid": 1, "aider": 1}, now=NOW)
+    assert choose_tool("droid", ["aider"], loads)[0] == "droid"
+
+
+def test_choose_tool_raises_when_everything_is_full():
+    loads = collect_load(["run-a-secondary-droid", "run-b-secondary-aider"], [], {"droid": 1, "aider": 1}, now=NOW)
+    with pytest.raises(CapacityError, match="Tool 'droid' is at capacity"):
+        choose_tool("droid", ["aider"], loads)
+
+
+def test_delegate_rejects_busy_tool(monkeypatch, tmp_path):
+    fake = FakeManager(["run-a-secondary-droid", "run-b-secondary-aider", "run-c-secondary-codex"])
+    monkeypatch.setattr(cli_module, "_build_manager", lambda binary: fake)
+    monkeypatch.setenv("ORCHESTRA_STATE_DIR", str(tmp_path))
+
+    result = CliRunner().invoke(
+        cli_module.cli,
+        ["delegate", "--to", "auto", "--routing", "static", "--task", "Add database endpoint"],
+    )
+
+    assert result.exit_code != 0
+    assert "at capacity" in result.output
+    assert fake.spawned == []
+
+
+def test_plan_reserves_its_slot_for_later_plans(tmp_path):
+    config = OrchestraConfig(
+        tools={"claude": ToolConfig("claude", tmp_path / "w.sh"), "droid": ToolConfig("droid", tmp_path / "w.sh", capacity=1)},
+        routing={},
+        default_tool="droid",
+    )
+    history = RunHistory(tmp_path / "runs.json")
+
+    def plan():
+        request = DelegationRequest(task="Fix bug", secondary="droid")
+        return plan_delegation(request, manager=FakeManager([]), config=config, history=history, emit=lambda event: None)
+
+    first = plan()
+    assert history.get_run(first.run_id)["status"] == "running"
+    with pytest.raises(DelegationError, match="at capacity"):
+        plan()
@@ -0,0 +1,97 @@
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from orchestra import cli as cli_module
+from orchestra import resource_sampler
+from orchestra.resource_sampler import ResourceSampler, summarise_usage
+from orchestra.run_history import RunHistory
+
+
+def write_proc(root: Path, pid: int, ppid: int, *, cpu=(0, 0), rss=0, start=1, io=(0, 0), name="sh"):
+    directory = root / str(pid)
+    directory.mkdir(parents=True, exist_ok=True)
+    # stat(5): pid (comm) state ppid ... utime(14) stime(15) ... starttime(22) vsize(23) rss(24)
+    fields = ["S", str(ppid)] + ["0"] * 9 + [str(cpu[0]), str(cpu[1])] + ["0"] * 6 + [str(start), "0", str(rss)]
+    (directory / "stat").write_text(f"{pid} ({name}) {' '.join(fields)}\n")
+    (directory / "io").write_text(f"rchar: 1\nwchar: 1\nread_bytes: {io[0]}\nwrite_bytes: {io[1]}\n")
+
+
+def test_totals_cover_the_tree_and_processes_that_exited(tmp_path, monkeypatch):
+    monkeypatch.setattr(resource_sampler, "_CLOCK_TICKS", 100)
+    monkeypatch.setattr(resource_sampler, "_PAGE_SIZE", 4096)
+    write_proc(tmp_path, 10, 1, cpu=(50, 10), rss=100, io=(4096, 0), name="wrapper (x)")
+    write_proc(tmp_path, 11, 10, cpu=(100, 0), rss=300, io=(0, 8192))
+    write_proc(tmp_path, 12, 11, cpu=(5, 5), rss=50)
+    write_proc(tmp_path, 99, 1, cpu=(1000, 0), rss=10_000)  # not in the tree
+
+    sampler = ResourceSampler(proc_root=tmp_path)
+    sampler.track("secondary", 10)
+    sampler.sample()
+    # The grandchild exits and pid 11 is reused by an unrelated short process.
+    for name in ("stat", "io"):
+        (tmp_path / "12" / name).unlink()
+    write_proc(tmp_path, 11, 10, cpu=(2, 0), rss=20, start=500)
+    write_proc(tmp_path, 10, 1, cpu=(60, 10), rss=100, io=(4096, 0))
+    sampler.sample()
+
+    usage = sampler.stop()["secondary"]
+    assert usage.cpu_seconds == pytest.approx((70 + 100 + 10 + 2) / 100)
+    assert usage.peak_rss_bytes == (100 + 300 + 50) * 4096
+    assert (usage.read_bytes, usage.write_bytes) == (4096, 8192)
+    assert (usage.processes, usage.samples) == (4, 3)
+    assert sampler.stop()["secondary"] == usage
+
+
+@pytest.mark.skipif(not Path("/proc/self/stat").exists(), reason="needs /proc")
+def test_samples_a_live_process_tree_cheaply():
+    code = "import subprocess, sys; subprocess.run([sys.executable, '-c', 'while True: pass'])"
+    parent = subprocess.Popen([sys.executable, "-c", code])
+    try:
+        sampler = ResourceSampler(interval=0.5)
+        sampler.track("secondary", parent.pid)
+        sampler.start()
+        time.sleep(1.2)
+        usage = sampler.stop()["secondary"]
+    finally:
+        # Children first: once the parent is gone they are reparented and -P misses them.
+        subprocess.run(["pkill", "-P", str(parent.pid)], check=False)
+        parent.kill()
+        parent.wait()
+
+    assert usage.processes == 2 and usage.samples >= 3
+    assert usage.cpu_seconds > 0.5
+    assert usage.peak_rss_bytes > 1 << 20
+    assert sampler.overhead_seconds < usage.cpu_seconds / 10
+
+
+def test_run_stats_reports_per_agent_and_per_run(tmp_path, monkeypatch):
+    monkeypatch.setenv("ORCHESTRA_STATE_DIR", str(tmp_path))
+    history = RunHistory()
+    for run_id, cpu in (("a", 1.5), ("b", 2.5), ("c", None)):
+        history.start_run(
+            run_id,
+            task="t",
+            primary="claude",
+            secondary="codex",
+            primary_session="p",
+            secondary_session="s",
+            cleanup=True,
+            follow_mode=False,
+        )
+        usage = {"cpu_seconds": cpu, "peak_rss_bytes": 3 << 20, "read_bytes": 0, "write_bytes": 2048}
+        resources = {"interval": 2.0, "overhead_cpu_seconds": 0.01, "roles": {"secondary": usage}}
+        history.complete_run(run_id, status="completed", summary={"resources": resources} if cpu else {})
+
+    assert summarise_usage(history.list_runs(limit=10))["codex"]["cpu_seconds"] == 4.0
+    result = CliRunner().invoke(cli_module.cli, ["run", "stats"])
+    assert result.exit_code == 0, result.output
+    assert "codex       runs 2    cpu 4.00s  peak rss 3.0 MiB  read 0 B  write 4.0 KiB" in result.output
+    assert "  c  " not in result.output
+
+    single = CliRunner().invoke(cli_module.cli, ["run", "stats", "a"])
+    assert "Per agent" not in single.output and "a  secondary  codex" in single.output
@@ -0,0 +1,102 @@
+from datetime import datetime, timezone
+
+import pytest
+from click.testing import CliRunner
+
+from orchestra import cli as cli_module
+from orchestra.run_history import RunHistory
+from orchestra.search_index import SearchIndex, parse_since, quote_query
+from orchestra.transcripts import TranscriptStore
+
+
+def record(run_id, task, *, started="2024-01-01T12:00:00+00:00", status="completed", details=()):
+    return {
+        "run_id": run_id,
+        "task": task,
+        "secondary": "codex",
+        "started_at": started,
+        "completed_at": started,
+        "status": status,
+        "summary": {"details": list(details)},
+    }
+
+
+def add_run(history, run_id, task, *, status="completed", details=()):
+    history.start_run(
+        run_id,
+        task=task,
+        primary="claude",
+        secondary="codex",
+        primary_session=f"run-{run_id}-primary-claude",
+        secondary_session=f"run-{run_id}-secondary-codex",
+        cleanup=True,
+        follow_mode=False,
+    )
+    history.complete_run(run_id, status=status, summary={"details": list(details)})
+
+
+def test_ranks_task_matches_above_transcript_mentions(tmp_path):
+    index = SearchIndex(tmp_path / "search.db")
+    transcripts = TranscriptStore(tmp_path / "transcripts")
+    with transcripts.writer("deep", "secondary") as writer:
+        writer.write_lines(["collecting tests", "ImportError: no module named yaml", "done"])
+    index.index_run(record("deep", "Add pagination"), transcripts)
+    index.index_run(record("title", "Fix the ImportError in the CLI", status="failed"))
+    index.index_run(record("other", "Write docs"))
+
+    hits = index.search("importerror")
+    assert [hit.run_id for hit in hits] == ["title", "deep"]
+    assert "[ImportError]" in hits[1].snippet
+    assert [hit.run_id for hit in index.search("ImportError", status="failed")] == ["title"]
+
+    index.index_run(record("deep", "Add pagination"))  # reindexed without its transcript
+    assert [hit.run_id for hit in index.search("ImportError")] == ["title"]
+    assert len(index) == 3
+
+
+def test_free_text_is_quoted_and_raw_errors_are_reported(tmp_path):
+    index = SearchIndex(tmp_path / "search.db")
+    index.index_run(record("a", 'Handle "quoted" input-file: parsing'))
+    assert quote_query('input-file: "x"') == '"input-file:" """x"""'
+    assert [hit.run_id for hit in index.search("input-file:")] == ["a"]
+    assert [hit.run_id for hit in index.search("pars*", raw=True)] == ["a"]
+    with pytest.raises(ValueError):
+        index.search("AND (", raw=True)
+
+
+def test_since_filters_on_start_time(tmp_path):
+    index = SearchIndex(tmp_path / "search.db")
+    index.index_run(record("old", "flaky test", started="2024-01-01T00:00:00+00:00"))
+    index.index_run(record("new", "flaky test", started="2024-01-09T00:00:00+00:00"))
+    now = datetime(2024, 1, 10, tzinfo=timezone.utc)
+    assert [hit.run_id for hit in index.search("flaky", since=parse_since("7d", now=now))] == ["new"]
+    assert parse_since("2024-01-05") == datetime(2024, 1, 5, tzinfo=timezone.utc)
+
+
+def test_sync_indexes_only_missing_or_changed_runs(tmp_path):
+    history = RunHistory(tmp_path / "runs.json")
+    index = SearchIndex(tmp_path / "search.db")
+    add_run(history, "a", "first task")
+    add_run(history, "b", "second task")
+    assert index.sync(history) == 2
+    assert index.sync(history) == 0
+    history.complete_run("b", status="failed", summary={"details": ["Traceback: boom"]})
+    assert index.sync(history) == 1
+    assert [hit.run_id for hit in index.search("boom")] == ["b"]
+    assert index.rebuild(history) == 2
+
+
+def test_run_search_command(tmp_path, monkeypatch):
+    monkeypatch.setenv("ORCHESTRA_STATE_DIR", str(tmp_path))
+    history = RunHistory()
+    add_run(history, "abc", "Fix ImportError in loader", details=["ImportError fixed"])
+    runner = CliRunner()
+
+    result = runner.invoke(cli_module.cli, ["run", "search", "ImportError"])
+    assert result.exit_code == 0, result.output
+    assert result.output.splitlines()[0].startswith("abc  completed")
+    assert "[ImportError]" in result.output
+
+    assert "No matching runs" in runner.invoke(cli_module.cli, ["run", "search", "nothing"]).output
+    assert runner.invoke(cli_module.cli, ["run", "search", "--reindex"]).output == "Indexed 1 runs\n"
+    assert runner.invoke(cli_module.cli, ["run", "search"]).exit_code == 2
@@ -0,0 +1,84 @@
+import json
+import threading
+
+from click.testing import CliRunner
+
+from orchestra import cli as cli_module
+from orchestra import tracing
+from orchestra.fake_tmux import FakeProgram, FakeTmuxBackend
+from orchestra.run_history import RunHistory
+from orchestra.tmux_manager import TmuxManager
+from orchestra.tracing import Tracer, span, traced
+
+
+@traced("work")
+def work(value):
+    with span("inner", value=value):
+        return value * 2
+
+
+def test_spans_are_recorded_only_while_a_tracer_is_active():
+    assert work(1) == 2
+    tracer = Tracer()
+    with tracer.activate():
+        work(2)
+        thread = threading.Thread(target=work, args=(3,))  # threads do not inherit the tracer
+        thread.start()
+        thread.join()
+        tracing.mark("ready")
+    work(4)
+
+    trace = tracer.to_chrome({"run_id": "r1"})
+    assert [event["name"] for event in trace["traceEvents"]] == ["inner", "work", "ready"]
+    inner, outer, ready = trace["traceEvents"]
+    assert inner["ph"] == "X" and inner["args"] == {"value": 2}
+    assert outer["ts"] <= inner["ts"] and outer["dur"] >= inner["dur"]
+    assert ready["ph"] == "i"
+    assert trace["otherData"] == {"run_id": "r1", "dropped_events": 0}
+
+    aggregates = tracer.aggregate()
+    assert aggregates["spans"]["work"]["count"] == 1
+    assert set(aggregates["marks"]) == {"ready"}
+
+
+def test_events_beyond_the_cap_still_count_in_aggregates(monkeypatch):
+    monkeypatch.setattr(tracing, "MAX_EVENTS", 3)
+    tracer = Tracer()
+    with tracer.activate():
+        for value in range(5):
+            work(value)
+    assert len(tracer.events) == 3 and tracer.dropped == 7
+    assert tracer.aggregate()["spans"]["inner"]["count"] == 5
+
+
+def test_delegate_profile_writes_trace_and_aggregates(tmp_path, monkeypatch):
+    monkeypatch.setenv("ORCHESTRA_STATE_DIR", str(tmp_path))
+    backend = FakeTmuxBackend(lambda session, command: FakeProgram(["✅ completed"], rate=20, exit_after=0.2))
+    monkeypatch.setattr(cli_module, "_build_manager", lambda binary: TmuxManager(backend=backend))
+    runner = CliRunner()
+
+    result = runner.invoke(
+        cli_module.cli,
+        ["delegate", "--to", "codex", "--task", "Fix bug", "--follow", "--follow-interval", "0.1", "--cleanup"],
+        env={"ORCHESTRA_TRACE": "1"},
+    )
+
+    assert result.exit_code == 0, result.output
+    assert "Profile (" in result.output
+    record = RunHistory().list_runs(limit=1)[0]
+    spans = record["trace"]["spans"]
+    for name in ("config.load", "delegate.plan", "tmux.spawn_session", "history.lock_wait", "summary.summarise"):
+        assert spans[name]["count"] >= 1, name
+    assert "agent.first_output" in record["trace"]["marks"]
+
+    trace = json.loads((tmp_path / "traces" / f"{record['run_id']}.json").read_text())
+    assert trace["otherData"]["run_id"] == record["run_id"]
+    assert {"delegate.spawn", "tmux.poll_wait"} <= {event["name"] for event in trace["traceEvents"]}
+
+    shown = runner.invoke(cli_module.cli, ["run", "trace", record["run_id"]])
+    assert shown.exit_code == 0, shown.output
+    assert "delegate.collect_output" in shown.output
+
+    plain = runner.invoke(cli_module.cli, ["delegate", "--to", "codex", "--task", "Again", "--wait", "0", "--cleanup"])
+    assert plain.exit_code == 0, plain.output
+    assert RunHistory().list_runs(limit=1)[0]["trace"] is None
@@ -0,0 +1,75 @@
+import zlib
+
+from click.testing import CliRunner
+
+from orchestra import cli as cli_module
+from orchestra import transcripts as transcripts_module
+from orchestra.transcripts import TranscriptStore
+
+
+def write_transcript(store, run_id, count, *, role="secondary", block_lines=100):
+    with store.writer(run_id, role, block_lines=block_lines) as writer:
+        writer.write_lines(f"line {n}" for n in range(count))
+
+
+def test_ranges_span_blocks_and_match_slicing(tmp_path):
+    store = TranscriptStore(tmp_path)
+    write_transcript(store, "abc", 1050)
+    transcript = store.open("abc", "secondary")
+    expected = [f"line {n}" for n in range(1050)]
+
+    assert transcript.line_count == 1050 and len(transcript.blocks) == 11
+    for start, stop in ((0, 10), (95, 205), (1000, None), (-30, -10), (2000, None), (500, 400)):
+        assert transcript.read(start, stop) == expected[start:stop]
+    assert transcript.tail(3) == expected[-3:]
+    assert store.open("abc", "primary") is None
+
+
+def test_tail_inflates_only_the_last_block(tmp_path, monkeypatch):
+    store = TranscriptStore(tmp_path)
+    write_transcript(store, "abc", 10_000)
+    inflated = []
+    real = zlib.decompress
+    monkeypatch.setattr(transcripts_module.zlib, "decompress", lambda data: inflated.append(data) or real(data))
+
+    assert store.open("abc", "secondary").tail(50) == [f"line {n}" for n in range(9950, 10_000)]
+    assert len(inflated) == 1
+
+
+def test_writer_resumes_and_ignores_a_torn_index_record(tmp_path):
+    store = TranscriptStore(tmp_path)
+    write_transcript(store, "abc", 150)
+    with (tmp_path / "abc" / "secondary.idx").open("ab") as handle:
+        handle.write(b"\x01\x02\x03")  # writer died mid-append
+    assert store.open("abc", "secondary").line_count == 150
+
+    with store.writer("abc", "secondary") as writer:
+        assert writer.line_count == 150
+        writer.write("appended\nwith newline")
+    assert store.open("abc", "secondary").tail(1) == ["appended with newline"]
+
+
+def test_prune_keeps_only_listed_runs(tmp_path):
+    store = TranscriptStore(tmp_path)
+    for run_id in ("keep", "drop"):
+        write_transcript(store, run_id, 5)
+    assert store.prune(["keep"]) == ["drop"]
+    assert store.open("keep", "secondary") is not None
+    assert not (tmp_path / "drop").exists()
+
+
+def test_run_logs_command(tmp_path, monkeypatch):
+    monkeypatch.setenv("ORCHESTRA_STATE_DIR", str(tmp_path))
+    write_transcript(TranscriptStore(), "abc", 300)
+    runner = CliRunner()
+
+    tail = runner.invoke(cli_module.cli, ["run", "logs", "abc", "--tail", "2"])
+    assert tail.exit_code == 0, tail.output
+    assert tail.output.splitlines() == ["line 298", "line 299"]
+
+    ranged = runner.invoke(cli_module.cli, ["run", "logs", "abc", "--range", "10:12"])
+    assert ranged.output.splitlines() == ["line 10", "line 11"]
+
+    assert runner.invoke(cli_module.cli, ["run", "logs", "abc", "--range", "10"]).exit_code == 2
+    missing = runner.invoke(cli_module.cli, ["run", "logs", "abc", "--role", "primary"])
+    assert missing.exit_code == 1 and "No primary transcript" in missing.output